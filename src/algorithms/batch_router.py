@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Batch router connecting the terminals of many nets at once.
+
+Every grid point offers a horizontal and a vertical track. Lines of
+different nets may cross each other, but must neither share a track nor
+end or bend on a point used by another net. Nets are routed one after
+another by an A* search growing a tree from the source to all sinks.
+
+Conflicts are resolved by rip-up and reroute. Nets may share tracks at
+first, but tracks that stay congested get more expensive with every
+iteration, until one of the nets gives way and is rerouted around them.
+
+Nets far enough from each other form independent regions. These can be
+routed in parallel by a pool of processes.
+'''
+
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+
+from algorithms.hightower import PassableLine, LineEdge
+
+# orientation of a track
+HORIZONTAL, VERTICAL = 0, 1
+
+
+def route_nets(nets, obstacles, search_rect, processes=1, margin=5,
+               bend_cost=3, max_iterations=30):
+    """ Routes all nets avoiding the obstacles and each other.
+
+    Nets are routed in order of their difficulty, nets with more terminals
+    spanning larger areas first.
+
+    Based on:
+        L. McMurchie and C. Ebeling. 1995. PathFinder: A Negotiation-Based
+        Performance-Driven Router for FPGAs. In Proceedings of the 1995
+        ACM Third International Symposium on Field-Programmable Gate
+        Arrays, 111-117.
+
+    Args:
+        nets (dict): maps keys to lists of terminals as tuples. The first
+                terminal of each net is its source. Terminals are never
+                used by other nets.
+        obstacles (dict): maps grid points to the CollisionObject found
+                there, as for the hightower algorithm. The orientation of
+                PassableLine is derived from its neighbours. See
+                ObstacleIndex.items.
+        search_rect [(top_left), (bottom_right)]: list of two points (tuple)
+                that define the search area. The borders are included.
+        processes (int): number of processes to route independent regions
+                in. None for one per CPU, 1 routes in this process.
+        margin (int): lines of a net stay within the bounding box of its
+                terminals enlarged by margin. Nets with overlapping boxes
+                share a region.
+        bend_cost (int): cost of a bend in grid points
+        max_iterations (int): rip-up and reroute iterations. Nets still
+                in conflict afterwards fail.
+
+    Return:
+        Dictionary mapping the keys of nets to their trees or to None, if
+        they could not be routed. Trees are nested dictionaries mapping
+        points to their children, starting at the source. They have nodes
+        at terminals, bends and branches. Nets with a single terminal map
+        to an empty tree.
+    """
+    regions = _split_regions(nets, obstacles, search_rect, margin)
+    jobs = [(rect, region_nets, region_obstacles, margin, bend_cost,
+             max_iterations)
+            for rect, region_nets, region_obstacles in regions]
+
+    if processes == 1 or len(jobs) <= 1:
+        results = map(_route_region, jobs)
+        return _collect(results)
+    with ProcessPoolExecutor(processes) as executor:
+        return _collect(executor.map(_route_region, jobs))
+
+
+def _collect(results):
+    trees = {}
+    for region_trees in results:
+        trees.update(region_trees)
+    return trees
+
+
+def _route_region(job):
+    rect, nets, obstacles, margin, bend_cost, max_iterations = job
+    router = _RegionRouter(rect, nets, obstacles, margin, bend_cost)
+    router.route(max_iterations)
+    return router.trees()
+
+
+def _split_regions(nets, obstacles, search_rect, margin):
+    """
+    Groups the nets into regions, that do not overlap.
+
+    :return: list of (rect, nets, obstacles) per region
+    """
+    (s_left, s_top), (s_right, s_bottom) = search_rect
+    regions = []  # [left, top, right, bottom, keys]
+    for key, terminals in nets.items():
+        xs = [x for x, _ in terminals]
+        ys = [y for _, y in terminals]
+        regions.append([max(min(xs) - margin, s_left),
+                        max(min(ys) - margin, s_top),
+                        min(max(xs) + margin, s_right),
+                        min(max(ys) + margin, s_bottom), [key]])
+
+    # merge overlapping regions, merged ones might overlap others again
+    merged_any = True
+    while merged_any:
+        merged_any = False
+        regions.sort(key=lambda region: region[0])
+        merged = []
+        for region in regions:
+            for other in merged:
+                if region[0] <= other[2] and other[0] <= region[2] and \
+                        region[1] <= other[3] and other[1] <= region[3]:
+                    other[:4] = (min(region[0], other[0]),
+                                 min(region[1], other[1]),
+                                 max(region[2], other[2]),
+                                 max(region[3], other[3]))
+                    other[4].extend(region[4])
+                    merged_any = True
+                    break
+            else:
+                merged.append(region)
+        regions = merged
+
+    # distribute obstacles using buckets of regions
+    bucket_size = 64
+    buckets = {}
+    for index, (left, top, right, bottom, _) in enumerate(regions):
+        for bx in range(left // bucket_size, right // bucket_size + 1):
+            for by in range(top // bucket_size, bottom // bucket_size + 1):
+                buckets.setdefault((bx, by), []).append(index)
+    region_obstacles = [{} for _ in regions]
+    for point, obj in obstacles.items():
+        x, y = point
+        for index in buckets.get((x // bucket_size, y // bucket_size), ()):
+            left, top, right, bottom, _ = regions[index]
+            if left <= x <= right and top <= y <= bottom:
+                region_obstacles[index][point] = obj
+                break
+
+    return [([(left, top), (right, bottom)],
+             {key: nets[key] for key in keys}, region_obstacles[index])
+            for index, (left, top, right, bottom, keys) in enumerate(regions)]
+
+
+class _RegionRouter:
+    """
+    Routes the nets of one region.
+
+    Points are stored by their index in the region and tracks by point
+    index * 2 + orientation.
+    """
+
+    def __init__(self, rect, nets, obstacles, margin, bend_cost):
+        (self.left, self.top), (right, bottom) = rect
+        self.width = right - self.left + 1
+        self.height = bottom - self.top + 1
+        self.bend_cost = bend_cost
+
+        size = self.width * self.height
+        self._blocked = bytearray(size)
+        # tracks taken by lines that already exist
+        self._fixed = bytearray(2 * size)
+        lines = (PassableLine, LineEdge)
+        for (x, y), obj in obstacles.items():
+            index = self._index((x, y))
+            if obj is PassableLine:
+                if obstacles.get((x - 1, y)) in lines or \
+                        obstacles.get((x + 1, y)) in lines:
+                    self._fixed[2 * index + HORIZONTAL] = 1
+                if obstacles.get((x, y - 1)) in lines or \
+                        obstacles.get((x, y + 1)) in lines:
+                    self._fixed[2 * index + VERTICAL] = 1
+            else:
+                self._blocked[index] = 1
+
+        self._terminals = {}  # key -> list of point indices
+        self._windows = {}  # key -> local (left, top, right, bottom)
+        for key, terminals in nets.items():
+            xs = [x - self.left for x, _ in terminals]
+            ys = [y - self.top for _, y in terminals]
+            self._windows[key] = (max(min(xs) - margin, 0),
+                                  max(min(ys) - margin, 0),
+                                  min(max(xs) + margin, self.width - 1),
+                                  min(max(ys) + margin, self.height - 1))
+            indices = []
+            for point in terminals:
+                index = self._index(point)
+                if index not in indices:
+                    indices.append(index)
+                # only accessible while routing its net
+                self._blocked[index] = 1
+            self._terminals[key] = indices
+
+        self._usage = {}  # track -> number of nets using it
+        self._history = {}  # track -> cost of past congestion
+        self._present_factor = 0.5
+        self._edges = {}  # key -> set of tracks from a point to the next
+        self._tracks = {}  # key -> list of tracks used
+
+    def _index(self, point):
+        return (point[1] - self.top) * self.width + point[0] - self.left
+
+    def _point(self, index):
+        return (self.left + index % self.width, self.top + index // self.width)
+
+    def _difficulty(self, key):
+        points = [self._point(index) for index in self._terminals[key]]
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        return len(points), max(xs) - min(xs) + max(ys) - min(ys)
+
+    def route(self, max_iterations):
+        order = sorted(self._terminals, key=self._difficulty, reverse=True)
+        for key in order:
+            self._route_net(key)
+
+        for _ in range(max_iterations):
+            congested = [key for key in order if self._is_congested(key)]
+            if not congested:
+                break
+            for track in {track for key in congested
+                          for track in self._tracks[key]
+                          if self._usage[track] > 1}:
+                self._history[track] = self._history.get(track, 0) + 1
+            self._present_factor *= 2
+            for key in congested:
+                self._rip_up(key)
+                self._route_net(key)
+
+        # give up on nets that are still in conflict with earlier ones
+        for key in order:
+            if self._is_congested(key):
+                self._rip_up(key)
+                self._edges[key] = None
+
+    def _is_congested(self, key):
+        return any(self._usage[track] > 1
+                   for track in self._tracks.get(key, ()))
+
+    def _rip_up(self, key):
+        for track in self._tracks.pop(key, ()):
+            self._usage[track] -= 1
+        self._edges[key] = None
+
+    def _route_net(self, key):
+        terminals = self._terminals[key]
+        source = terminals[0]
+        for index in terminals:
+            self._blocked[index] = 0
+        try:
+            points = {source}
+            edges = set()
+            bbox = [*self._point(source), *self._point(source)]
+            sx, sy = self._point(source)
+            for sink in sorted(terminals[1:], key=lambda index: abs(
+                    self._point(index)[0] - sx) + abs(
+                    self._point(index)[1] - sy)):
+                if sink in points:
+                    continue
+                path = self._search(sink, points, bbox, self._windows[key])
+                if path is None:
+                    self._edges[key] = None
+                    return
+                # each step is taken with the orientation of its end
+                for (index, orientation), (next_index, _) in zip(path,
+                                                                 path[1:]):
+                    edges.add(2 * min(index, next_index) + orientation)
+                for index, _ in path:
+                    points.add(index)
+                    x, y = self._point(index)
+                    bbox = [min(bbox[0], x), min(bbox[1], y),
+                            max(bbox[2], x), max(bbox[3], y)]
+        finally:
+            for index in terminals:
+                self._blocked[index] = 1
+
+        self._edges[key] = edges
+        tracks = self._tracks[key] = self._used_tracks(edges, terminals)
+        for track in tracks:
+            self._usage[track] = self._usage.get(track, 0) + 1
+
+    def _neighbour_edges(self, index, edges):
+        """Returns the tracks of edges at the point index."""
+        return [edge for edge in (2 * index, 2 * index + 1,
+                                  2 * (index - 1),
+                                  2 * (index - self.width) + 1)
+                if edge in edges]
+
+    def _used_tracks(self, edges, terminals):
+        """
+        Tracks of a tree. Ends, bends, branches and terminals take both
+        tracks of their point.
+        """
+        steps = (1, self.width)
+        points = set()
+        for edge in edges:
+            index, orientation = edge >> 1, edge & 1
+            points.add(index)
+            points.add(index + steps[orientation])
+
+        tracks = []
+        for index in points:
+            at_point = self._neighbour_edges(index, edges)
+            orientations = {edge & 1 for edge in at_point}
+            if len(at_point) == 2 and len(orientations) == 1 and \
+                    index not in terminals:
+                tracks.append(2 * index + orientations.pop())
+            else:
+                tracks.extend((2 * index, 2 * index + 1))
+        return tracks
+
+    def _search(self, start, targets, bbox, window):
+        """
+        A* search from start to the nearest of the targets within window.
+
+        :return: Path as list of (point index, orientation it was reached
+            with) or None
+        """
+        width = self.width
+        w_left, w_top, w_right, w_bottom = window
+        blocked, fixed = self._blocked, self._fixed
+        usage, history = self._usage, self._history
+        present_factor, bend_cost = self._present_factor, self.bend_cost
+        left, top, right, bottom = (bbox[0] - self.left, bbox[1] - self.top,
+                                    bbox[2] - self.left, bbox[3] - self.top)
+
+        def track_cost(track):
+            return (1 + history.get(track, 0)) * \
+                (1 + present_factor * usage.get(track, 0))
+
+        def heuristic(x, y):
+            # distance to the bounding box of the targets
+            return max(left - x, 0, x - right) + max(top - y, 0, y - bottom)
+
+        x, y = start % width, start // width
+        best = {2 * start: 0, 2 * start + 1: 0}
+        parent = {}
+        heap = [(heuristic(x, y), 0, 2 * start),
+                (heuristic(x, y), 0, 2 * start + 1)]
+        while heap:
+            _, cost, state = heapq.heappop(heap)
+            if cost > best[state]:
+                continue
+            index, orientation = state >> 1, state & 1
+            if index in targets:
+                path = [(index, orientation)]
+                while state in parent:
+                    state = parent[state]
+                    path.append((state >> 1, state & 1))
+                return path
+
+            x, y = index % width, index // width
+            for next_orientation in (HORIZONTAL, VERTICAL):
+                if next_orientation == orientation:
+                    extra = 0
+                else:
+                    # a bend takes the other track as well
+                    track = 2 * index + next_orientation
+                    if fixed[track]:
+                        continue
+                    extra = bend_cost + track_cost(track)
+                if next_orientation == HORIZONTAL:
+                    candidates = ((x > w_left, index - 1, x - 1, y),
+                                  (x < w_right, index + 1, x + 1, y))
+                else:
+                    candidates = ((y > w_top, index - width, x, y - 1),
+                                  (y < w_bottom, index + width, x, y + 1))
+                for inside, next_index, nx, ny in candidates:
+                    if not inside or blocked[next_index]:
+                        continue
+                    track = 2 * next_index + next_orientation
+                    if fixed[track]:
+                        continue
+                    next_cost = cost + extra + track_cost(track)
+                    if next_cost < best.get(track, next_cost + 1):
+                        best[track] = next_cost
+                        parent[track] = state
+                        heapq.heappush(heap, (next_cost + heuristic(nx, ny),
+                                              next_cost, track))
+        return None
+
+    def trees(self):
+        """
+        :return: dictionary mapping keys to trees, see route_nets
+        """
+        return {key: None if self._edges.get(key) is None else
+                self._tree(self._terminals[key], self._edges[key])
+                for key in self._terminals}
+
+    def _tree(self, terminals, edges):
+        steps = (1, self.width)
+        source = terminals[0]
+        if not edges:
+            return {}
+
+        def is_node(index):
+            at_point = self._neighbour_edges(index, edges)
+            return index in terminals or len(at_point) != 2 or \
+                at_point[0] & 1 != at_point[1] & 1
+
+        def neighbours(index):
+            for edge in self._neighbour_edges(index, edges):
+                other = edge >> 1
+                if other == index:
+                    other += steps[edge & 1]
+                yield other
+
+        root = {}
+        tree = root[self._point(source)] = {}
+        visited = {source}
+        # (node, last point before it, subtree of node)
+        pending = [(source, None, tree)]
+        while pending:
+            node, previous, subtree = pending.pop()
+            for first in neighbours(node):
+                if first == previous:
+                    continue
+                last, current = node, first
+                while not is_node(current):
+                    last, current = current, next(
+                        n for n in neighbours(current) if n != last)
+                # a path crossing itself closes a loop, leave it out
+                if current in visited:
+                    continue
+                visited.add(current)
+                child = subtree[self._point(current)] = {}
+                pending.append((current, last, child))
+        return root
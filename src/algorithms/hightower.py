@@ -11,7 +11,7 @@ Hightower is an algorithm to find a path between two points on a 2D grid.
 It is used for inserting new line elements in the schematics view.
 '''
 
-import itertools
+import bisect
 import logging
 
 log = logging.getLogger(__name__)
@@ -97,7 +97,8 @@ class Solid(CollisionObject):
 
 
 def hightower_line_search(point_a, point_b, get_obj_at_point, search_rect,
-                          do_second_refinement=True):
+                          do_second_refinement=True,
+                          get_escape_line_end=None, get_cover_bound=None):
     """ Finds path with minimum bends from point A to B on a 2D grid.
 
     The algorithm is fast, but not guaranteed to find a path,
@@ -121,7 +122,15 @@ def hightower_line_search(point_a, point_b, get_obj_at_point, search_rect,
         search_rect [(top_left), (bottom_right)]: list of two points (tuple)
                 that define the search area. The borders are included.
                 It is assumed that there only free points on the border.
-        do_second_refinement (boolean): do time-consuming second refinement
+        do_second_refinement (boolean): shorten the path by second refinement
+        get_escape_line_end (function): optional function returning the end
+                of an escape line at once instead of probing
+                get_obj_at_point point by point. It has to cover the
+                search_rect, e.g. ObstacleView.escape_line_end.
+                (point, horizontal, up_or_left) -> (x, y)
+        get_cover_bound (function): optional function returning the end of
+                a cover line at once, e.g. ObstacleView.cover_bound.
+                (point, horizontal, up_or_left, to_up_or_left) -> (x, y)
 
     Return:
         Minimum path as list of tuples or None if nothing could be found
@@ -138,6 +147,9 @@ def hightower_line_search(point_a, point_b, get_obj_at_point, search_rect,
             is_point_free(point_b) and is_point_in_bounds(point_b)):
         return None
 
+    escape_line_end_function = get_escape_line_end
+    cover_bound_function = get_cover_bound
+
     # define types
     a, b = True, False
     horizontal, vertical, orientation_both = True, False, object()
@@ -151,6 +163,7 @@ def hightower_line_search(point_a, point_b, get_obj_at_point, search_rect,
              b: {horizontal: [], vertical: []}}
     intersect_flag = False
     intersection_point = []
+    escape_line_ends = {}  # (point, orientation, up_or_left) -> end
 
     def get_next_point(point, orientation, up_or_left):
         """
@@ -171,7 +184,19 @@ def hightower_line_search(point_a, point_b, get_obj_at_point, search_rect,
         """
         Find end of escape line from the given point and orientation to
         given direction up_or_left
+
+        The ends are cached, as the refinement looks up the same escape
+        lines again.
         """
+        key = (point, orientation, up_or_left)
+        if key not in escape_line_ends:
+            escape_line_ends[key] = find_escape_line_end(point, orientation,
+                                                         up_or_left)
+        return escape_line_ends[key]
+
+    def find_escape_line_end(point, orientation, up_or_left):
+        if escape_line_end_function is not None:
+            return escape_line_end_function(point, orientation, up_or_left)
 
         def find_bound(point):
             last_free_point = point
@@ -214,6 +239,9 @@ def hightower_line_search(point_a, point_b, get_obj_at_point, search_rect,
                         (next_point[0], search_rect[1][1]))
 
         def find_bound(point, bound_up_or_left):
+            if cover_bound_function is not None:
+                return cover_bound_function(point, orientation,
+                                            bound_up_or_left, to_up_or_left)
             while True:
                 next = get_next_point(point, orientation, bound_up_or_left)
                 if get_escape_line_end(next, not orientation,
@@ -348,38 +376,67 @@ def hightower_line_search(point_a, point_b, get_obj_at_point, search_rect,
                         assert False  # algorithm broken
                     break
 
+    def get_segment_index(path, i, axis):
+        """
+        Union of the ranges along axis covered by the segments tested
+        against the escape lines from segment i.
+
+        An escape line perpendicular to the axis through q can only
+        intersect segments whose range covers q[axis].
+        """
+        ranges = sorted((line[0][axis], line[1][axis]) for line in (
+            get_normalize_line((path[j], path[j + 1]))
+            for j in range(i + 2, len(path) - 1, 2)))
+        starts, ends = [], []
+        for start, end in ranges:
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        return starts, ends
+
+    def next_covered(index, value, step):
+        """
+        Next value in direction step covered by the segment index or None.
+        """
+        starts, ends = index
+        k = bisect.bisect_right(starts, value) - 1
+        if step > 0:
+            if k >= 0 and ends[k] >= value:
+                return value
+            return starts[k + 1] if k + 1 < len(starts) else None
+        else:
+            return min(value, ends[k]) if k >= 0 else None
+
     def second_refinement(path):
         i = 0
         while i < len(path) - 1:
-            for m in itertools.count():
-                if path[i][x] == path[i + 1][x]:
-                    if path[i][y] >= path[i + 1][y]:
-                        q = (path[i][0], path[i][y] - m)
-                        if q[y] <= path[i + 1][y]:
-                            break
-                    else:
-                        q = (path[i][0], path[i][y] + m)
-                        if q[y] >= path[i + 1][y]:
-                            break
-                    # horizontal escape line through q
-                    k = get_escape_line(q, horizontal)
+            if path[i][x] == path[i + 1][x]:
+                # horizontal escape lines through q
+                axis, orientation = y, horizontal
+            else:
+                # vertical escape lines through q
+                axis, orientation = x, vertical
+            step = 1 if path[i][axis] < path[i + 1][axis] else -1
+            index = get_segment_index(path, i, axis)
+            value = path[i][axis]
+            while True:
+                # skip all q whose escape line cannot reach any segment
+                value = next_covered(index, value, step)
+                if value is None or (path[i + 1][axis] - value) * step <= 0:
+                    break
+                if axis is y:
+                    q = (path[i][x], value)
                 else:
-                    if path[i][x] < path[i + 1][x]:
-                        q = (path[i][0] + m, path[i][y])
-                        if q[x] >= path[i + 1][x]:
-                            break
-                    else:
-                        q = (path[i][0] - m, path[i][y])
-                        if q[x] <= path[i + 1][x]:
-                            break
-                    # vertical escape line through q
-                    k = get_escape_line(q, vertical)
+                    q = (value, path[i][y])
+                k = get_escape_line(q, orientation)
                 j = i + 2
                 while j < len(path) - 1:
                     test_line = get_normalize_line((path[j], path[j + 1]))
                     if do_lines_intersect(k, test_line):
                         p_prime = get_intersect_point(k, test_line)
-                        if m == 0:
+                        if q == path[i]:
                             del path[i + 2:j + 1]
                             path[i + 1] = p_prime
                         else:
@@ -390,6 +447,7 @@ def hightower_line_search(point_a, point_b, get_obj_at_point, search_rect,
                         break
                     j += 2
                 else:
+                    value += step
                     continue
                 break
                 # TODO: H
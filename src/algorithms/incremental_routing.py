@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Adapts a known path to a moved end point.
+
+While a line is drawn its end point follows the mouse, usually by a few
+grid points at a time. The path to the new end point is mostly the path to
+the old end point with the last one or two segments changed, which is much
+cheaper to check than to search for.
+'''
+
+from algorithms.hightower import LineEdge, Solid
+
+
+def _normalize(path):
+    """
+    Removes repeated and collinear points.
+
+    :return: Normalized path or None if the path reverses its direction.
+    """
+    result = []
+    for point in path:
+        if result and result[-1] == point:
+            continue
+        if len(result) >= 2:
+            before, middle = result[-2], result[-1]
+            if before[0] == middle[0] == point[0] or \
+                    before[1] == middle[1] == point[1]:
+                if (middle[0] - before[0]) * (point[0] - middle[0]) < 0 or \
+                        (middle[1] - before[1]) * (point[1] - middle[1]) < 0:
+                    return None  # goes back on itself
+                result[-1] = point
+                continue
+        result.append(point)
+    if len(result) == 1:
+        result.append(result[0])
+    return result
+
+
+def is_valid_path(path, get_obj_at_point, search_rect):
+    """
+    Checks a path the way the hightower algorithm would have built it.
+
+    The path consists of horizontal and vertical segments inside the
+    search_rect. It only bends and ends on free points, never crosses
+    LineEdge or Solid and never visits a point twice.
+
+    :param path: List of points as tuples (int, int)
+    :param get_obj_at_point: (x, y) -> CollisionObject or None
+    :param search_rect: [(left, top), (right, bottom)], borders included
+    :return: True if the path is valid
+    """
+    (left, top), (right, bottom) = search_rect
+    visited = set()
+    for start, end in zip(path, path[1:]):
+        if start[0] != end[0] and start[1] != end[1]:
+            return False
+        dx = (end[0] > start[0]) - (end[0] < start[0])
+        dy = (end[1] > start[1]) - (end[1] < start[1])
+        point = start
+        while True:
+            if not (left <= point[0] <= right and top <= point[1] <= bottom):
+                return False
+            obj = get_obj_at_point(point)
+            if point == start or point == end:
+                if obj is not None:
+                    return False
+            elif obj in (LineEdge, Solid):
+                return False
+            if point == end:
+                break
+            if point in visited:
+                return False
+            visited.add(point)
+            point = (point[0] + dx, point[1] + dy)
+    return path[-1] not in visited
+
+
+def adapt_path(path, point_b, get_obj_at_point, search_rect):
+    """
+    Adapts the path to end at point_b instead.
+
+    First the last segment is extended or shortened. If point_b is not in
+    line with the last segment, the last bend is moved instead. The result
+    has at most as many bends as the given path.
+
+    :param path: Previous path as list of points as tuples (int, int)
+    :param point_b: New end point as tuple (int, int)
+    :param get_obj_at_point: (x, y) -> CollisionObject or None
+    :param search_rect: [(left, top), (right, bottom)], borders included
+    :return: Adapted path or None if there is no valid one
+    """
+    if len(path) < 2 or path[-2] == path[-1]:
+        return None
+
+    last, before = path[-1], path[-2]
+    horizontal = before[1] == last[1]
+
+    if (point_b[1] == last[1]) if horizontal else (point_b[0] == last[0]):
+        candidate = path[:-1] + [point_b]
+    elif len(path) >= 3:
+        if horizontal:
+            bend = (before[0], point_b[1])
+        else:
+            bend = (point_b[0], before[1])
+        candidate = path[:-2] + [bend, point_b]
+    else:
+        return None
+
+    candidate = _normalize(candidate)
+    if candidate is not None and \
+            is_valid_path(candidate, get_obj_at_point, search_rect):
+        return candidate
+    return None
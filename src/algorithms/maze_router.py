@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Maze router finding a path between two points on a 2D grid.
+
+Unlike the hightower algorithm it always finds a path if there is one.
+It is slower and used when the hightower algorithm fails.
+'''
+
+import heapq
+
+from algorithms.hightower import PassableLine, LineEdge, Solid
+
+
+def maze_line_search(point_a, point_b, get_obj_at_point, search_rect,
+                     bend_cost=None):
+    """ Finds path with few bends from point A to B on a 2D grid.
+
+    A* search over the grid points, each point either reached horizontally
+    or vertically. Every step costs one, every bend bend_cost. Paths may
+    cross PassableLine but only bend on free points. LineEdge and Solid
+    are never crossed.
+
+    Based on:
+        C. Y. Lee. 1961. An Algorithm for Path Connections and Its
+        Applications. IRE Transactions on Electronic Computers,
+        EC-10(3), 346-365.
+
+    Args:
+        point_a (tuple): Point A
+        point_b (tuple): Point B
+        get_obj_at_point (function): function used to probe the grid weather
+                it is free or taken by an object, as for the hightower
+                algorithm. Each point is probed at most once.
+                (x, y) -> CollisionObject or None
+        search_rect [(top_left), (bottom_right)]: list of two points (tuple)
+                that define the search area. The borders are included.
+        bend_cost (int): cost of a bend in grid points. Defaults to the
+                width plus the height of the search_rect, so that fewer
+                bends are preferred over shorter paths.
+
+    Return:
+        Path as list of tuples or None if there is none
+    """
+    (left, top), (right, bottom) = search_rect
+    width = right - left + 1
+    height = bottom - top + 1
+    if bend_cost is None:
+        bend_cost = width + height
+
+    def is_point_in_bounds(point):
+        return left <= point[0] <= right and top <= point[1] <= bottom
+
+    if not (is_point_in_bounds(point_a) and is_point_in_bounds(point_b) and
+            get_obj_at_point(point_a) is None and
+            get_obj_at_point(point_b) is None):
+        return None
+    if point_a == point_b:
+        return [point_a, point_b]
+
+    # point index * 2 + orientation, with orientation 0 for horizontal
+    # and 1 for vertical. The search only visits a small part of large
+    # search rects, so the states are kept in dictionaries instead of
+    # arrays covering the whole rect.
+    horizontal, vertical = 0, 1
+    free, passable, blocked = 1, 2, 3
+    kind = {}  # point index -> probed collision object
+    closed = set()
+    cost = {}
+    parent = {}
+    kinds = {None: free, PassableLine: passable, LineEdge: blocked,
+             Solid: blocked}
+
+    def get_kind(index):
+        k = kind.get(index)
+        if k is None:
+            k = kind[index] = kinds[get_obj_at_point(
+                (left + index % width, top + index // width))]
+        return k
+
+    goal_x, goal_y = point_b
+    goal = (goal_y - top) * width + goal_x - left
+
+    def heuristic(state):
+        index, orientation = divmod(state, 2)
+        dx = goal_x - left - index % width
+        dy = goal_y - top - index // width
+        # a bend is needed to move perpendicular to the orientation
+        needs_bend = dy if orientation == horizontal else dx
+        return abs(dx) + abs(dy) + (bend_cost if needs_bend else 0)
+
+    start = (point_a[1] - top) * width + point_a[0] - left
+    queue = []
+    for orientation in (horizontal, vertical):
+        state = 2 * start + orientation
+        cost[state] = 0
+        heapq.heappush(queue, (heuristic(state), 0, state))
+
+    # neighbours along each orientation
+    steps = {horizontal: ((-1, 0), (1, 0)), vertical: ((0, -1), (0, 1))}
+
+    found = None
+    while queue:
+        _, g, state = heapq.heappop(queue)
+        if state in closed:
+            continue
+        closed.add(state)
+        index, orientation = divmod(state, 2)
+        if index == goal:
+            found = state
+            break
+
+        x, y = index % width, index // width
+        successors = []
+        for dx, dy in steps[orientation]:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height:
+                successors.append((2 * (ny * width + nx) + orientation, 1))
+        if get_kind(index) == free:
+            successors.append((state ^ 1, bend_cost))
+
+        for successor, step_cost in successors:
+            if successor in closed or get_kind(successor // 2) == blocked:
+                continue
+            new_cost = g + step_cost
+            if new_cost < cost.get(successor, new_cost + 1):
+                cost[successor] = new_cost
+                parent[successor] = state
+                heapq.heappush(queue, (new_cost + heuristic(successor),
+                                       new_cost, successor))
+
+    if found is None:
+        return None
+
+    # collect the points at which the orientation changes
+    path = [point_b]
+    state = found
+    while state in parent:
+        previous = parent[state]
+        if previous // 2 == state // 2:  # bend
+            index = state // 2
+            path.append((left + index % width, top + index // width))
+        state = previous
+    path.append(point_a)
+    path.reverse()
+    return path
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Incrementally maintained index of the collision objects on the grid.
+
+Every row and every column keeps sorted runs of occupied points and of
+blocking points (LineEdge or Solid). Finding the next blocking point or the
+last free point of an escape line is a binary search in these runs instead
+of probing point by point.
+
+The index is updated while items are added, moved or removed. Routing
+works on a view of the index restricted to a search rectangle. Views see
+the index as it was when they were created.
+'''
+
+from bisect import bisect_right
+
+from algorithms.hightower import PassableLine, LineEdge, Solid
+
+# Codes ordered by precedence when several objects share a point
+FREE, PASSABLE, EDGE, SOLID = 0, 1, 2, 3
+
+_CODES = {PassableLine: PASSABLE, LineEdge: EDGE, Solid: SOLID}
+_OBJECTS = (None, PassableLine, LineEdge, Solid)
+
+
+class _Runs:
+    """
+    Set of integers stored as sorted, non-adjacent runs [start, end].
+    """
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, starts=None, ends=None):
+        self.starts = starts if starts is not None else []
+        self.ends = ends if ends is not None else []
+
+    def copy(self):
+        return _Runs(self.starts[:], self.ends[:])
+
+    def _index(self, value):
+        """Index of the last run starting at or before value or -1."""
+        return bisect_right(self.starts, value) - 1
+
+    def run_at(self, value):
+        """
+        :return: (start, end) of the run containing value or None
+        """
+        i = self._index(value)
+        if i >= 0 and self.ends[i] >= value:
+            return self.starts[i], self.ends[i]
+        return None
+
+    def add(self, value):
+        i = self._index(value)
+        if i >= 0 and self.ends[i] >= value:
+            return
+        join_left = i >= 0 and self.ends[i] == value - 1
+        join_right = i + 1 < len(self.starts) and \
+            self.starts[i + 1] == value + 1
+        if join_left and join_right:
+            self.ends[i] = self.ends[i + 1]
+            del self.starts[i + 1]
+            del self.ends[i + 1]
+        elif join_left:
+            self.ends[i] = value
+        elif join_right:
+            self.starts[i + 1] = value
+        else:
+            self.starts.insert(i + 1, value)
+            self.ends.insert(i + 1, value)
+
+    def remove(self, value):
+        i = self._index(value)
+        if i < 0 or self.ends[i] < value:
+            return
+        start, end = self.starts[i], self.ends[i]
+        if start == end:
+            del self.starts[i]
+            del self.ends[i]
+        elif value == start:
+            self.starts[i] = value + 1
+        elif value == end:
+            self.ends[i] = value - 1
+        else:
+            self.ends[i] = value - 1
+            self.starts.insert(i + 1, value + 1)
+            self.ends.insert(i + 1, end)
+
+    def next_after(self, value, up_or_left):
+        """
+        :return: Nearest member beyond value in the given direction or None
+        """
+        if up_or_left:
+            i = self._index(value - 1)
+            if i < 0:
+                return None
+            return min(self.ends[i], value - 1)
+        else:
+            run = self.run_at(value + 1)
+            if run is not None:
+                return value + 1
+            i = self._index(value) + 1
+            return self.starts[i] if i < len(self.starts) else None
+
+
+class _Line:
+    """
+    Collision objects of a single row or column.
+    """
+    __slots__ = ('codes', 'occupied', 'blocked', 'generation')
+
+    def __init__(self, generation):
+        self.codes = {}  # position -> code
+        self.occupied = _Runs()
+        self.blocked = _Runs()
+        self.generation = generation
+
+    def copy(self, generation):
+        line = _Line(generation)
+        line.codes = self.codes.copy()
+        line.occupied = self.occupied.copy()
+        line.blocked = self.blocked.copy()
+        return line
+
+    def set(self, position, code):
+        if code == FREE:
+            self.codes.pop(position, None)
+            self.occupied.remove(position)
+        else:
+            self.codes[position] = code
+            self.occupied.add(position)
+        if code >= EDGE:
+            self.blocked.add(position)
+        else:
+            self.blocked.remove(position)
+
+
+_EMPTY_LINE = _Line(-1)
+
+
+class ObstacleIndex:
+    """
+    Collision objects on the grid, indexed by row and column.
+
+    Objects are reference counted. A point holding several objects reports
+    the one with the highest precedence: Solid before LineEdge before
+    PassableLine.
+    """
+
+    def __init__(self):
+        self._counts = {}  # point -> [passable, edge, solid] counts
+        self._rows = {}  # y -> _Line indexed by x
+        self._columns = {}  # x -> _Line indexed by y
+        # lines of older generations may be shared with views
+        self._generation = 0
+        # incremented on every change
+        self.version = 0
+
+    def __call__(self, point):
+        """
+        :param point: Point in grid coordinates as tuple (int, int)
+        :return: CollisionObject class at point or None
+        """
+        return _OBJECTS[self._rows.get(point[1], _EMPTY_LINE).codes.get(
+            point[0], FREE)]
+
+    def items(self):
+        """
+        :return: iterator over (point, CollisionObject class) of all
+            occupied points
+        """
+        for point in self._counts:
+            yield point, self(point)
+
+    def add(self, point, obj):
+        """
+        Adds a collision object at point.
+
+        :param point: Point in grid coordinates as tuple (int, int)
+        :param obj: CollisionObject class
+        """
+        counts = self._counts.setdefault(point, [0, 0, 0])
+        counts[_CODES[obj] - 1] += 1
+        self._update(point, counts)
+        self.version += 1
+
+    def remove(self, point, obj):
+        """
+        Removes a collision object previously added at point.
+
+        :param point: Point in grid coordinates as tuple (int, int)
+        :param obj: CollisionObject class
+        """
+        counts = self._counts[point]
+        counts[_CODES[obj] - 1] -= 1
+        assert counts[_CODES[obj] - 1] >= 0
+        if not any(counts):
+            del self._counts[point]
+        self._update(point, counts)
+        self.version += 1
+
+    def _update(self, point, counts):
+        code = SOLID if counts[2] else EDGE if counts[1] else \
+            PASSABLE if counts[0] else FREE
+        if self(point) != _OBJECTS[code]:
+            x, y = point
+            self._writable_line(self._rows, y).set(x, code)
+            self._writable_line(self._columns, x).set(y, code)
+
+    def _writable_line(self, lines, key):
+        line = lines.get(key)
+        if line is None:
+            line = lines[key] = _Line(self._generation)
+        elif line.generation != self._generation:
+            line = lines[key] = line.copy(self._generation)
+        return line
+
+    def view(self, rect, overrides=None):
+        """
+        Snapshot of the index restricted to a rectangle.
+
+        :param rect: [(left, top), (right, bottom)] grid points of the view.
+            The borders are included.
+        :param overrides: Optional dictionary mapping points to the
+            CollisionObject class or None the view reports instead.
+        :return: ObstacleView
+        """
+        view = ObstacleView(self._rows, self._columns, rect,
+                            self._generation)
+        # lines of the current generation are now shared with the view
+        self._generation += 1
+        for point, obj in (overrides or {}).items():
+            view.set(point, obj)
+        return view
+
+
+class ObstacleView:
+    """
+    Collision objects of a rectangle of the grid.
+
+    The view can be used as get_obj_at_point function of the hightower
+    algorithm and provides the ends of escape lines and cover lines with
+    escape_line_end and cover_bound.
+    """
+
+    def __init__(self, rows, columns, rect, generation):
+        self._rows = rows.copy()
+        self._columns = columns.copy()
+        # lines of this generation are owned by the view
+        self._generation = generation + 0.5
+        (self.left, self.top), (self.right, self.bottom) = rect
+
+    @property
+    def rect(self):
+        return [(self.left, self.top), (self.right, self.bottom)]
+
+    def is_point_in_bounds(self, point):
+        return (self.left <= point[0] <= self.right and
+                self.top <= point[1] <= self.bottom)
+
+    def __call__(self, point):
+        """
+        :param point: Point in grid coordinates as tuple (int, int)
+        :return: CollisionObject class at point or None
+        """
+        return _OBJECTS[self._rows.get(point[1], _EMPTY_LINE).codes.get(
+            point[0], FREE)]
+
+    def set(self, point, obj):
+        """
+        Replaces whatever the view holds at point.
+
+        :param point: Point in grid coordinates as tuple (int, int)
+        :param obj: CollisionObject class or None
+        """
+        code = FREE if obj is None else _CODES[obj]
+        x, y = point
+        for lines, key, position in ((self._rows, y, x),
+                                     (self._columns, x, y)):
+            line = lines.get(key)
+            if line is None:
+                line = lines[key] = _Line(self._generation)
+            elif line.generation != self._generation:
+                line = lines[key] = line.copy(self._generation)
+            line.set(position, code)
+
+    def _line(self, point, horizontal):
+        """
+        :return: (line, position on line, first, last position in bounds)
+        """
+        if horizontal:
+            return (self._rows.get(point[1], _EMPTY_LINE), point[0],
+                    self.left, self.right)
+        else:
+            return (self._columns.get(point[0], _EMPTY_LINE), point[1],
+                    self.top, self.bottom)
+
+    @staticmethod
+    def _point(point, horizontal, position):
+        if horizontal:
+            return (position, point[1])
+        else:
+            return (point[0], position)
+
+    def next_blocked(self, point, horizontal, up_or_left):
+        """
+        Returns the next LineEdge or Solid from point in the given direction.
+
+        :param point: Point in grid coordinates as tuple (int, int)
+        :param horizontal: True to search along the row
+        :param up_or_left: True to search to the left or the top
+        :return: Point as tuple (int, int) or None if there is none
+        """
+        line, position, _, _ = self._line(point, horizontal)
+        found = line.blocked.next_after(position, up_or_left)
+        if found is None:
+            return None
+        return self._point(point, horizontal, found)
+
+    def _escape_position(self, line, position, first, last, up_or_left):
+        """
+        :return: Position of the end of the escape line on line
+        """
+        blocked = line.blocked.next_after(position, up_or_left)
+        if up_or_left:
+            limit = first if blocked is None else max(first, blocked + 1)
+            if limit >= position:
+                return position
+            run = line.occupied.run_at(limit)
+            end = limit if run is None else run[1] + 1
+            return end if end < position else position
+        else:
+            limit = last if blocked is None else min(last, blocked - 1)
+            if limit <= position:
+                return position
+            run = line.occupied.run_at(limit)
+            end = limit if run is None else run[0] - 1
+            return end if end > position else position
+
+    def escape_line_end(self, point, horizontal, up_or_left):
+        """
+        Returns the end of the escape line from point in the given direction.
+
+        The escape line runs till the next LineEdge, Solid or the border of
+        the view. Its end is the last free point before that or point
+        itself if there is none.
+
+        :param point: Start of the escape line as tuple (int, int)
+        :param horizontal: True for horizontal escape lines
+        :param up_or_left: True to escape to the left or the top
+        :return: End point as tuple (int, int)
+        """
+        if not self.is_point_in_bounds(point):
+            return point  # all points of a line outside are outside
+
+        line, position, first, last = self._line(point, horizontal)
+        return self._point(point, horizontal, self._escape_position(
+            line, position, first, last, up_or_left))
+
+    def cover_bound(self, point, horizontal, up_or_left, to_up_or_left):
+        """
+        Returns the end of a cover line from point in the given direction.
+
+        The cover line extends as long as no escape line perpendicular to
+        it can leave it in direction to_up_or_left, but at most till the
+        border of the view.
+
+        :param point: Start of the cover line as tuple (int, int)
+        :param horizontal: True for horizontal cover lines
+        :param up_or_left: True to extend to the left or the top
+        :param to_up_or_left: Direction of the perpendicular escape lines
+        :return: End point as tuple (int, int)
+        """
+        step = -1 if up_or_left else 1
+        _, position, first, last = self._line(point, horizontal)
+        # the line next to the cover decides where escape lines leave it
+        neighbour = self._point(point, not horizontal,
+                                (point[1] if horizontal else point[0]) +
+                                (-1 if to_up_or_left else 1))
+        line, _, _, _ = self._line(neighbour, horizontal)
+
+        def escapes(position):
+            start = self._point(point, horizontal, position)
+            return self.escape_line_end(start, not horizontal,
+                                        to_up_or_left) != start
+
+        if not self.is_point_in_bounds(self._point(neighbour, horizontal,
+                                                   position)):
+            # nothing escapes, runs till the border
+            return self._point(point, horizontal,
+                               first if up_or_left else last)
+
+        current = position + step
+        while first <= current <= last:
+            run = line.occupied.run_at(current)
+            if run is None:
+                break  # free neighbour escapes
+            run_end = run[0] if up_or_left else run[1]
+            # only passable neighbours might escape
+            while current != run_end + step:
+                blocked = line.blocked.run_at(current)
+                if blocked is not None:
+                    current = (blocked[0] if up_or_left else
+                               blocked[1]) + step
+                    continue
+                if not first <= current <= last or escapes(current):
+                    break
+                current += step
+            else:
+                continue  # free position right after the run escapes
+            break
+
+        current = min(max(current, first - 1), last + 1)
+        return self._point(point, horizontal, current - step)
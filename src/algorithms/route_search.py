@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Search for a line route on an obstacle snapshot.
+
+The search only reads the snapshot, so it can run on any thread while the
+scene keeps changing. It first tries to follow a previous path, then runs
+the hightower algorithm and finally falls back to the maze router. Followed
+paths are only used while they stay close to a lower bound of the best
+path, otherwise they would drift further and further from it.
+'''
+
+from algorithms.hightower import hightower_line_search
+from algorithms.incremental_routing import adapt_path
+from algorithms.maze_router import maze_line_search
+from helper.cancellation import cancellable
+from helper.time_limited import time_limited, TimeReached
+
+
+class RouteSearch:
+    """
+    Search job from a start to an end point.
+    """
+    def __init__(self, p_start, p_end, obstacles, search_rect,
+                 previous_path=None, max_line_search_time=None,
+                 max_maze_search_time=None, max_extra_bends=2,
+                 max_detour=10):
+        """
+        :param p_start: Start point in grid coordinates as tuple (int, int)
+        :param p_end: End point in grid coordinates as tuple (int, int)
+        :param obstacles: Snapshot like ObstacleView, that is never changed
+            while the search runs
+        :param search_rect: [(left, top), (right, bottom)] of the search
+        :param previous_path: Path to a nearby end point, followed if
+            possible
+        :param max_line_search_time: Time budget of the hightower algorithm
+        :param max_maze_search_time: Time budget of the maze router
+        :param max_extra_bends: Bends the followed path may have in
+            addition to the fewest possible
+        :param max_detour: Grid points the followed path may be longer
+            than the manhattan distance of the end points
+        """
+        self.p_start = p_start
+        self.p_end = p_end
+        self.obstacles = obstacles
+        self.search_rect = search_rect
+        self.previous_path = previous_path
+        self.max_line_search_time = max_line_search_time
+        self.max_maze_search_time = max_maze_search_time
+        self.max_extra_bends = max_extra_bends
+        self.max_detour = max_detour
+
+    def _is_close_to_best(self, path):
+        """
+        Compares the path with a cheap lower bound of any path between the
+        end points: their manhattan distance and no bend if they are in
+        line or a single one otherwise.
+
+        :param path: Normalized path from p_start to p_end
+        :return: True if the path is within max_extra_bends and max_detour
+            of the lower bound
+        """
+        (x1, y1), (x2, y2) = self.p_start, self.p_end
+        min_bends = 0 if x1 == x2 or y1 == y2 else 1
+        if len(path) - 2 > min_bends + self.max_extra_bends:
+            return False
+
+        length = sum(abs(b[0] - a[0]) + abs(b[1] - a[1])
+                     for a, b in zip(path, path[1:]))
+        return length <= abs(x2 - x1) + abs(y2 - y1) + self.max_detour
+
+    def run(self, token=None):
+        """
+        Searches the path.
+
+        :param token: CancellationToken stopping the search or None
+        :return: Path as list of points as tuples (int, int) or None
+        :raises Cancelled: when the token was cancelled
+        """
+        obstacles = self.obstacles
+
+        if self.previous_path is not None and \
+                self.previous_path[0] == self.p_start:
+            res = adapt_path(self.previous_path, self.p_end, obstacles,
+                             self.search_rect)
+            if res is not None and self._is_close_to_best(res):
+                return res
+
+        def limited(fun, lifetime):
+            return time_limited(cancellable(fun, token), lifetime)
+
+        lifetime = self.max_line_search_time
+        try:
+            res = hightower_line_search(
+                self.p_start, self.p_end, limited(obstacles, lifetime),
+                self.search_rect,
+                get_escape_line_end=limited(obstacles.escape_line_end,
+                                            lifetime),
+                get_cover_bound=limited(obstacles.cover_bound, lifetime))
+        except TimeReached:
+            res = None
+
+        # fall back to the slower maze router, which always finds
+        #     existing paths
+        if res is None:
+            try:
+                res = maze_line_search(
+                    self.p_start, self.p_end,
+                    limited(obstacles, self.max_maze_search_time),
+                    self.search_rect)
+            except TimeReached:
+                res = None
+        return res
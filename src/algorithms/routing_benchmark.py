@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Benchmark of the routing engines on a corpus of obstacle maps.
+
+Each engine routes the same queries, point pairs, on every map. Latencies,
+path quality (length and bends) and failures are recorded per engine and
+map. Run from the src directory with
+
+    python -m algorithms.routing_benchmark [--corpus DIR] [--quick]
+
+Maps captured from a scene with map_from_scene and save_map are loaded
+from the corpus directory next to the synthetic maps. By default these are
+the maps in the routing_maps directory of this package.
+
+Engines that can't be time limited are skipped on maps larger than their
+limit in UNLIMITED_ENGINES.
+'''
+
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import time
+
+from algorithms.hightower import (hightower_line_search, PassableLine,
+                                  LineEdge, Solid)
+from algorithms.obstacle_index import ObstacleIndex
+from algorithms.maze_router import maze_line_search
+from algorithms.route_search import RouteSearch
+from algorithms.steiner_router import steiner_tree_search
+from algorithms.batch_router import route_nets
+from helper.time_limited import time_limited, TimeReached
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'routing_maps')
+
+_KIND_NAMES = {Solid: 'solid', LineEdge: 'edge', PassableLine: 'line'}
+_KINDS = {name: kind for kind, name in _KIND_NAMES.items()}
+
+
+class ObstacleMap:
+    """
+    Obstacles on the grid together with the queries routed on them.
+    """
+    def __init__(self, name, blocks, rect, queries=None, seed=0,
+                 query_count=20):
+        """
+        :param name: Name used in reports
+        :param blocks: Dictionary mapping points to CollisionObject classes
+        :param rect: [(left, top), (right, bottom)] search rect of queries
+        :param queries: List of (point_a, point_b) or None to pick
+            query_count pairs of free points at random.
+        """
+        self.name = name
+        self.blocks = blocks
+        self.rect = rect
+        if queries is None:
+            queries = self._random_queries(random.Random(seed), query_count)
+        self.queries = queries
+        self._view = None
+
+    def _random_queries(self, rng, count):
+        (left, top), (right, bottom) = self.rect
+        queries = []
+        while len(queries) < count:
+            point_a, point_b = [(rng.randint(left + 1, right - 1),
+                                 rng.randint(top + 1, bottom - 1))
+                                for _ in range(2)]
+            if point_a != point_b and point_a not in self.blocks and \
+                    point_b not in self.blocks:
+                queries.append((point_a, point_b))
+        return queries
+
+    def view(self):
+        """
+        :return: ObstacleView of the map, created once
+        """
+        if self._view is None:
+            index = ObstacleIndex()
+            for point, obj in self.blocks.items():
+                index.add(point, obj)
+            self._view = index.view(self.rect)
+        return self._view
+
+
+def save_map(obstacle_map, path):
+    """Stores the map as JSON file."""
+    with open(path, 'w') as file:
+        json.dump({
+            'name': obstacle_map.name,
+            'rect': obstacle_map.rect,
+            'blocks': [[x, y, _KIND_NAMES[obj]]
+                       for (x, y), obj in sorted(obstacle_map.blocks.items(),
+                                                 key=lambda item: item[0])],
+            'queries': obstacle_map.queries
+        }, file)
+
+
+def load_map(path):
+    """Loads a map stored by save_map."""
+    with open(path) as file:
+        data = json.load(file)
+    return ObstacleMap(
+        data['name'], {(x, y): _KINDS[kind] for x, y, kind in data['blocks']},
+        [tuple(point) for point in data['rect']],
+        [(tuple(a), tuple(b)) for a, b in data['queries']])
+
+
+def map_from_scene(scene, name, query_count=20, seed=0):
+    """
+    Captures the obstacles of the items in a GridScene.
+
+    :return: ObstacleMap with random queries
+    """
+    bound_rect = scene.itemsBoundingRect()
+    left, top = scene.to_grid(bound_rect.topLeft())
+    right, bottom = scene.to_grid(bound_rect.bottomRight())
+    return ObstacleMap(name, dict(scene.obstacle_index().items()),
+                       [(left - 2, top - 2), (right + 2, bottom + 2)],
+                       seed=seed, query_count=query_count)
+
+
+def random_map(name, width, height, density, seed=0, query_count=20):
+    """Map with randomly placed Solid points."""
+    rng = random.Random(seed)
+    blocks = {}
+    for _ in range(int(width * height * density)):
+        blocks[(rng.randrange(1, width - 1),
+                rng.randrange(1, height - 1))] = Solid
+    return ObstacleMap(name, blocks, [(0, 0), (width - 1, height - 1)],
+                       seed=seed, query_count=query_count)
+
+
+def schematic_map(name, width, height, seed=0, query_count=20):
+    """Map with items as Solid rectangles and lines between them."""
+    rng = random.Random(seed)
+    blocks = {}
+    for _ in range(width * height // 150):
+        x, y = rng.randrange(2, width - 6), rng.randrange(2, height - 7)
+        for dx in range(3):
+            for dy in range(4):
+                blocks[(x + dx, y + dy)] = Solid
+    for _ in range(width * height // 300):
+        x, y = rng.randrange(1, width - 1), rng.randrange(1, height - 1)
+        horizontal = rng.random() < 0.5
+        length = rng.randrange(3, 30)
+        points = [(x + i, y) if horizontal else (x, y + i)
+                  for i in range(length)]
+        points = [p for p in points if p[0] < width - 1 and
+                  p[1] < height - 1]
+        for point in points:
+            if point not in blocks:
+                blocks[point] = PassableLine
+        for point in (points[0], points[-1]):
+            if blocks[point] is PassableLine:
+                blocks[point] = LineEdge
+    return ObstacleMap(name, blocks, [(0, 0), (width - 1, height - 1)],
+                       seed=seed, query_count=query_count)
+
+
+def maze_map(name, width, height, seed=0, query_count=20):
+    """Maze of one point wide corridors with a few loops."""
+    rng = random.Random(seed)
+    cells_x, cells_y = (width - 1) // 2, (height - 1) // 2
+    blocks = {(x, y): Solid for x in range(1, 2 * cells_x)
+              for y in range(1, 2 * cells_y)}
+    visited = {(0, 0)}
+    pending = [(0, 0)]
+    while pending:
+        cx, cy = pending[-1]
+        neighbours = [(cx + dx, cy + dy)
+                      for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                      if 0 <= cx + dx < cells_x and 0 <= cy + dy < cells_y and
+                      (cx + dx, cy + dy) not in visited]
+        if not neighbours:
+            pending.pop()
+            continue
+        nx, ny = rng.choice(neighbours)
+        visited.add((nx, ny))
+        pending.append((nx, ny))
+        for point in ((2 * cx + 1, 2 * cy + 1), (cx + nx + 1, cy + ny + 1),
+                      (2 * nx + 1, 2 * ny + 1)):
+            blocks.pop(point, None)
+    # open some walls so there is more than one way
+    for point in rng.sample(sorted(blocks), len(blocks) // 20):
+        del blocks[point]
+    return ObstacleMap(name, blocks, [(0, 0), (width - 1, height - 1)],
+                       seed=seed, query_count=query_count)
+
+
+def default_corpus(quick=False):
+    """
+    Synthetic maps. The quick corpus leaves out the large map.
+    """
+    corpus = [random_map('sparse', 200, 150, 0.05),
+              random_map('dense', 200, 150, 0.3),
+              schematic_map('schematic', 200, 150),
+              maze_map('maze', 101, 75)]
+    if not quick:
+        corpus.append(random_map('large', 2000, 2000, 0.02, query_count=5))
+    return corpus
+
+
+def _tree_to_path(tree):
+    path = []
+    while tree:
+        (point, tree), = tree.items()
+        path.append(point)
+    return path
+
+
+# Engines route from point_a to point_b of a query. They return the path
+# as list of points or None.
+ENGINES = {
+    'hightower': lambda q: hightower_line_search(
+        q.point_a, q.point_b, q.get_obj_at_point, q.rect),
+    'hightower-no-refinement': lambda q: hightower_line_search(
+        q.point_a, q.point_b, q.get_obj_at_point, q.rect,
+        do_second_refinement=False),
+    'hightower-index': lambda q: hightower_line_search(
+        q.point_a, q.point_b, q.get_obj_at_point, q.rect,
+        get_escape_line_end=q.escape_line_end, get_cover_bound=q.cover_bound),
+    'maze': lambda q: maze_line_search(
+        q.point_a, q.point_b, q.get_obj_at_point, q.rect),
+    'route-search': lambda q: RouteSearch(
+        q.point_a, q.point_b, q, q.rect).run(),
+    'steiner': lambda q: _tree_to_path(steiner_tree_search(
+        [q.point_a, q.point_b], q.get_obj_at_point, q.rect) or {}) or None,
+    'batch': lambda q: _tree_to_path(route_nets(
+        {0: [q.point_a, q.point_b]}, q.blocks, q.rect,
+        margin=max(q.rect[1][0] - q.rect[0][0],
+                   q.rect[1][1] - q.rect[0][1]))[0] or {}) or None,
+}
+
+# Engines that are not time limited -> largest map area they are run on
+UNLIMITED_ENGINES = {'batch': 500 * 500}
+
+
+def map_area(obstacle_map):
+    (left, top), (right, bottom) = obstacle_map.rect
+    return (right - left + 1) * (bottom - top + 1)
+
+
+class Query:
+    """
+    Query as seen by the engines. All probes of the obstacles are time
+    limited.
+    """
+    def __init__(self, obstacle_map, point_a, point_b, timeout):
+        self.point_a = point_a
+        self.point_b = point_b
+        self.rect = obstacle_map.rect
+        self.blocks = obstacle_map.blocks
+        view = obstacle_map.view()
+        self.get_obj_at_point = time_limited(view, timeout)
+        self.escape_line_end = time_limited(view.escape_line_end, timeout)
+        self.cover_bound = time_limited(view.cover_bound, timeout)
+        self.is_point_in_bounds = view.is_point_in_bounds
+
+    def __call__(self, point):
+        return self.get_obj_at_point(point)
+
+
+class Result:
+    """
+    Measurements of one engine on one map.
+    """
+    def __init__(self, engine, map_name):
+        self.engine = engine
+        self.map_name = map_name
+        self.latencies = []  # seconds of all queries
+        self.lengths = []  # of the found paths
+        self.bends = []  # of the found paths
+        self.failures = 0  # no path found
+        self.timeouts = 0
+        self.invalid = 0  # paths crossing obstacles or leaving the map
+
+    @property
+    def count(self):
+        return len(self.latencies)
+
+    def percentile(self, p):
+        """
+        :param p: Percentile between 0 and 100
+        :return: Latency in seconds, nearest rank
+        """
+        latencies = sorted(self.latencies)
+        rank = math.ceil(p / 100 * len(latencies))
+        return latencies[max(0, min(len(latencies), rank) - 1)]
+
+
+def path_length(path):
+    return sum(abs(a[0] - b[0]) + abs(a[1] - b[1])
+               for a, b in zip(path, path[1:]))
+
+
+def path_bends(path):
+    directions = [((b[0] > a[0]) - (b[0] < a[0]),
+                   (b[1] > a[1]) - (b[1] < a[1]))
+                  for a, b in zip(path, path[1:]) if a != b]
+    return sum(1 for d, e in zip(directions, directions[1:]) if d != e)
+
+
+def is_valid_path(path, point_a, point_b, blocks, rect):
+    """
+    Does the path connect the points without leaving rect or crossing Solid
+    or LineEdge.
+    """
+    (left, top), (right, bottom) = rect
+    if path[0] != point_a or path[-1] != point_b:
+        return False
+    for a, b in zip(path, path[1:]):
+        if a[0] != b[0] and a[1] != b[1]:
+            return False
+        dx = (b[0] > a[0]) - (b[0] < a[0])
+        dy = (b[1] > a[1]) - (b[1] < a[1])
+        point = a
+        while True:
+            if not (left <= point[0] <= right and top <= point[1] <= bottom) \
+                    or blocks.get(point) in (Solid, LineEdge):
+                return False
+            if point == b:
+                break
+            point = (point[0] + dx, point[1] + dy)
+    return True
+
+
+def run_benchmark(corpus, engines=None, timeout=5, repeat=1):
+    """
+    Routes all queries of the corpus with every engine.
+
+    :param corpus: List of ObstacleMap
+    :param engines: Names of ENGINES to run or None for all
+    :param timeout: Seconds after which a query is aborted
+    :param repeat: Number of times each query is routed
+    :return: List of Result. There is none for maps skipped by engines in
+        UNLIMITED_ENGINES.
+    """
+    results = []
+    for name in engines or sorted(ENGINES):
+        engine = ENGINES[name]
+        for obstacle_map in corpus:
+            if map_area(obstacle_map) > UNLIMITED_ENGINES.get(name, math.inf):
+                continue
+            obstacle_map.view()  # not part of the measurement
+            result = Result(name, obstacle_map.name)
+            for point_a, point_b in obstacle_map.queries:
+                for _ in range(repeat):
+                    query = Query(obstacle_map, point_a, point_b, timeout)
+                    start = time.perf_counter()
+                    try:
+                        path = engine(query)
+                    except TimeReached:
+                        path = None
+                        result.timeouts += 1
+                    result.latencies.append(time.perf_counter() - start)
+                    if path is None:
+                        result.failures += 1
+                    elif not is_valid_path(path, point_a, point_b,
+                                           obstacle_map.blocks,
+                                           obstacle_map.rect):
+                        result.invalid += 1
+                    else:
+                        result.lengths.append(path_length(path))
+                        result.bends.append(path_bends(path))
+            results.append(result)
+    return results
+
+
+def format_results(results):
+    """
+    :return: Table of the results as string
+    """
+    def mean(values):
+        return sum(values) / len(values) if values else float('nan')
+
+    lines = ["{:<24} {:<10} {:>5} {:>5} {:>5} {:>7} {:>8} {:>8} {:>8} "
+             "{:>8} {:>8} {:>6}".format(
+                 "engine", "map", "n", "fail", "t/o", "invalid", "p50 ms",
+                 "p90 ms", "p99 ms", "max ms", "length", "bends")]
+    for r in results:
+        lines.append(
+            "{:<24} {:<10} {:>5} {:>5} {:>5} {:>7} {:>8.2f} {:>8.2f} "
+            "{:>8.2f} {:>8.2f} {:>8.1f} {:>6.2f}".format(
+                r.engine, r.map_name, r.count, r.failures, r.timeouts,
+                r.invalid,
+                1000 * r.percentile(50), 1000 * r.percentile(90),
+                1000 * r.percentile(99), 1000 * max(r.latencies),
+                mean(r.lengths), mean(r.bends)))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--corpus', default=CORPUS_DIR,
+                        help="directory with captured maps")
+    parser.add_argument('--quick', action='store_true',
+                        help="leave out the large synthetic map")
+    parser.add_argument('--engine', action='append', choices=sorted(ENGINES),
+                        help="engine to run, all by default")
+    parser.add_argument('--timeout', type=float, default=5)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = default_corpus(args.quick)
+    if args.corpus:
+        corpus += [load_map(path) for path in
+                   sorted(glob.glob(os.path.join(args.corpus, '*.json')))]
+    print(format_results(run_benchmark(corpus, args.engine, args.timeout,
+                                       args.repeat)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Rectilinear Steiner tree router connecting many terminals at once.
+
+Instead of routing every sink separately and merging the lines, the tree
+grows from the source to the nearest unconnected terminal until all are
+connected. Afterwards paths between terminals and branches are ripped out
+one by one and reconnected whenever a cheaper connection exists.
+'''
+
+import heapq
+
+from algorithms.hightower import PassableLine, LineEdge, Solid
+
+FREE, PASSABLE, BLOCKED = 0, 1, 2
+HORIZONTAL, VERTICAL = 0, 1
+_KINDS = {None: FREE, PassableLine: PASSABLE, LineEdge: BLOCKED,
+          Solid: BLOCKED}
+_STEPS = {HORIZONTAL: ((-1, 0), (1, 0)), VERTICAL: ((0, -1), (0, 1))}
+
+
+def steiner_tree_search(terminals, get_obj_at_point, search_rect,
+                        bend_cost=3, max_passes=3):
+    """ Finds a tree with short lines and few bends connecting all terminals.
+
+    Paths may cross PassableLine, but only bend or branch on free points.
+    LineEdge and Solid are never crossed. Every step costs one, every bend
+    bend_cost.
+
+    Based on:
+        H. Takahashi and A. Matsuyama. 1980. An Approximate Solution for
+        the Steiner Problem in Graphs. Math. Japonica, 24(6), 573-577.
+
+    Args:
+        terminals (list): points (tuple) to connect. The first one is the
+                root of the tree.
+        get_obj_at_point (function): function used to probe the grid weather
+                it is free or taken by an object, as for the hightower
+                algorithm. (x, y) -> CollisionObject or None
+        search_rect [(top_left), (bottom_right)]: list of two points (tuple)
+                that define the search area. The borders are included.
+        bend_cost (int): cost of a bend in grid points
+        max_passes (int): number of passes reconnecting the paths of the
+                tree to improve it.
+
+    Return:
+        Tree as nested dictionaries mapping points to their children,
+        starting at the root. It has nodes at terminals, bends and
+        branches. Empty for a single terminal and None if there is no tree.
+    """
+    (left, top), (right, bottom) = search_rect
+    kinds = {}
+
+    def kind(point):
+        k = kinds.get(point)
+        if k is None:
+            if left <= point[0] <= right and top <= point[1] <= bottom:
+                k = _KINDS[get_obj_at_point(point)]
+            else:
+                k = BLOCKED
+            kinds[point] = k
+        return k
+
+    terminals = list(dict.fromkeys(terminals))
+    if any(kind(terminal) != FREE for terminal in terminals):
+        return None
+
+    if len(terminals) == 1:
+        return {}
+
+    root = terminals[0]
+    adjacency = {root: set()}  # point -> neighbouring points in the tree
+    remaining = set(terminals[1:])
+    while remaining:
+        path = _search(adjacency, remaining, kind, bend_cost)
+        if path is None:
+            return None
+        _add_path(adjacency, path)
+        remaining.discard(path[-1])
+
+    for _ in range(max_passes):
+        if not _improve(adjacency, set(terminals), kind, bend_cost):
+            break
+
+    return _to_tree(root, adjacency, set(terminals))
+
+
+def _search(sources, targets, kind, bend_cost, avoid=None):
+    """
+    A* search from any free point of sources to the nearest target.
+
+    :param sources: points the path starts from
+    :param targets: points the path ends at
+    :param avoid: points the path does not cross, defaults to sources
+    :return: path as list of all points it passes or None
+    """
+    if avoid is None:
+        avoid = sources
+
+    if len(targets) <= 16:
+        def heuristic(point):
+            return min(abs(point[0] - x) + abs(point[1] - y)
+                       for x, y in targets)
+    else:
+        t_left = min(x for x, _ in targets)
+        t_right = max(x for x, _ in targets)
+        t_top = min(y for _, y in targets)
+        t_bottom = max(y for _, y in targets)
+
+        def heuristic(point):
+            x, y = point
+            return max(t_left - x, 0, x - t_right) + \
+                max(t_top - y, 0, y - t_bottom)
+
+    best = {}
+    parent = {}
+    queue = []
+    for point in sources:
+        if kind(point) == FREE:
+            for orientation in (HORIZONTAL, VERTICAL):
+                best[(point, orientation)] = 0
+                heapq.heappush(queue, (heuristic(point), 0, point,
+                                       orientation))
+
+    while queue:
+        _, g, point, orientation = heapq.heappop(queue)
+        state = (point, orientation)
+        if g > best[state]:
+            continue
+        if point in targets:
+            path = [point]
+            while state in parent:
+                state = parent[state]
+                if state[0] != path[-1]:
+                    path.append(state[0])
+            path.reverse()
+            return path
+
+        successors = []
+        for dx, dy in _STEPS[orientation]:
+            successors.append(((point[0] + dx, point[1] + dy), orientation,
+                               g + 1))
+        if kind(point) == FREE:
+            successors.append((point, 1 - orientation, g + bend_cost))
+
+        for next_point, next_orientation, cost in successors:
+            if next_point != point and (
+                    kind(next_point) == BLOCKED or
+                    next_point in avoid and next_point not in targets):
+                continue
+            next_state = (next_point, next_orientation)
+            if cost < best.get(next_state, cost + 1):
+                best[next_state] = cost
+                parent[next_state] = state
+                heapq.heappush(queue, (cost + heuristic(next_point), cost,
+                                       next_point, next_orientation))
+    return None
+
+
+def _add_path(adjacency, path):
+    for point, next_point in zip(path, path[1:]):
+        adjacency.setdefault(point, set()).add(next_point)
+        adjacency.setdefault(next_point, set()).add(point)
+
+
+def _remove_path(adjacency, path):
+    for point, next_point in zip(path, path[1:]):
+        adjacency[point].discard(next_point)
+        adjacency[next_point].discard(point)
+    for point in path[1:-1]:
+        del adjacency[point]
+
+
+def _path_cost(path, bend_cost):
+    bends = sum(1 for a, b, c in zip(path, path[1:], path[2:])
+                if (a[0] == b[0]) != (b[0] == c[0]))
+    return len(path) - 1 + bend_cost * bends
+
+
+def _key_paths(adjacency, terminals):
+    """
+    Paths between terminals and branches. Their interior points have no
+    other connections.
+    """
+    def is_key(point):
+        return point in terminals or len(adjacency[point]) != 2
+
+    paths = []
+    seen = set()
+    for start in adjacency:
+        if not is_key(start):
+            continue
+        for first in adjacency[start]:
+            if (start, first) in seen:
+                continue
+            path = [start, first]
+            while not is_key(path[-1]):
+                path.append(next(point for point in adjacency[path[-1]]
+                                 if point != path[-2]))
+            seen.add((path[-1], path[-2]))
+            paths.append(path)
+    return paths
+
+
+def _improve(adjacency, terminals, kind, bend_cost):
+    """
+    Reconnects the parts of the tree if a path between them is cheaper.
+
+    :return: True if the tree was improved
+    """
+    improved = False
+    for path in _key_paths(adjacency, terminals):
+        if any(point not in adjacency for point in path) or \
+                any(b not in adjacency[a] for a, b in zip(path, path[1:])) or \
+                any(len(adjacency[point]) != 2 for point in path[1:-1]):
+            continue  # changed by an earlier reconnection
+
+        _remove_path(adjacency, path)
+        part = {path[0]}
+        pending = [path[0]]
+        while pending:
+            for point in adjacency[pending.pop()]:
+                if point not in part:
+                    part.add(point)
+                    pending.append(point)
+        others = {point for point in adjacency
+                  if point not in part and kind(point) == FREE}
+
+        new_path = _search(part, others, kind, bend_cost, avoid=adjacency)
+        if new_path is not None and \
+                _path_cost(new_path, bend_cost) < _path_cost(path, bend_cost):
+            _add_path(adjacency, new_path)
+            improved = True
+        else:
+            _add_path(adjacency, path)
+
+    _prune(adjacency, terminals)
+    return improved
+
+
+def _prune(adjacency, terminals):
+    """Removes leaves that are no terminals."""
+    pending = [point for point, neighbours in adjacency.items()
+               if len(neighbours) <= 1 and point not in terminals]
+    while pending:
+        point = pending.pop()
+        if point not in adjacency:
+            continue
+        for neighbour in adjacency.pop(point):
+            adjacency[neighbour].discard(point)
+            if len(adjacency[neighbour]) <= 1 and \
+                    neighbour not in terminals:
+                pending.append(neighbour)
+
+
+def _to_tree(root, adjacency, terminals):
+    def is_node(point):
+        neighbours = adjacency[point]
+        if point in terminals or len(neighbours) != 2:
+            return True
+        a, b = neighbours
+        return a[0] != b[0] and a[1] != b[1]
+
+    tree = {}
+    pending = [(root, None, tree.setdefault(root, {}))]
+    while pending:
+        node, previous, subtree = pending.pop()
+        for first in adjacency[node]:
+            if first == previous:
+                continue
+            last, current = node, first
+            while not is_node(current):
+                last, current = current, next(
+                    point for point in adjacency[current] if point != last)
+            pending.append((current, last, subtree.setdefault(current, {})))
+    return tree
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+"""
+Reduced ordered binary decision diagrams (ROBDD) for combinational logic.
+
+The output cones of a compound definition made of And, Or, Xor, Nand, Nor
+and Interconnect cells are compiled into BDDs over the compound inputs.
+BDDs evaluate the outputs without simulating the internal elements and,
+being canonical for a given variable order, make checking two designs for
+equivalence a comparison of node handles.
+
+Nodes are integers. 0 and 1 are the constant functions, every other node
+is a (variable, low, high) triple stored in a BDD manager. The manager's
+unique table guarantees each triple exists only once. Results of ite
+operations are kept in a computed table.
+
+Example use:
+>>> manager = BDDManager(2)
+>>> a, b = manager.variable(0), manager.variable(1)
+>>> f = manager.apply_xor(a, b)
+>>> manager.evaluate(f, [True, False]), manager.evaluate(f, [True, True])
+(True, False)
+>>> manager.apply_or(manager.apply_and(a, manager.apply_not(b)),
+...                  manager.apply_and(manager.apply_not(a), b)) == f
+True
+"""
+
+from backend.components.basic_logic_elements import And, Or, Xor, Nand, \
+    Nor
+from backend.components.interconnect import Interconnect
+from backend.components.shared_compound_element import EXTERNAL
+from backend.components.lookup_table import topological_order
+
+FALSE = 0
+TRUE = 1
+
+
+class BDDError(Exception):
+    """Raised for logic that can't be compiled into BDDs."""
+    pass
+
+
+class BDDManager:
+    """
+    Owns the nodes of any number of BDDs sharing the same variable order.
+    """
+    def __init__(self, variable_count, order=None):
+        """
+        :param variable_count: Number of variables
+        :param order: List of variables from top to bottom of the diagrams.
+            Defaults to ascending variable order.
+        """
+        if order is None:
+            order = list(range(variable_count))
+        if sorted(order) != list(range(variable_count)):
+            raise BDDError("Order must contain every variable once")
+
+        self.order = order
+        self._level = [0] * variable_count  # variable -> level
+        for level, variable in enumerate(order):
+            self._level[variable] = level
+
+        # Node storage. Terminals are at a level below all variables.
+        self._levels = [variable_count, variable_count]
+        self._low = [FALSE, TRUE]
+        self._high = [FALSE, TRUE]
+
+        self._unique = {}  # (level, low, high) -> node
+        self._computed = {}  # (f, g, h) -> node
+
+    def __len__(self):
+        """
+        :return: Number of nodes including the terminals
+        """
+        return len(self._levels)
+
+    def _make(self, level, low, high):
+        if low == high:
+            return low
+
+        key = (level, low, high)
+        node = self._unique.get(key)
+        if node is None:
+            node = self._unique[key] = len(self._levels)
+            self._levels.append(level)
+            self._low.append(low)
+            self._high.append(high)
+        return node
+
+    def variable(self, variable):
+        """
+        :return: Node of the function equal to the given variable
+        """
+        return self._make(self._level[variable], FALSE, TRUE)
+
+    def ite(self, f, g, h):
+        """
+        :return: Node of the function 'if f then g else h'
+        """
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+
+        key = (f, g, h)
+        result = self._computed.get(key)
+        if result is not None:
+            return result
+
+        levels = self._levels
+        level = min(levels[f], levels[g], levels[h])
+
+        def cofactors(node):
+            if levels[node] != level:
+                return node, node
+            return self._low[node], self._high[node]
+
+        f0, f1 = cofactors(f)
+        g0, g1 = cofactors(g)
+        h0, h1 = cofactors(h)
+
+        result = self._make(level,
+                            self.ite(f0, g0, h0),
+                            self.ite(f1, g1, h1))
+        self._computed[key] = result
+        return result
+
+    def apply_not(self, f):
+        return self.ite(f, FALSE, TRUE)
+
+    def apply_and(self, f, g):
+        return self.ite(f, g, FALSE)
+
+    def apply_or(self, f, g):
+        return self.ite(f, TRUE, g)
+
+    def apply_xor(self, f, g):
+        return self.ite(f, self.apply_not(g), g)
+
+    def evaluate(self, node, inputs):
+        """
+        :param node: Function to evaluate
+        :param inputs: State of each variable
+        :return: Value of the function
+        """
+        levels, low, high, order = self._levels, self._low, self._high, \
+            self.order
+        while node > TRUE:
+            node = high[node] if inputs[order[levels[node]]] else low[node]
+        return node == TRUE
+
+    def satisfy(self, node):
+        """
+        :return: Assignment of the variables for which the function is true
+            or None if there is none. Variables not on the path are False.
+        """
+        if node == FALSE:
+            return None
+
+        assignment = [False] * len(self.order)
+        while node > TRUE:
+            variable = self.order[self._levels[node]]
+            if self._high[node] != FALSE:
+                assignment[variable] = True
+                node = self._high[node]
+            else:
+                node = self._low[node]
+        return assignment
+
+    def size(self, roots):
+        """
+        :return: Number of non-terminal nodes reachable from the roots
+        """
+        seen = set()
+        pending = [root for root in roots if root > TRUE]
+        while pending:
+            node = pending.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            pending.extend(child for child in (self._low[node],
+                                               self._high[node])
+                           if child > TRUE)
+        return len(seen)
+
+
+def _one_hot(manager, nodes):
+    ones = many = FALSE
+    for node in nodes:
+        many = manager.apply_or(many, manager.apply_and(ones, node))
+        ones = manager.apply_or(ones, node)
+    return manager.apply_and(ones, manager.apply_not(many))
+
+
+def _reduce(operation, initial):
+    def function(manager, nodes):
+        result = initial
+        for node in nodes:
+            result = operation(manager, result, node)
+        return result
+    return function
+
+
+_and = _reduce(BDDManager.apply_and, TRUE)
+_or = _reduce(BDDManager.apply_or, FALSE)
+
+# BDD equivalents of the logic functions of the basic gates
+_BDD_FUNCTIONS = {
+    And.logic_function: _and,
+    Or.logic_function: _or,
+    Xor.logic_function: _one_hot,
+    Nand.logic_function: lambda manager, nodes: manager.apply_not(
+        _and(manager, nodes)),
+    Nor.logic_function: lambda manager, nodes: manager.apply_not(
+        _or(manager, nodes)),
+    Interconnect.logic_function: lambda manager, nodes: nodes[0]
+}
+
+
+def _drivers(definition):
+    """
+    :return: For each internal input the (cell, output) driving it or None
+    """
+    drivers = [None] * len(definition.initial_inputs)
+    for source, output, sink, port, _ in definition.data['connections']:
+        if sink != EXTERNAL:
+            drivers[definition.input_offsets[sink] + port] = (source, output)
+    return drivers
+
+
+def _output_drivers(definition):
+    """
+    :return: For each compound output the (cell, output) driving it or None
+    """
+    drivers = [None] * definition.output_count
+    for source, output, sink, port, _ in definition.data['connections']:
+        if sink == EXTERNAL:
+            drivers[port] = (source, output)
+    return drivers
+
+
+def dfs_order(definition):
+    """
+    Variable order heuristic placing inputs in the order a depth first
+    traversal of the output cones reaches them. Inputs feeding the same
+    gates end up next to each other which keeps the BDDs of typical
+    datapath logic small.
+
+    :param definition: CompoundDefinition
+    :return: List of compound inputs
+    """
+    drivers = _drivers(definition)
+    input_of = {}  # internal input -> compound input
+    for port, targets in enumerate(definition.entries):
+        for target in targets:
+            input_of[target] = port
+
+    order = []
+    visited = set()
+
+    def visit(cell):
+        # Iterative to support deep logic
+        stack = [cell]
+        while stack:
+            cell = stack.pop()
+            if cell in visited:
+                continue
+            visited.add(cell)
+            first = definition.input_offsets[cell]
+            last = definition.input_offsets[cell + 1]
+            for target in range(last - 1, first - 1, -1):
+                port = input_of.get(target)
+                if port is not None and port not in order:
+                    order.append(port)
+            for target in range(last - 1, first - 1, -1):
+                if drivers[target] is not None:
+                    stack.append(drivers[target][0])
+
+    for driver in _output_drivers(definition):
+        if driver is not None:
+            visit(driver[0])
+
+    order.extend(port for port in range(definition.input_count)
+                 if port not in order)
+    return order
+
+
+class CompiledCones:
+    """
+    BDDs of all outputs of a compound definition.
+    """
+    def __init__(self, manager, roots):
+        self.manager = manager
+        self.roots = roots
+
+    def evaluate(self, inputs):
+        """
+        :param inputs: State of each compound input
+        :return: List with the state of each compound output
+        """
+        evaluate = self.manager.evaluate
+        return [evaluate(root, inputs) for root in self.roots]
+
+    def size(self):
+        """
+        :return: Number of BDD nodes used by all outputs
+        """
+        return self.manager.size(self.roots)
+
+
+def compile_definition(definition, order='dfs', manager=None):
+    """
+    Builds the BDDs of all outputs of a combinational compound definition.
+
+    :param definition: CompoundDefinition of the compound
+    :param order: 'dfs' for dfs_order, 'natural' for ascending input order
+        or a list of compound inputs
+    :param manager: Existing manager to add the BDDs to. Its variable
+        order is used.
+    :return: CompiledCones
+    :raises BDDError: For non-combinational logic or unsupported cells
+    """
+    if manager is None:
+        if order == 'dfs':
+            order = dfs_order(definition)
+        elif order == 'natural':
+            order = None
+        manager = BDDManager(definition.input_count, order)
+
+    functions = []
+    for logic_function in definition.logic_functions:
+        function = _BDD_FUNCTIONS.get(logic_function)
+        if function is None:
+            raise BDDError("Unsupported logic function {0}".format(
+                logic_function))
+        functions.append(function)
+
+    nodes = [FALSE] * len(definition.initial_inputs)  # Internal inputs
+    for port, targets in enumerate(definition.entries):
+        for target in targets:
+            nodes[target] = manager.variable(port)
+
+    cell_order = topological_order(definition)
+    if cell_order is None:
+        raise BDDError("Logic is not combinational")
+
+    roots = [FALSE] * definition.output_count
+    for cell in cell_order:
+        first = definition.input_offsets[cell]
+        last = definition.input_offsets[cell + 1]
+        result = functions[cell](manager, nodes[first:last])
+
+        # All basic cells have a single output
+        for target, _ in definition.sinks[definition.output_offsets[cell]]:
+            if target >= 0:
+                nodes[target] = result
+            else:
+                roots[-target - 1] = result
+
+    return CompiledCones(manager, roots)
+
+
+def counterexample(definition, other):
+    """
+    Checks two compound definitions with the same inputs and outputs for
+    equivalence.
+
+    :return: None if equivalent. Otherwise an input assignment for which
+        at least one output differs.
+    :raises BDDError: If the interfaces differ or the logic can't be
+        compiled
+    """
+    if definition.input_count != other.input_count or \
+            definition.output_count != other.output_count:
+        raise BDDError("Definitions have different inputs or outputs")
+
+    first = compile_definition(definition)
+    second = compile_definition(other, manager=first.manager)
+
+    manager = first.manager
+    for root, other_root in zip(first.roots, second.roots):
+        if root != other_root:
+            return manager.satisfy(manager.apply_xor(root, other_root))
+
+    return None
+
+
+def equivalent(definition, other):
+    """
+    :return: True if both compound definitions compute the same function
+    """
+    return counterexample(definition, other) is None
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -41,7 +41,7 @@ Example use:
 """
 
 from abc import ABCMeta, abstractmethod
-from copy import copy
+from collections.abc import Mapping, MutableMapping
 import random
 
 
@@ -57,6 +57,153 @@ def gen_component_id():
     return random.getrandbits(128)
 
 
+class MetadataView(Mapping):
+    """
+    Read-only view layering a number of metadata dictionaries on top of each
+    other. Lookups search the layers in order, so earlier layers override
+    later ones. Contrary to merging the dictionaries no copy is made until
+    materialize is called. As the view reflects later modifications of the
+    layers it is materialized when the message containing it is posted.
+    """
+    __slots__ = ('_layers',)
+
+    def __init__(self, *layers):
+        """
+        :param layers: Metadata dictionaries in order of precedence
+        """
+        self._layers = layers
+
+    def __getitem__(self, field):
+        for layer in self._layers:
+            try:
+                return layer[field]
+            except KeyError:
+                pass
+        raise KeyError(field)
+
+    def __contains__(self, field):
+        return any(field in layer for layer in self._layers)
+
+    def __iter__(self):
+        seen = set()
+        for layer in self._layers:
+            for field in layer:
+                if field not in seen:
+                    seen.add(field)
+                    yield field
+
+    def __len__(self):
+        return len(set().union(*self._layers))
+
+    def materialize(self):
+        """
+        :return: New dictionary with the merged contents of all layers
+        """
+        merged = {}
+        for layer in reversed(self._layers):
+            merged.update(layer)
+        return merged
+
+
+def materialize(data):
+    """
+    Replaces metadata views by dictionaries. Views nested in lists or in
+    other views, like the children of a serialized element, are replaced
+    as well.
+
+    :param data: Message field possibly containing metadata views
+    :return: data without any views
+    """
+    if isinstance(data, MetadataView):
+        data = data.materialize()
+        for field, value in data.items():
+            if type(value) is list:
+                data[field] = materialize(value)
+    elif type(data) is list:
+        data = [materialize(item) for item in data]
+    return data
+
+
+class HandleTable(MutableMapping):
+    """
+    Assigns dense integer handles to component instances. The backend uses
+    handles for grouping events and indexing arrays while the 128bit
+    component ids are only used to communicate with the outside world.
+
+    Maps component ids to instances and allows lookups by handle. Handles
+    are never reused so events still pending for a removed component can't
+    be confused with a new one.
+    """
+    def __init__(self):
+        self._handles = {}  # component id -> handle
+        self._elements = []  # handle -> instance or None if removed
+        self._ids = []  # handle -> component id
+
+        # Incremented on every connectivity change between the instances.
+        # Cached flattened connections are rebuilt once this changes.
+        self.topology_epoch = 0
+
+    def add(self, instance):
+        """
+        Assigns a new handle to the given instance.
+
+        :param instance: Instance to register
+        :return: Handle of the instance
+        """
+        component_id = instance.id()
+        handle = len(self._elements)
+        self._handles[component_id] = handle
+        self._elements.append(instance)
+        self._ids.append(component_id)
+        return handle
+
+    def handle(self, component_id):
+        """
+        :return: Handle of the instance with the given component id
+        """
+        return self._handles[component_id]
+
+    def instance(self, handle):
+        """
+        :return: Instance with the given handle or None if it was removed
+        """
+        return self._elements[handle]
+
+    def component_id(self, handle):
+        """
+        :return: Component id of the instance with the given handle
+        """
+        return self._ids[handle]
+
+    def capacity(self):
+        """
+        :return: Upper bound for handles assigned so far. Use this to size
+            arrays indexed by handle.
+        """
+        return len(self._elements)
+
+    def __getitem__(self, component_id):
+        return self._elements[self._handles[component_id]]
+
+    def __setitem__(self, component_id, instance):
+        assert instance.id() == component_id
+        handle = self._handles.get(component_id)
+        if handle is None or self._elements[handle] is not instance:
+            self.add(instance)
+
+    def __delitem__(self, component_id):
+        self._elements[self._handles.pop(component_id)] = None
+
+    def __iter__(self):
+        return iter(self._handles)
+
+    def __len__(self):
+        return len(self._handles)
+
+    def __contains__(self, component_id):
+        return component_id in self._handles
+
+
 class ComponentType(object):
     """
     Base-class for the description of a component type.
@@ -65,6 +212,10 @@ class ComponentType(object):
     """
     METADATA = None  # Must override this in component types
 
+    # Types simulating pure combinational logic provide a static
+    # logic_function taking the input states and returning the output states.
+    logic_function = None
+
     @classmethod
     def GUID(cls):
         """
@@ -138,6 +289,16 @@ class ComponentRoot(metaclass=ABCMeta):
         """
         pass
 
+    def get_handle_table(self):
+        """
+        :return: HandleTable all components in this simulation register with
+        """
+        try:
+            return self._handle_table
+        except AttributeError:
+            self._handle_table = HandleTable()
+            return self._handle_table
+
 
 class ComponentInstance(metaclass=ABCMeta):
     """
@@ -161,6 +322,8 @@ class ComponentInstance(metaclass=ABCMeta):
         self._children = []
         self._metadata = metadata
         self._component_type = component_type  # Used for type metadata query
+        self._type_metadata = component_type.get_metadata()
+        self._handle = self.get_handle_table().add(self)
 
         self._parent.child_added(self)
 
@@ -184,7 +347,13 @@ class ComponentInstance(metaclass=ABCMeta):
         """
         :return: Simulation unique id of the instance
         """
-        return self.get_metadata_field("id")
+        return self._metadata["id"]
+
+    def handle(self):
+        """
+        :return: Dense integer handle of the instance used inside the backend
+        """
+        return self._handle
 
     def propagate_change(self, data):
         """
@@ -202,6 +371,12 @@ class ComponentInstance(metaclass=ABCMeta):
         """
         return self._parent.get_library()
 
+    def get_handle_table(self):
+        """
+        Returns the HandleTable used in the simulation.
+        """
+        return self._parent.get_handle_table()
+
     def get_metadata_field(self, field, default=None):
         """
         Returns the value of a given metadata field. Values set on the
@@ -213,24 +388,35 @@ class ComponentInstance(metaclass=ABCMeta):
         :param default: Default to return if field doesn't exist
         :return: Value of field or default
         """
-        return self._metadata.get(field,
-                                  self._component_type.get_metadata_field(
-                                      field, default))
+        try:
+            return self._metadata[field]
+        except KeyError:
+            return self._type_metadata.get(field, default)
+
+    def get_metadata_view(self, *overlays):
+        """
+        Returns a read-only view of all metadata available for the instance
+        without copying it. Use this instead of get_metadata if the result
+        doesn't leave the backend.
+
+        :param overlays: Additional dictionaries overriding instance fields
+        :return: MetadataView on the instance and type metadata
+        """
+        return MetadataView(*(overlays + (self._metadata,
+                                          self._type_metadata)))
 
     def get_metadata(self):
         """
         :return: Returns all metadata available for the instance. This
         includes all fields available in the type description.
         """
-        metadata_combined = copy(self._component_type.get_metadata())
-        metadata_combined.update(self._metadata)
-        return metadata_combined
+        return self.get_metadata_view().materialize()
 
     def updated(self):
         """
         Trigger full metadata propagation for this component.
         """
-        self.propagate_change(self.get_metadata())
+        self.propagate_change(self.get_metadata_view())
 
     def set_metadata_field(self, field, value, propagate=True):
         """
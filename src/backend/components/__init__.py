@@ -13,11 +13,19 @@ from backend.components.basic_logic_elements import And, Or, Xor, Nand, Nor, \
 from backend.components.interconnect import Interconnect
 from backend.components.compound_element import CompoundElement, \
     InputOutputBank
+from backend.components.shared_compound_element import \
+    SharedCompoundElement
+from backend.components.lookup_table import LookupTable
+from backend.components.flip_flop import DFlipFlop
 
 register(get_library())  # Register components
 get_library().register(Interconnect)
 get_library().register(CompoundElement)
 get_library().register(InputOutputBank)
+get_library().register(SharedCompoundElement)
+get_library().register(LookupTable)
+get_library().register(DFlipFlop)
 
 __all__ = ('And', 'Or', 'Xor', 'Nand', 'Nor', 'Interconnect',
-           'CompoundElement', 'InputOutputBank')
+           'CompoundElement', 'InputOutputBank', 'SharedCompoundElement',
+           'LookupTable', 'DFlipFlop')
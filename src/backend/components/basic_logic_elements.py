@@ -26,6 +26,10 @@ class And(ComponentType):
                 "#outputs": 1,
                 "delay": 1}
 
+    @staticmethod
+    def logic_function(inputs):
+        return [all(inputs)]
+
     @classmethod
     def instantiate(cls, id, parent, additional_metadata={}):
         metadata = copy(additional_metadata)
@@ -36,7 +40,7 @@ class And(ComponentType):
 class AndInstance(SimpleElement):
     def __init__(self, parent, additional_metadata):
         super().__init__(parent, additional_metadata, And,
-                         lambda inputs: [all(inputs)],)
+                         And.logic_function)
 
 
 class Or(ComponentType):
@@ -52,6 +56,10 @@ class Or(ComponentType):
                 "#outputs": 1,
                 "delay": 1}
 
+    @staticmethod
+    def logic_function(inputs):
+        return [any(inputs)]
+
     @classmethod
     def instantiate(cls, id, parent, additional_metadata={}):
         metadata = copy(additional_metadata)
@@ -61,8 +69,8 @@ class Or(ComponentType):
 
 class OrInstance(SimpleElement):
     def __init__(self, parent, additional_metadata):
-        super().__init__(parent, additional_metadata, And,
-                         lambda inputs: [any(inputs)],)
+        super().__init__(parent, additional_metadata, Or,
+                         Or.logic_function)
 
 
 class Xor(ComponentType):
@@ -78,6 +86,10 @@ class Xor(ComponentType):
                 "#outputs": 1,
                 "delay": 1}
 
+    @staticmethod
+    def logic_function(inputs):
+        return [sum(inputs) == 1]
+
     @classmethod
     def instantiate(cls, id, parent, additional_metadata={}):
         metadata = copy(additional_metadata)
@@ -88,7 +100,7 @@ class Xor(ComponentType):
 class XorInstance(SimpleElement):
     def __init__(self, parent, additional_metadata):
         super().__init__(parent, additional_metadata, Xor,
-                         lambda inputs: [sum(inputs) == 1],)
+                         Xor.logic_function)
 
 
 class Nand(ComponentType):
@@ -104,6 +116,10 @@ class Nand(ComponentType):
                 "#outputs": 1,
                 "delay": 1}
 
+    @staticmethod
+    def logic_function(inputs):
+        return [not all(inputs)]
+
     @classmethod
     def instantiate(cls, element_id, parent, additional_metadata={}):
         metadata = copy(additional_metadata)
@@ -114,7 +130,7 @@ class Nand(ComponentType):
 class NandInstance(SimpleElement):
     def __init__(self, parent, additional_metadata):
         super().__init__(parent, additional_metadata, Nand,
-                         lambda inputs: [not all(inputs)],)
+                         Nand.logic_function)
 
 
 class Nor(ComponentType):
@@ -130,6 +146,10 @@ class Nor(ComponentType):
                 "#outputs": 1,
                 "delay": 1}
 
+    @staticmethod
+    def logic_function(inputs):
+        return [not any(inputs)]
+
     @classmethod
     def instantiate(cls, id, parent, additional_metadata={}):
         metadata = copy(additional_metadata)
@@ -140,7 +160,7 @@ class Nor(ComponentType):
 class NorInstance(SimpleElement):
     def __init__(self, parent, additional_metadata):
         super().__init__(parent, additional_metadata, Nor,
-                         lambda inputs: [not any(inputs)],)
+                         Nor.logic_function)
 
 
 def register(library):
@@ -36,14 +36,31 @@ class InputOutputBankInstance(Element):
 
     def connect(self, output_port, element, input_port, delay=0):
         self.mapping[output_port] = (element, input_port)
+        self.topology_changed()
         # FIXME: Implement rest of this
         return True
 
     def disconnect(self, output_port):
         val = self.mapping.pop(output_port, None)
+        self.topology_changed()
         # FIXME: Implement rest of this
         return val is not None
 
+    def resolve_sink(self, input_port):
+        """
+        Banks don't simulate anything themselves. Resolves to the element
+        the given input is mapped to.
+
+        :param input_port: Index of the input
+        :return: (element, input port) tuple or None if not mapped
+        """
+        target = self.mapping.get(input_port)
+        if target is None:
+            return None
+
+        element, element_input = target
+        return element.resolve_sink(element_input)
+
     def connected(self, element, output_port, input_port, state):
         # FIXME: Implement this
         return True
@@ -114,10 +131,98 @@ class CompoundElementInstance(Element):
                                            rand.getrandbits(128),
                                            self)
 
+        # Element simulating this compound instead of its children
+        self.macro_model = None
+
     def __str__(self):
         return "CompoundElement(name={0})"\
             .format(self.get_metadata_field("name"))
 
+    def resolve_sink(self, input_port):
+        """
+        Resolves inputs to the internal element they are forwarded to.
+        Drivers schedule their edges directly on that element which removes
+        the compound element and its banks from the simulated netlist.
+
+        :param input_port: Index of the input
+        :return: (element, input port) tuple or None if not connected
+        """
+        if self.macro_model is not None:
+            return self.macro_model, input_port
+
+        return self.input_bank.resolve_sink(input_port)
+
+    def output_drivers(self, output_port=None):
+        """
+        Returns the connections driving the given output from inside the
+        compound. The output bank only forwards them, so their delays are
+        the delays of the output.
+
+        :param output_port: Output of the compound or None for all outputs
+        :return: List of (element, output port) tuples
+        """
+        elements = list(self.get_children())
+        if self.macro_model is not None:
+            elements.append(self.macro_model)
+
+        drivers = []
+        for element in elements:
+            if isinstance(element, CompoundElementInstance):
+                for port, target in element.output_bank.mapping.items():
+                    sink, sink_port = target
+                    if sink is self.output_bank and \
+                            output_port in (None, sink_port):
+                        drivers.extend(element.output_drivers(port))
+            elif not isinstance(element, InputOutputBankInstance):
+                for port, (sink, sink_port, _) in enumerate(element.outputs):
+                    if sink is self.output_bank and \
+                            output_port in (None, sink_port):
+                        drivers.append((element, port))
+
+        return drivers
+
+    def set_macro_model(self, element):
+        """
+        Lets the given element simulate this compound instead of its
+        children. The element must have an input and output for each
+        input and output of the compound. It takes over the current input
+        states of the children and isn't a child itself. The handle of a
+        replaced model is released.
+
+        :param element: Element created with this compound as parent or
+            None to simulate the children again
+        """
+        if element is not None:
+            if element in self._children:
+                self._children.remove(element)
+
+            for port in range(len(element.input_states)):
+                sink = self.input_bank.resolve_sink(port)
+                if sink is not None:
+                    sink_element, sink_port = sink
+                    states = getattr(sink_element, 'input_states', None)
+                    element.input_states[port] = \
+                        states[sink_port] if states is not None \
+                        else sink_element.state
+
+            element.output_states[:] = type(element.output_states)(
+                'i', element.logic_function(element.input_states))
+
+            for port in range(len(element.outputs)):
+                element.connect(port, self.output_bank, port)
+
+        previous = self.macro_model
+        if previous is not None and previous is not element:
+            # Models aren't children so destruct doesn't release them
+            del self.get_handle_table()[previous.id()]
+
+        self.macro_model = element
+        self.topology_changed()
+
+    def destruct(self):
+        self.set_macro_model(None)
+        return super().destruct()
+
     def edge(self, input_port, state):
         """
         Handles a rising or falling edge and maps it to the corresponding
@@ -126,7 +231,10 @@ class CompoundElementInstance(Element):
         :param input_port: Index of the input
         :param state: Value of the input (True/False) at time `when`
         """
-        self.input_bank.edge(input_port, state)
+        if self.macro_model is not None:
+            self.macro_model.edge(input_port, state)
+        else:
+            self.input_bank.edge(input_port, state)
 
     def clock(self, when):
         """
@@ -136,6 +244,9 @@ class CompoundElementInstance(Element):
         :param when: Point in time
         :return: List of none or more future Event s
         """
+        if self.macro_model is not None:
+            return self.macro_model.clock(when)
+
         return self.input_bank.clock(when)
 
     def connect(self, output_port, element, input_port, delay=0):
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+
+from copy import copy
+
+from backend.simple_element import SimpleElement
+from backend.component_library import ComponentType
+from symbols import TextItem
+
+
+class DFlipFlop(ComponentType):
+    """
+    Rising edge triggered D flip-flop. Input 0 is D, input 1 the clock.
+    """
+    METADATA = {"GUID": "0C6E3B5A-8A1F-4D2B-9E47-2F6B1D9C8A53",
+                "GUI-GUID": TextItem.GUI_GUID(),  # Override GUI item
+                "name": "D flip-flop",
+                "text": "D",
+                "description": "Rising edge triggered D flip-flop",
+                "#inputs": 2,
+                "#outputs": 1,
+                "delay": 1}
+
+    @classmethod
+    def instantiate(cls, element_id, parent, additional_metadata={}):
+        metadata = copy(additional_metadata)
+        metadata["id"] = element_id
+        return DFlipFlopInstance(parent, metadata)
+
+
+class DFlipFlopInstance(SimpleElement):
+    """
+    D flip-flop element. The optional 'state' metadata field holds the
+    initial state.
+    """
+    is_sequential = True
+
+    def __init__(self, parent, metadata):
+        self.state = bool(metadata.get('state', False))
+        self._clock_state = False
+
+        super().__init__(parent, metadata, DFlipFlop, self._next_state)
+
+    def _next_state(self, inputs):
+        """
+        Captures D on rising clock edges.
+
+        :param inputs: Input states
+        :return: List with the state of Q
+        """
+        if inputs[1] and not self._clock_state:
+            self.state = bool(inputs[0])
+        self._clock_state = bool(inputs[1])
+
+        return [self.state]
@@ -5,7 +5,7 @@
 # Use of this source code is governed by the GNU GPL license that can
 # be found in the LICENSE.txt file.
 #
-from backend.element import Element, Edge
+from backend.element import Element, Edge, FanOutEdge
 from backend.component_library import ComponentType
 from copy import copy
 from logicitems import LineTree
@@ -21,6 +21,11 @@ class Interconnect(ComponentType):
                 "#outputs": 1,
                 "description": "Represents connections between elements"}
 
+    @staticmethod
+    def logic_function(inputs):
+        # All outputs carry the state of the single input
+        return [inputs[0]]
+
     @classmethod
     def instantiate(cls, element_id, parent, additional_metadata={}):
         metadata = copy(additional_metadata)
@@ -37,6 +42,7 @@ class InterconnectInstance(Element):
     meta-data for the front-end would be quite annoying. We'll see if this
     becomes an issue in the future.
     """
+    is_net = True
 
     def __init__(self, parent, metadata):
         super().__init__(parent, metadata, Interconnect)
@@ -50,6 +56,10 @@ class InterconnectInstance(Element):
 
         self.new_state = False
         self.state = False
+        self._received_edge = False
+
+        self._fan_out = []  # List of (delay, sinks) tuples
+        self._fan_out_source = None  # Flattened outputs _fan_out is for
 
         self.set_metadata_field('input-states',
                                 False, False)
@@ -114,6 +124,7 @@ class InterconnectInstance(Element):
             return False
 
         self.outputs[output_port] = (element, input_port, delay)
+        self.topology_changed()
 
         self.set_metadata_field('outputs', self._out_con_to_data(self.outputs))
 
@@ -144,6 +155,7 @@ class InterconnectInstance(Element):
             return False
 
         self.outputs[output_port] = (None, 0, 0)
+        self.topology_changed()
 
         self.set_metadata_field('outputs', self._out_con_to_data(self.outputs))
 
@@ -222,32 +234,65 @@ class InterconnectInstance(Element):
         assert input_port == 0, "Interconnect does not have multiple inputs."
 
         self.new_state = state
+        self._received_edge = True
 
         return []
 
+    def fan_out(self):
+        """
+        Groups the flattened outputs by delay. Cached till the next change in
+        connectivity.
+
+        :return: List of (delay, [(element, input port), ...]) tuples
+        """
+        outputs = self.flattened_outputs()
+        if outputs is not self._fan_out_source:
+            sinks_by_delay = {}
+            for element, input_port, delay in outputs:
+                if element:
+                    sinks_by_delay.setdefault(delay, []).append(
+                        (element, input_port))
+
+            self._fan_out = sorted(sinks_by_delay.items())
+            self._fan_out_source = outputs
+
+        return self._fan_out
+
     def clock(self, when):
         """
         Schedules delayed propagation of state change to all connected element
-        inputs.
+        inputs. Sinks sharing the same delay are served by a single event.
 
         Note: This schedules directly on connected elements so it won't
               react to connectivity changes while the event is pending.
+              Connections into compound elements are scheduled on the
+              internal element they are forwarded to.
 
         :param when: Current simulation time.
-        :return: One future edge event for each connection endpoint.
+        :return: One future event for each distinct connection delay.
         """
+        self.last_clock = when
+
+        if self._received_edge and self.new_state == self.state:
+            # Nothing changed. Explicit clocks without an edge still
+            # propagate the current state.
+            self._received_edge = False
+            return []
 
-        if self.new_state == self.get_metadata_field('state'):
-            # Nothing to do
-            # FIXME: Fix initialization behavior so we can return [] here
-            pass
+        self._received_edge = False
 
         self.set_metadata_field('state', self.new_state)
         self.state = self.new_state
 
-        return [Edge(when + delay,
-                     element,
-                     input_port,
-                     self.state) for (element,
-                                      input_port,
-                                      delay) in self.outputs if element]
+        events = []
+        for delay, sinks in self.fan_out():
+            if len(sinks) == 1:
+                element, input_port = sinks[0]
+                events.append(Edge(when + delay,
+                                   element,
+                                   input_port,
+                                   self.state))
+            else:
+                events.append(FanOutEdge(when + delay, sinks, self.state))
+
+        return events
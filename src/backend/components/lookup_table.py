@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+"""
+Macro-models replacing combinational compound elements by lookup tables.
+
+A compound element whose internal elements form an acyclic network of
+elements with logic functions computes a pure function of its inputs. For
+few inputs this function is extracted into a truth table by evaluating the
+network for all input combinations at once: input i of the compound gets a
+word with bit p set if bit i of pattern p is set and the elements are
+evaluated on these words in topological order.
+
+Wider compounds of basic gates are modelled symbolically instead. Their
+output cones are compiled into BDDs (see backend.bdd) which evaluate the
+outputs without enumerating all input patterns.
+
+The delay of each output is the longest path from any compound input to it.
+During simulation a lookup table element stands in for the internal
+elements of the compound. Glitches the internal elements would produce are
+not reproduced.
+
+Extracted models are cached by a hash of the compound description so
+further instances of the same compound skip the extraction.
+"""
+
+from copy import copy
+import hashlib
+import json
+import random
+
+from backend.component_library import ComponentType
+from backend.components.compound_element import CompoundElementInstance
+from backend.components.shared_compound_element import EXTERNAL, \
+    describe_compound, get_definition
+from backend.components.parallel_logic import word_function
+from backend.simple_element import SimpleElement, OutEdge
+
+
+class MacroModel:
+    """
+    Truth table or BDDs and output delays of a combinational compound.
+    """
+    def __init__(self, input_count, output_count, table, delays,
+                 cones=None):
+        """
+        :param input_count: Number of inputs
+        :param output_count: Number of outputs
+        :param table: List with an integer for each input pattern. Bit k is
+            the state of output k. Bit i of the pattern is the state of
+            input i. None for symbolic models.
+        :param delays: Delay of each output
+        :param cones: CompiledCones of symbolic models
+        """
+        self.input_count = input_count
+        self.output_count = output_count
+        self.table = table
+        self.delays = delays
+        self.cones = cones
+
+    def evaluate(self, inputs):
+        """
+        :param inputs: State of each input
+        :return: List with the state of each output
+        """
+        if self.cones is not None:
+            return self.cones.evaluate(inputs)
+
+        pattern = 0
+        for i, state in enumerate(inputs):
+            if state:
+                pattern |= 1 << i
+        outputs = self.table[pattern]
+        return [bool(outputs >> k & 1) for k in range(self.output_count)]
+
+
+def definition_hash(data):
+    """
+    :param data: Compound description as created by describe_compound
+    :return: Hash identifying the description
+    """
+    return hashlib.sha1(json.dumps(data, sort_keys=True)
+                        .encode('utf-8')).hexdigest()
+
+
+def topological_order(definition):
+    """
+    Orders the cells of a shared compound definition so every cell comes
+    after the cells driving it.
+
+    :param definition: CompoundDefinition
+    :return: List of cells in evaluation order or None if the cells form a
+        loop
+    """
+    cell_count = len(definition.logic_functions)
+    successors = [set() for _ in range(cell_count)]
+    for source, _, sink, _, _ in definition.data['connections']:
+        if sink != EXTERNAL:
+            successors[source].add(sink)
+
+    predecessors = [0] * cell_count
+    for sinks in successors:
+        for sink in sinks:
+            predecessors[sink] += 1
+
+    order = [cell for cell in range(cell_count) if not predecessors[cell]]
+    for cell in order:  # Grows while iterating
+        for sink in successors[cell]:
+            predecessors[sink] -= 1
+            if not predecessors[sink]:
+                order.append(sink)
+
+    return order if len(order) == cell_count else None
+
+
+def _output_delays(definition, order):
+    """
+    :param order: Cells in evaluation order
+    :return: Longest path from any compound input to each output
+    """
+    arrival = [None] * len(definition.initial_inputs)  # None is constant
+    for targets in definition.entries:
+        for target in targets:
+            arrival[target] = 0
+
+    delays = [0] * definition.output_count
+    for cell in order:
+        first = definition.input_offsets[cell]
+        last = definition.input_offsets[cell + 1]
+        known = [a for a in arrival[first:last] if a is not None]
+        if not known:
+            continue
+        cell_arrival = max(known) + definition.delays[cell]
+
+        for output in range(definition.output_offsets[cell],
+                            definition.output_offsets[cell + 1]):
+            for target, delay in definition.sinks[output]:
+                if target >= 0:
+                    arrival[target] = cell_arrival + delay
+                else:
+                    port = -target - 1
+                    delays[port] = max(delays[port], cell_arrival + delay)
+
+    return delays
+
+
+def extract_macro_model(definition):
+    """
+    Extracts the truth table and output delays of a compound definition.
+
+    :param definition: CompoundDefinition of the compound
+    :return: MacroModel or None if the compound isn't combinational
+    """
+    order = topological_order(definition)
+    if order is None:
+        return None
+
+    input_count = definition.input_count
+    patterns = 1 << input_count
+    full = (1 << patterns) - 1
+
+    # Word with bit p set for every pattern p with bit i set
+    input_words = []
+    for i in range(input_count):
+        block = ((1 << (1 << i)) - 1) << (1 << i)  # 2**i zeros, 2**i ones
+        word = block
+        width = 2 << i
+        while width < patterns:
+            word |= word << width
+            width *= 2
+        input_words.append(word & full)
+
+    words = [0] * len(definition.initial_inputs)  # Internal inputs
+    for port, targets in enumerate(definition.entries):
+        for target in targets:
+            words[target] = input_words[port]
+
+    output_words = [0] * definition.output_count
+
+    for cell in order:
+        first = definition.input_offsets[cell]
+        last = definition.input_offsets[cell + 1]
+        function = word_function(definition.logic_functions[cell], patterns)
+        outputs = function(words[first:last], full)
+
+        for output, word in enumerate(outputs):
+            for target, _ in definition.sinks[
+                    definition.output_offsets[cell] + output]:
+                if target >= 0:
+                    words[target] = word
+                else:
+                    output_words[-target - 1] = word
+
+    table = [0] * patterns
+    for port, word in enumerate(output_words):
+        for pattern in range(patterns):
+            if word >> pattern & 1:
+                table[pattern] |= 1 << port
+
+    return MacroModel(input_count, definition.output_count, table,
+                      _output_delays(definition, order))
+
+
+def extract_symbolic_model(definition):
+    """
+    Compiles the output cones of a compound definition into BDDs.
+
+    :param definition: CompoundDefinition of the compound
+    :return: MacroModel or None if the compound isn't combinational or
+        contains cells without BDD equivalent
+    """
+    # Imported here as backend.bdd depends on the components package
+    from backend.bdd import BDDError, compile_definition
+
+    order = topological_order(definition)
+    if order is None:
+        return None
+
+    try:
+        cones = compile_definition(definition)
+    except BDDError:
+        return None
+
+    return MacroModel(definition.input_count, definition.output_count, None,
+                      _output_delays(definition, order), cones)
+
+
+# (definition hash, symbolic) -> MacroModel or None if not combinational
+_models = {}
+
+
+def get_macro_model(compound, max_inputs=8, max_symbolic_inputs=0):
+    """
+    Returns the macro-model of a compound element. Models are cached by the
+    hash of the compound description.
+
+    :param compound: CompoundElementInstance to model
+    :param max_inputs: Compounds with more inputs are not modelled by a
+        truth table
+    :param max_symbolic_inputs: Compounds with more inputs than max_inputs
+        but at most this many are modelled by BDDs
+    :return: MacroModel or None if the compound can't be modelled
+    """
+    data = describe_compound(compound)
+    input_count = len(data['inputs'])
+    if input_count <= max_inputs:
+        symbolic = False
+    elif input_count <= max_symbolic_inputs:
+        symbolic = True
+    else:
+        return None
+
+    key = (definition_hash(data), symbolic)
+    if key not in _models:
+        try:
+            definition = get_definition(data, compound.get_library())
+        except TypeError:
+            _models[key] = None  # Contains elements without logic function
+        else:
+            _models[key] = extract_symbolic_model(definition) if symbolic \
+                else extract_macro_model(definition)
+
+    return _models[key]
+
+
+class LookupTable(ComponentType):
+    """
+    Element evaluating a truth table or BDDs. Used as macro-model of
+    compounds.
+    """
+    METADATA = {"GUID": "5e0e4a53-4f0b-4e43-8d5b-7f6d2b9c3a81",
+                "name": "Lookup table",
+                "description": "Element computing its outputs from a truth "
+                               "table"}
+
+    @classmethod
+    def instantiate(cls, element_id, parent, additional_metadata={}):
+        metadata = copy(additional_metadata)
+        metadata["id"] = element_id
+        return LookupTableInstance(parent, metadata)
+
+
+class LookupTableInstance(SimpleElement):
+    """
+    Lookup table element. Expects a 'table' or 'cones' and a 'delays'
+    metadata field as described in MacroModel.
+    """
+    def __init__(self, parent, metadata):
+        delays = metadata['delays']
+        table = metadata.get('table')
+        cones = metadata.get('cones')
+        input_count = len(cones.manager.order) if table is None \
+            else (len(table) - 1).bit_length()
+
+        metadata['#inputs'] = input_count
+        metadata['#outputs'] = len(delays)
+        metadata.setdefault('delay', max(delays, default=0))
+
+        self.table = table
+        self.delays = delays
+
+        model = MacroModel(input_count, len(delays), table, delays, cones)
+        super().__init__(parent, metadata, LookupTable, model.evaluate)
+
+    def propagate_change(self, data):
+        # Macro-models are internal to the backend
+        pass
+
+    def clock(self, when):
+        """
+        Like SimpleElement.clock but with a delay for each output.
+
+        :param when: Point in time
+        :return: List of none or more future Event s
+        """
+        self.last_clock = when
+        self.set_metadata_field('input-states', list(self.input_states))
+
+        return [OutEdge(when + self.delays[output], self, output, state)
+                for output, state
+                in enumerate(self.logic_function(self.input_states))]
+
+
+def apply_macro_models(elements, max_inputs=8, max_symbolic_inputs=0):
+    """
+    Replaces the internal elements of all combinational compounds with at
+    most max_inputs inputs by lookup tables during simulation. Compounds of
+    basic gates with at most max_symbolic_inputs inputs are replaced by
+    elements evaluating BDDs. Nested compounds of modelled compounds are
+    not visited.
+
+    Note: The compounds should be idle. Events already scheduled on their
+          internal elements are still processed.
+
+    :param elements: Elements to look for compounds in
+    :param max_inputs: Compounds with more inputs are not modelled by a
+        truth table
+    :param max_symbolic_inputs: Input limit of BDD models
+    :return: List of modelled compounds
+    """
+    modelled = []
+
+    def visit(element):
+        if not isinstance(element, CompoundElementInstance):
+            return
+        if element.macro_model is not None:
+            return
+
+        model = get_macro_model(element, max_inputs, max_symbolic_inputs)
+        if model is None:
+            for child in element.get_children():
+                visit(child)
+            return
+
+        rand = random.Random(element.id() + 1)
+        element.set_macro_model(LookupTableInstance(
+            element, {'id': rand.getrandbits(128),
+                      'table': model.table,
+                      'cones': model.cones,
+                      'delays': model.delays}))
+        modelled.append(element)
+
+    elements = list(elements)
+
+    nested = set()  # Handles of elements inside compounds
+
+    def collect(element):
+        for child in element.get_children():
+            nested.add(child.handle())
+            collect(child)
+
+    for element in elements:
+        if isinstance(element, CompoundElementInstance):
+            collect(element)
+
+    for element in elements:
+        if element.handle() not in nested:
+            visit(element)
+
+    return modelled
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+"""
+Word level evaluation of logic functions.
+
+Bit i of every word carries the state of a signal in the i-th of many
+independent evaluations, e.g. faulty machines or input patterns. Logic
+functions of the basic gates are evaluated with a few integer operations
+on whole words.
+"""
+
+from backend.components.basic_logic_elements import And, Or, Xor, Nand, \
+    Nor
+from backend.components.interconnect import Interconnect
+
+
+def _parallel_and(words, full):
+    result = full
+    for word in words:
+        result &= word
+    return [result]
+
+
+def _parallel_or(words, full):
+    result = 0
+    for word in words:
+        result |= word
+    return [result]
+
+
+def _parallel_one_hot(words, full):
+    ones = many = 0
+    for word in words:
+        many |= ones & word
+        ones |= word
+    return [ones & ~many & full]
+
+
+# Word level equivalents of the logic functions of the basic gates
+_PARALLEL_FUNCTIONS = {
+    And.logic_function: _parallel_and,
+    Or.logic_function: _parallel_or,
+    Xor.logic_function: _parallel_one_hot,
+    Nand.logic_function: lambda words, full: [
+        _parallel_and(words, full)[0] ^ full],
+    Nor.logic_function: lambda words, full: [
+        _parallel_or(words, full)[0] ^ full],
+    Interconnect.logic_function: lambda words, full: [words[0]]
+}
+
+
+def _bitwise(logic_function, width):
+    """
+    :return: Word level function evaluating logic_function bit by bit
+    """
+    def evaluate(words, full):
+        outputs = None
+        for bit in range(width):
+            states = logic_function([(word >> bit) & 1 for word in words])
+            if outputs is None:
+                outputs = [0] * len(states)
+            for port, state in enumerate(states):
+                if state:
+                    outputs[port] |= 1 << bit
+        return outputs
+
+    return evaluate
+
+
+def word_function(logic_function, width):
+    """
+    Returns a function evaluating the given logic function for width
+    machines at once. It takes a list of input words and a word with the
+    lowest width bits set and returns a list of output words.
+
+    :param logic_function: logic_function of a component type
+    :param width: Number of bits in the words
+    """
+    function = _PARALLEL_FUNCTIONS.get(logic_function)
+    return function if function else _bitwise(logic_function, width)
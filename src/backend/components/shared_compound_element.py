@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+"""
+Compound elements sharing a single definition between all their instances.
+
+A CompoundElementInstance owns its children as full blown elements. For
+designs instantiating the same compound thousands of times this means
+thousands of element objects, metadata dictionaries and bank elements per
+compound type. Shared compounds store the structure of the compound once in a
+CompoundDefinition. Instances only keep the state of the internal element
+pins in two arrays and simulate the internal elements themselves. Metadata
+for the internal elements is only created if somebody asks for it using
+expand.
+
+A definition is described by a JSON compatible dictionary:
+
+* 'cells': List of metadata dictionaries of the internal elements. Each must
+  have a 'GUID' of a type providing a logic_function.
+* 'inputs': For each input of the compound a [cell, input] pair it is
+  connected to or None.
+* '#outputs': Number of outputs of the compound
+* 'connections': List of [source cell, output, sink cell, input, delay]
+  entries. A sink cell of -1 refers to an output of the compound.
+
+describe_compound creates such a description from an existing compound
+element.
+"""
+
+from array import array
+from copy import copy
+import json
+import random
+from weakref import WeakKeyDictionary
+
+from backend.component_library import ComponentType
+from backend.components.compound_element import CompoundElementInstance, \
+    InputOutputBankInstance
+from backend.components.interconnect import InterconnectInstance
+from backend.element import Edge
+from backend.simple_element import SimpleElement, OutEdge
+
+# Sink cell referring to the outputs of the compound
+EXTERNAL = -1
+
+# Instance fields of elements that are not part of a definition
+_RUNTIME_FIELDS = frozenset(('id', 'parent', 'inputs', 'outputs',
+                             'input-states', 'output-states', 'state'))
+
+
+class CompoundDefinition:
+    """
+    Compiled form of a compound description shared by all instances of it.
+    """
+    def __init__(self, data, library):
+        """
+        :param data: Description of the compound
+        :param library: Library to look up the types of the cells in
+        """
+        self.data = data
+
+        self.logic_functions = []
+        self.delays = []
+        self.input_offsets = [0]  # cell -> index of its first input
+        self.output_offsets = [0]  # cell -> index of its first output
+
+        outputs = []
+        for cell in data['cells']:
+            component_type = library.component_types[cell['GUID']]
+            logic_function = component_type.logic_function
+            if logic_function is None:
+                raise TypeError("{0} can't be part of a shared compound"
+                                .format(cell['GUID']))
+
+            input_count = cell.get(
+                '#inputs', component_type.get_metadata_field('#inputs'))
+            cell_outputs = logic_function([False] * input_count)
+
+            self.logic_functions.append(logic_function)
+            self.delays.append(
+                cell.get('delay', component_type.get_metadata_field('delay',
+                                                                    0)))
+            self.input_offsets.append(self.input_offsets[-1] + input_count)
+            self.output_offsets.append(self.output_offsets[-1] +
+                                       len(cell_outputs))
+            outputs.extend(cell_outputs)
+
+        self.input_count = len(data['inputs'])
+        self.output_count = data['#outputs']
+
+        self.initial_outputs = array('i', outputs)
+        self.initial_inputs = array('i', [False] * self.input_offsets[-1])
+        self.initial_external_outputs = [False] * self.output_count
+
+        self.cell_of_input = array('i')
+        for cell in range(len(self.logic_functions)):
+            self.cell_of_input.extend(
+                [cell] * (self.input_offsets[cell + 1] -
+                          self.input_offsets[cell]))
+
+        # Compound input -> internal inputs it drives
+        self.entries = tuple(
+            () if entry is None else
+            (self.input_offsets[entry[0]] + entry[1],)
+            for entry in data['inputs'])
+
+        # Internal output -> (target, delay) tuples. Targets are internal
+        # input indices or -(compound output) - 1.
+        sinks = [[] for _ in outputs]
+        for source, output, sink, port, delay in data['connections']:
+            index = self.output_offsets[source] + output
+            state = self.initial_outputs[index]
+            if sink == EXTERNAL:
+                sinks[index].append((-port - 1, delay))
+                self.initial_external_outputs[port] = state
+            else:
+                target = self.input_offsets[sink] + port
+                sinks[index].append((target, delay))
+                # Connecting applies the current state of the source
+                self.initial_inputs[target] = state
+
+        self.sinks = tuple(tuple(s) for s in sinks)
+
+
+# library -> {description key -> CompoundDefinition}. Entries go away
+# together with their library.
+_definitions = WeakKeyDictionary()
+
+
+def get_definition(data, library):
+    """
+    Returns the shared definition for the given description. Equal
+    descriptions result in the same definition.
+
+    :param data: Description of the compound
+    :param library: Library to look up the types of the cells in
+    :return: CompoundDefinition
+    """
+    definitions = _definitions.setdefault(library, {})
+    key = json.dumps(data, sort_keys=True)
+    definition = definitions.get(key)
+    if definition is None:
+        definition = definitions[key] = CompoundDefinition(data, library)
+    return definition
+
+
+def describe_compound(compound):
+    """
+    Creates a description of an existing compound element. Nested compound
+    elements are flattened into the description.
+
+    :param compound: CompoundElementInstance to describe
+    :return: Description usable as 'definition' of a shared compound
+    """
+    cells = []
+    elements = []
+
+    def collect(element):
+        for child in element.get_children():
+            if isinstance(child, CompoundElementInstance):
+                collect(child)
+            elif not isinstance(child, InputOutputBankInstance):
+                elements.append(child)
+
+    collect(compound)
+
+    index_of = {element.handle(): i for i, element in enumerate(elements)}
+    types = compound.get_library().component_types
+
+    for element in elements:
+        guid = element.get_metadata_field('GUID')
+        type_metadata = types[guid].get_metadata()
+        cell = {'GUID': guid}
+        for field, value in element.get_metadata_view().items():
+            if field not in _RUNTIME_FIELDS and \
+                    type_metadata.get(field) != value:
+                cell[field] = value
+        cells.append(cell)
+
+    def resolve(element, port):
+        """:return: (sink cell, port) or (None, port) if unconnected"""
+        while element is not None:
+            if element is compound.output_bank:
+                return EXTERNAL, port
+            if isinstance(element, CompoundElementInstance):
+                element = element.input_bank
+            elif isinstance(element, InputOutputBankInstance):
+                element, port = element.mapping.get(port, (None, 0))
+            else:
+                return index_of.get(element.handle()), port
+        return None, port
+
+    input_count = max(compound.input_bank.mapping, default=-1) + 1
+    inputs = []
+    for port in range(input_count):
+        sink, sink_port = resolve(compound.input_bank, port)
+        inputs.append(None if sink in (None, EXTERNAL) else [sink, sink_port])
+
+    output_count = max(compound.output_bank.mapping, default=-1) + 1
+    connections = []
+    for source, element in enumerate(elements):
+        for output, (target, port, delay) in enumerate(element.outputs):
+            sink, sink_port = resolve(target, port)
+            if sink is None:
+                continue
+            if isinstance(element, InterconnectInstance):
+                output = 0  # All interconnect outputs carry the same state
+            if sink == EXTERNAL:
+                output_count = max(output_count, sink_port + 1)
+            connections.append([source, output, sink, sink_port, delay])
+
+    return {'cells': cells,
+            'inputs': inputs,
+            '#outputs': output_count,
+            'connections': connections}
+
+
+class SharedCompoundElement(ComponentType):
+    """
+    Compound element sharing its definition between instances.
+    """
+    METADATA = {"GUID": "0c5a0a2c-6c43-4c1b-9a57-1d3c8e5a6f0e",
+                "name": "Shared compound element",
+                "description": "Compound element with a definition shared "
+                               "by all its instances"}
+
+    @classmethod
+    def instantiate(cls, element_id, parent, additional_metadata={}):
+        metadata = copy(additional_metadata)
+        metadata["id"] = element_id
+        return SharedCompoundElementInstance(parent, metadata)
+
+
+class SharedCompoundElementInstance(SimpleElement):
+    """
+    Instance of a shared compound element. Internal pins are addressed as
+    inputs and outputs following the ones of the compound itself so internal
+    events are plain Edge and OutEdge events on this element.
+    """
+    def __init__(self, parent, metadata):
+        definition = get_definition(metadata['definition'],
+                                    parent.get_library())
+
+        metadata['definition'] = definition.data  # Share the description
+        metadata['#inputs'] = definition.input_count
+        metadata['#outputs'] = definition.output_count
+        metadata['delay'] = 0
+
+        self.definition = definition
+        self.cell_inputs = array('i', definition.initial_inputs)
+        self.cell_outputs = array('i', definition.initial_outputs)
+        self._dirty = set()  # Cells with changed inputs
+
+        super().__init__(parent, metadata, SharedCompoundElement,
+                         lambda inputs: definition.initial_external_outputs)
+
+    def edge(self, input_port, state):
+        """
+        Handles a rising or falling edge on one of the compound inputs or
+        one of the internal cell inputs.
+
+        :param input_port: Input index
+        :param state: Value of the input (True/False)
+        """
+        if input_port < len(self.input_states):
+            self.input_states[input_port] = state
+            for target in self.definition.entries[input_port]:
+                self.cell_inputs[target] = state
+                self._dirty.add(self.definition.cell_of_input[target])
+        else:
+            target = input_port - len(self.input_states)
+            self.cell_inputs[target] = state
+            self._dirty.add(self.definition.cell_of_input[target])
+
+    def clock(self, when):
+        """
+        Evaluates all cells with changed inputs.
+
+        :param when: Point in time
+        :return: List of none or more future Event s
+        """
+        self.last_clock = when
+        self.set_metadata_field('input-states', list(self.input_states))
+
+        definition = self.definition
+        events = []
+        for cell in sorted(self._dirty):
+            future_output = definition.logic_functions[cell](
+                self.cell_inputs[definition.input_offsets[cell]:
+                                 definition.input_offsets[cell + 1]])
+
+            first_output = definition.output_offsets[cell]
+            events.extend(OutEdge(when + definition.delays[cell],
+                                  self,
+                                  first_output + output,
+                                  fstate)
+                          for output, fstate in enumerate(future_output))
+
+        self._dirty.clear()
+        return events
+
+    def _output(self, when, output, state):
+        if self.cell_outputs[output] == state:
+            return []
+
+        self.cell_outputs[output] = state
+
+        events = []
+        for target, delay in self.definition.sinks[output]:
+            if target >= 0:
+                events.append(Edge(when + delay,
+                                   self,
+                                   len(self.input_states) + target,
+                                   state))
+            else:
+                events.extend(super()._output(when + delay,
+                                              -target - 1,
+                                              state))
+
+        return events
+
+    def expand(self):
+        """
+        Creates metadata for the elements this compound consists of
+        reflecting their current state. Connections to compound outputs
+        are reported as connections to the compound itself.
+
+        Note: The elements aren't part of the simulation. Their metadata is
+              only a snapshot for inspection.
+
+        :return: List of metadata dictionaries. One per internal element.
+        """
+        definition = self.definition
+        cells = definition.data['cells']
+
+        rand = random.Random(self.id())
+        ids = [rand.getrandbits(128) for _ in cells]
+
+        outputs = [[] for _ in cells]
+        inputs = [[(None, 0)] * (definition.input_offsets[cell + 1] -
+                                 definition.input_offsets[cell])
+                  for cell in range(len(cells))]
+
+        for source, output, sink, port, delay in \
+                definition.data['connections']:
+            if sink == EXTERNAL:
+                outputs[source].append((self.id(), port, delay))
+            else:
+                outputs[source].append((ids[sink], port, delay))
+                inputs[sink][port] = (ids[source], output)
+
+        children = []
+        for cell, data in enumerate(cells):
+            data = copy(data)
+            data['id'] = ids[cell]
+            data['parent'] = self.id()
+            data['input-states'] = list(
+                self.cell_inputs[definition.input_offsets[cell]:
+                                 definition.input_offsets[cell + 1]])
+            data['output-states'] = list(
+                self.cell_outputs[definition.output_offsets[cell]:
+                                  definition.output_offsets[cell + 1]])
+            data['inputs'] = inputs[cell]
+            data['outputs'] = outputs[cell]
+            children.append(data)
+
+        return children
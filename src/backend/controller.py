@@ -9,8 +9,19 @@ import multiprocessing
 from contextlib import contextmanager
 import traceback
 from backend.interface import Interface
-from backend.component_library import ComponentRoot, gen_component_id
+from backend.component_library import ComponentRoot, HandleTable, \
+    gen_component_id, materialize
 from backend.element import Edge
+from backend.core import WARN
+from backend.netlist_file import save_netlist, load_netlist
+from backend.delay_annotation import load_delay_file, ALL_OUTPUTS, \
+    DelayAnnotationError
+from backend.simple_element import SimpleElement
+from backend.components.compound_element import CompoundElementInstance
+from backend.components.interconnect import InterconnectInstance
+from backend.fault_simulation import FaultSimulator
+from backend.testbench import load_testbench
+from backend.components.lookup_table import apply_macro_models
 import time
 from logging import getLogger
 
@@ -47,7 +58,10 @@ class Controller(ComponentRoot):
         self._channel_out = queue_type()
         self._channel_in = queue_type()
 
-        self.elements = {}  # ID -> element in simulation
+        # ID -> element in simulation. Elements are addressed by dense
+        # handles inside the backend, the 128bit IDs are only used for
+        # communication with the frontend.
+        self.elements = HandleTable()
         self._top_level_elements = []
 
         self._simulation_rate = 1  # Ratio between SUs and wall-clock time
@@ -65,7 +79,13 @@ class Controller(ComponentRoot):
         # Use a property to do write-only or complex setters.
         self._properties = {'rate': '_simulation_rate',
                             'clock': '_readonly_prop_clock',
-                            'retired_events': '_readonly_prop_retired_events'}
+                            'retired_events': '_readonly_prop_retired_events',
+                            'timestep_budget': '_prop_timestep_budget',
+                            'timestep_policy': '_prop_timestep_policy',
+                            'element_budget': '_prop_element_budget',
+                            'element_policy': '_prop_element_policy',
+                            'budget_window': '_prop_budget_window',
+                            'frozen': '_prop_frozen'}
 
         self._message_handlers = {
             'set-simulation-properties': self._on_set_simu_properties,
@@ -76,8 +96,15 @@ class Controller(ComponentRoot):
             'delete': self._on_delete,
             'serialize': self._on_serialize,
             'deserialize': self._on_deserialize,
+            'save-netlist': self._on_save_netlist,
+            'load-netlist': self._on_load_netlist,
+            'annotate-delays': self._on_annotate_delays,
+            'simulate-faults': self._on_simulate_faults,
+            'run-testbench': self._on_run_testbench,
+            'macro-model': self._on_macro_model,
             'edge': self._on_edge,
             'query': self._on_query,
+            'expand': self._on_expand,
             'connect': self._on_connect,
             'disconnect': self._on_disconnect,
             'enumerate_components': self._on_enumerate_components,
@@ -95,6 +122,28 @@ class Controller(ComponentRoot):
     def _readonly_prop_retired_events(self):
         return self.get_core().retired_events
 
+    def _core_property(name):
+        return property(lambda self: getattr(self.get_core(), name),
+                        lambda self, value: setattr(self.get_core(), name,
+                                                    value))
+
+    _prop_timestep_budget = _core_property('timestep_budget')
+    _prop_timestep_policy = _core_property('timestep_policy')
+    _prop_element_budget = _core_property('element_budget')
+    _prop_element_policy = _core_property('element_policy')
+    _prop_budget_window = _core_property('budget_window')
+    del _core_property
+
+    @property
+    def _prop_frozen(self):
+        return [self.elements.component_id(handle)
+                for handle in self.get_core().frozen]
+
+    @_prop_frozen.setter
+    def _prop_frozen(self, ids):
+        self.get_core().frozen = set(self.elements.handle(element_id)
+                                     for element_id in ids)
+
     def get_interface(self):
         return Interface(self._channel_in)
 
@@ -205,57 +254,287 @@ class Controller(ComponentRoot):
         if element_ids is not None:
             elements = [self.elements[uid] for uid in element_ids]
 
-        def _serialize(element):
-            """
-            Serialize element and instead of having a list of ids as children
-            insert the serialized children themselves into the list.
-            """
-            data = element.get_metadata()
-            data['children'] = [_serialize(c) for c in element.get_children()]
-            return data
-
-        serialization = [_serialize(element) for element in elements]
+        serialization = [self._serialize_element(e) for e in elements]
 
         self._post_to_frontend('serialization', {'data': serialization})
 
         self.log.info("Serialized %s", [e.id() for e in elements])
 
-    def _on_deserialize(self, command):
-        serialization = command['data']
+    @classmethod
+    def _serialize_element(cls, element):
+        """
+        Serialize element and instead of having a list of ids as children
+        insert the serialized children themselves into the list.
 
-        id_mappings = {}  # old id -> new id
-        elements = {}  # new id -> element
-        connections = {}  # element -> connections
+        Returns read-only metadata views instead of dictionaries. They have
+        to be consumed before the elements change, e.g. by posting them.
 
-        self._post_to_frontend('deserialization-start')
+        :param element: Element to serialize
+        """
+        children = [cls._serialize_element(c)
+                    for c in element.get_children()]
+        return element.get_metadata_view({'children': children})
 
-        def _deserialize(datasets):
-            for data in datasets:
-                element_id = gen_component_id()
-                id_mappings[data['id']] = element_id
+    def _on_deserialize(self, command):
+        serialization = command['data']
 
+        def _records(datasets):
+            for data in datasets:
                 # Remove elements we have to rewrite or recreate at
                 # later stages
                 children = data.pop('children')
                 del data['inputs']
                 outgoing = data.pop('outputs')
 
-                parent = elements.get(id_mappings.get(data.get('parent')))
+                yield data, outgoing
 
-                element = self._library.instantiate(
-                    data['GUID'],
-                    element_id,
-                    parent if parent else self,
-                    data)
+                yield from _records(children)
 
-                element.updated()
+        self._instantiate_records(_records(serialization))
 
-                elements[element_id] = element
-                connections[element] = outgoing
+    def _on_save_netlist(self, command):
+        """
+        Writes elements to a netlist file.
 
-                _deserialize(children)
+        :param command: Command of the form:
+            { 'type': 'save-netlist',
+              'path': path,
+              'ids': optional list of element ids }
+        """
+        elements = self._top_level_elements
+        element_ids = command.get('ids')
+        if element_ids is not None:
+            elements = [self.elements[uid] for uid in element_ids]
+
+        # The netlist is encoded right away so no copies are needed
+        save_netlist(command['path'],
+                     [self._serialize_element(e) for e in elements])
+
+        self._post_to_frontend('netlist-saved', {'path': command['path']})
+
+        self.log.info("Saved %s to %s", [e.id() for e in elements],
+                      command['path'])
+
+    def _on_load_netlist(self, command):
+        """
+        Instantiates the elements stored in a netlist file. Replies like
+        a deserialize command.
+
+        :param command: Command of the form:
+            { 'type': 'load-netlist',
+              'path': path }
+        """
+        netlist = load_netlist(command['path'])
+
+        self._instantiate_records(
+            (netlist.metadata(index), netlist.outputs(index))
+            for index in range(len(netlist)))
 
-        _deserialize(serialization)
+    def _on_annotate_delays(self, command):
+        """
+        Applies the gate and connection delays of a delay file to the
+        simulation. Changes are applied in bulk without propagating a change
+        per element.
+
+        :param command: Command of the form:
+            { 'type': 'annotate-delays',
+              'path': path }
+        """
+        annotation = load_delay_file(command['path'])
+
+        by_name = {}
+        for element in self.elements.values():
+            name = element.get_metadata_field('name')
+            if name is not None:
+                by_name.setdefault(name, element)
+
+        def lookup(instance):
+            element = by_name.get(instance)
+            if element is None and instance.isdigit():
+                element = self.elements.get(int(instance))
+            if element is None:
+                raise DelayAnnotationError(
+                    "Unknown instance {0}".format(instance))
+            return element
+
+        # Resolve and validate everything first so a file is either applied
+        # completely or not at all.
+        gate_changes = []  # (element, delay)
+        connection_changes = []  # (element, output port, delay)
+
+        for instance, delay in annotation.gate_delays.items():
+            element = lookup(instance)
+            if isinstance(element, SimpleElement):
+                gate_changes.append((element, delay))
+            elif element.is_net:
+                # Nets only delay their connections
+                connection_changes.extend(
+                    (element, port, delay)
+                    for port in range(len(element.outputs)))
+            else:
+                raise DelayAnnotationError(
+                    "Instance {0} has no gate delay".format(instance))
+
+        for instance, port, delay in annotation.wire_delays:
+            element = lookup(instance)
+            if isinstance(element, CompoundElementInstance):
+                drivers = element.output_drivers(port)
+            elif isinstance(element, (SimpleElement, InterconnectInstance)):
+                if port == ALL_OUTPUTS:
+                    drivers = [(element, output_port) for output_port
+                               in range(len(element.outputs))]
+                elif port < len(element.outputs):
+                    drivers = [(element, port)]
+                else:
+                    raise DelayAnnotationError(
+                        "Instance {0} has no output {1}".format(instance,
+                                                                port))
+            else:
+                raise DelayAnnotationError(
+                    "Instance {0} has no connection delays".format(instance))
+
+            connection_changes.extend((driver, output_port, delay)
+                                      for driver, output_port in drivers)
+
+        for element, delay in gate_changes:
+            element.set_delay(delay, propagate=False)
+
+        connections = 0
+        for element, output_port, delay in connection_changes:
+            if element.set_connection_delay(output_port, delay,
+                                            propagate=False):
+                connections += 1
+
+        self._post_to_frontend('delays-annotated',
+                               {'gates': len(annotation.gate_delays),
+                                'connections': connections})
+
+        self.log.info("Annotated delays from %s", command['path'])
+
+    def _on_simulate_faults(self, command):
+        """
+        Runs a stuck-at fault simulation of all simulated elements. The
+        simulation state itself is not affected.
+
+        :param command: Command of the form:
+            { 'type': 'simulate-faults',
+              'inputs': [(element_id, input_port), ...],
+              'outputs': [(element_id, output_port), ...] or None,
+              'stimulus': [(time, [state, ...]), ...] }
+        """
+        def pins(ids):
+            return [(self.elements[uid], port) for uid, port in ids]
+
+        outputs = command.get('outputs')
+        simulator = FaultSimulator(
+            self.elements.values(),
+            pins(command['inputs']),
+            pins(outputs) if outputs is not None else None)
+        result = simulator.run(command['stimulus'])
+
+        self._post_to_frontend('fault-simulation',
+                               {'coverage': result.coverage,
+                                'detected': result.detected_count,
+                                'faults': [(fault.element.id(),
+                                            fault.port,
+                                            fault.is_output,
+                                            fault.value,
+                                            when)
+                                           for fault, when
+                                           in zip(result.faults,
+                                                  result.detection_times)]})
+
+        self.log.info("Fault simulation detected %d of %d faults",
+                      result.detected_count, len(result.faults))
+
+    def _on_run_testbench(self, command):
+        """
+        Starts applying the vectors of a stimulus file. Once all vectors
+        are checked the mismatches are written to the result file and a
+        testbench-done message is posted.
+
+        :param command: Command of the form:
+            { 'type': 'run-testbench',
+              'path': path,
+              'result-path': path or None,
+              'strobe': delay }
+        """
+        path = command['path']
+        result_path = command.get('result-path')
+        request_id = self._current_request_id
+
+        def done(result):
+            if result_path is not None:
+                result.write(result_path)
+
+            self._post_to_frontend('testbench-done',
+                                   {'path': path,
+                                    'in-reply-to': request_id,
+                                    'vectors': result.vectors,
+                                    'strobes': result.strobes,
+                                    'mismatches': len(result.mismatches)})
+
+            self.log.info("Testbench %s done with %d mismatches",
+                          path, len(result.mismatches))
+
+        core = self.get_core()
+        load_testbench(path).run(core, self.elements,
+                                 command.get('strobe', 0), done,
+                                 core.clock + self._scheduling_epsilon)
+
+    def _on_macro_model(self, command):
+        """
+        Replaces combinational compound elements by lookup tables during
+        simulation.
+
+        :param command: Command of the form:
+            { 'type': 'macro-model',
+              'max-inputs': Compounds with more inputs are not modelled
+                            by a lookup table,
+              'max-symbolic-inputs': Input limit of compounds modelled
+                                     by BDDs (optional) }
+        """
+        modelled = apply_macro_models(self.elements.values(),
+                                      command.get('max-inputs', 8),
+                                      command.get('max-symbolic-inputs', 0))
+
+        self._post_to_frontend('macro-modelled',
+                               {'ids': [compound.id()
+                                        for compound in modelled]})
+
+        self.log.info("Modelled %d compound elements", len(modelled))
+
+    def _instantiate_records(self, records):
+        """
+        Instantiates previously serialized elements with new ids and
+        restores the connections between them.
+
+        :param records: Iterable of (metadata, outgoing connections) tuples
+            in the order the elements should be instantiated in.
+        """
+        id_mappings = {}  # old id -> new id
+        elements = {}  # new id -> element
+        connections = {}  # element -> connections
+
+        self._post_to_frontend('deserialization-start')
+
+        for data, outgoing in records:
+            element_id = gen_component_id()
+            id_mappings[data['id']] = element_id
+
+            parent = elements.get(id_mappings.get(data.get('parent')))
+
+            element = self._library.instantiate(
+                data['GUID'],
+                element_id,
+                parent if parent else self,
+                data)
+
+            element.updated()
+
+            self.elements[element_id] = element
+            elements[element_id] = element
+            connections[element] = outgoing
 
         for element, connections in connections.items():
             for (out_port,
@@ -299,10 +578,25 @@ class Controller(ComponentRoot):
     def _on_query(self, command):
         uid = command['id']
         element = self.elements[uid]
-        self.propagate_change(element.get_metadata())
+        self.propagate_change(element.get_metadata_view())
 
         self.log.info("Queried for %d", uid)
 
+    def _on_expand(self, command):
+        """
+        Propagates the metadata of the internal elements of a shared
+        compound element.
+
+        :param command: Command of the form:
+            { 'type': 'expand',
+              'id': element_id }
+        """
+        uid = command['id']
+        for data in self.elements[uid].expand():
+            self.propagate_change(data)
+
+        self.log.info("Expanded %d", uid)
+
     def _on_connect(self, command):
         source = self.elements[command['source_id']]
         sink = self.elements[command['sink_id']]
@@ -422,6 +716,32 @@ class Controller(ComponentRoot):
         self._last_process_time = time.clock()
         return target_clock, self._last_process_time + scheduling_interval
 
+    def budget_exceeded(self, kind, handles, policy):
+        """
+        Called by the core if elements exceeded their event budget. Reports
+        the offending elements to the frontend.
+
+        :param kind: 'zero-delay-loop' or 'oscillation'
+        :param handles: Handles of the elements causing the violation
+        :param policy: Action taken by the core
+        """
+        elements = [self.elements.instance(handle) for handle in handles]
+        elements = [element for element in elements if element is not None]
+
+        message = "Event budget exceeded by {0} elements ({1}). " \
+            "Action: {2}".format(len(elements), kind, policy)
+
+        self._post_to_frontend('warning' if policy == WARN else 'error',
+                               {'message': message,
+                                'kind': kind,
+                                'action': policy,
+                                'ids': [element.id() for element in elements],
+                                'nets': [element.id() for element in elements
+                                         if element.is_net]})
+
+        self.log.warning("Event budget exceeded (%s) by %s", kind,
+                         [element.id() for element in elements])
+
     def propagate_change(self, data):
         """
         Function for propagating changes up into the simulation frontend.
@@ -453,7 +773,9 @@ class Controller(ComponentRoot):
         if self._current_batch_id is not None:
             message['batch-id'] = self._current_batch_id
 
-        message.update(additional_fields)
+        # Metadata views are only turned into dictionaries now
+        for field, value in additional_fields.items():
+            message[field] = materialize(value)
 
         self._channel_out.put(message)
 
@@ -472,3 +794,9 @@ class Controller(ComponentRoot):
         :return:
         """
         self._top_level_elements.append(child)
+
+    def get_handle_table(self):
+        """
+        :return: HandleTable of all elements in the simulation
+        """
+        return self.elements
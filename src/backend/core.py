@@ -5,16 +5,22 @@
 # Use of this source code is governed by the GNU GPL license that can
 # be found in the LICENSE.txt file.
 #
-from queue import PriorityQueue
 from backend.event import Event
+from backend.event_queue import DelayBucketQueue
 import time
 
 
 # FIXME: Figure out how to best provide logging to the core process
 
+# Actions taken once an event budget is exceeded
+WARN = 'warn'  # Only report the offending elements
+FREEZE = 'freeze'  # Drop all further events of the offending elements
+STOP = 'stop'  # Drop all pending events
+
+
 class Core:
     def __init__(self):
-        self.event_queue = PriorityQueue()
+        self.event_queue = DelayBucketQueue()
 
         self.clock = 0
         self.retired_events = 0
@@ -23,6 +29,24 @@ class Core:
         self._quit = False
         self._controller = None
 
+        # Event budgets guarding against zero delay loops that never leave
+        # a point in time and against oscillating elements.
+        self.timestep_budget = 100000  # Events at a single point in time
+        self.timestep_policy = WARN
+        self.element_budget = 10000  # Events per element and budget window
+        self.budget_window = 1000  # Simulation time units
+        self.element_policy = WARN
+
+        self._timestep_clock = None
+        self._timestep_events = 0
+        # Per element accounting indexed by element handle
+        self._timestep_counts = []  # Clocks at _timestep_stamps[handle]
+        self._timestep_stamps = []
+        self._window_counts = []  # Events since _window_starts[handle]
+        self._window_starts = []
+
+        self.frozen = set()  # Handles of elements whose events are dropped
+
     def __str__(self):
         return "|Core(time={0})|={1}".format(self.clock, len(self.event_queue))
 
@@ -39,7 +63,7 @@ class Core:
         """
 
         if self.event_queue.empty() or \
-                self.event_queue.queue[0].when > upto_clock:
+                self.event_queue.peek().when > upto_clock:
             # If queue is empty circuit is steady state so simulation is
             # infinitely fast. Also we need this clock behavior to make delta
             # timing in the controller work. It totally makes sense though ;)
@@ -53,10 +77,18 @@ class Core:
         self.clock = event.when
         self.group = event.group
 
-        last_in_group = \
-            self.event_queue.empty() or \
-            self.event_queue.queue[0].group != self.group or \
-            self.event_queue.queue[0].when != self.clock
+        if self.frozen and self._drop_frozen(event):
+            return event  # Dropped
+
+        if self.event_queue.empty():
+            last_in_group = True
+        else:
+            following = self.event_queue.peek()
+            last_in_group = following.group != self.group or \
+                following.when != self.clock
+
+        if not self._account(event, last_in_group):
+            return event  # Dropped due to an exceeded budget
 
         followup_events = event.process(last_in_group)
         self.retired_events += 1
@@ -65,6 +97,131 @@ class Core:
 
         return event
 
+    @staticmethod
+    def _handle_of(event):
+        """
+        :return: Handle of the element the event is addressed to or None
+        """
+        group = event.group
+        if type(group) is int and group >= 0:
+            return group  # Edges are grouped by element handle
+
+        element = getattr(event, 'element', None)
+        return element.handle() if element is not None else None
+
+    def _drop_frozen(self, event):
+        """
+        Removes frozen elements from the receivers of the event.
+
+        :param event: Event about to be processed
+        :return: True if nothing is left to deliver
+        """
+        if self._handle_of(event) in self.frozen:
+            return True
+
+        sinks = getattr(event, 'sinks', None)
+        if sinks is None:
+            return False
+
+        # Fan-out edges deliver to many elements at once
+        frozen = self.frozen
+        event.sinks = [sink for sink in sinks
+                       if sink[0].handle() not in frozen]
+        return not event.sinks
+
+    def _account(self, event, last_in_group):
+        """
+        Accounts the event against the event budgets and handles budget
+        violations.
+
+        :param event: Event about to be processed
+        :param last_in_group: True if the event clocks its element
+        :return: False if the event must be dropped
+        """
+        when = event.when
+        if when != self._timestep_clock:
+            self._timestep_clock = when
+            self._timestep_events = 0
+
+        self._timestep_events += 1
+
+        handle = event.group
+        if type(handle) is int and handle >= 0:
+            if handle >= len(self._window_counts):
+                missing = handle + 1 - len(self._window_counts)
+                self._timestep_counts.extend([0] * missing)
+                self._timestep_stamps.extend([None] * missing)
+                self._window_counts.extend([0] * missing)
+                self._window_starts.extend([when] * missing)
+
+            if last_in_group:
+                if self._timestep_stamps[handle] != when:
+                    self._timestep_stamps[handle] = when
+                    self._timestep_counts[handle] = 0
+                self._timestep_counts[handle] += 1
+
+            if when - self._window_starts[handle] >= self.budget_window:
+                self._window_starts[handle] = when
+                self._window_counts[handle] = 0
+            self._window_counts[handle] += 1
+
+            if self._window_counts[handle] > self.element_budget and \
+                    not self._element_budget_exceeded():
+                return False
+
+        if self._timestep_events > self.timestep_budget:
+            return self._timestep_budget_exceeded()
+
+        return True
+
+    def _timestep_budget_exceeded(self):
+        # Elements clocked more than once at this time are part of the
+        # loop. Without any the time step is merely busy.
+        when = self._timestep_clock
+        handles = [handle for handle, count
+                   in enumerate(self._timestep_counts)
+                   if count > 1 and self._timestep_stamps[handle] == when]
+
+        self._timestep_events = 0
+        if not handles:
+            return True
+
+        return self._budget_exceeded('zero-delay-loop', handles,
+                                     self.timestep_policy)
+
+    def _element_budget_exceeded(self):
+        # Elements using a significant part of their budget in the current
+        # window are taking part in the oscillation.
+        when = self._timestep_clock
+        threshold = self.element_budget // 2
+        handles = [handle for handle, count in enumerate(self._window_counts)
+                   if count > threshold and
+                   when - self._window_starts[handle] < self.budget_window]
+
+        for handle in handles:
+            self._window_counts[handle] = 0
+        return self._budget_exceeded('oscillation', handles,
+                                     self.element_policy)
+
+    def _budget_exceeded(self, kind, handles, policy):
+        """
+        Applies the given policy and reports the violation to the controller.
+
+        :param kind: 'zero-delay-loop' or 'oscillation'
+        :param handles: Handles of the elements causing the violation
+        :param policy: One of WARN, FREEZE or STOP
+        :return: True if processing should continue normally
+        """
+        if policy == FREEZE:
+            self.frozen.update(handles)
+        elif policy == STOP:
+            self.event_queue = DelayBucketQueue()
+
+        if self._controller:
+            self._controller.budget_exceeded(kind, handles, policy)
+
+        return policy == WARN
+
     def quit(self):
         """
         Causes the core to terminate execution as soon as possible.
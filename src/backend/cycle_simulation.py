@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+"""
+Cycle-based simulation of synchronous designs.
+
+All flip-flops of the netlist are assumed to share one clock. The
+combinational logic between flip-flops, stimulus inputs and observed
+outputs is levelised once: every gate is placed after all gates driving
+it. A cycle then evaluates each gate exactly once in that order, samples
+the observed outputs and lets all flip-flops capture their D input at once.
+There is no event queue and no timing. Nets are collapsed into the signal
+of their driver.
+
+The levelised netlist is compiled into straight-line Python code with one
+statement per gate which makes a cycle cost about as much as a few
+function calls.
+
+The sampled outputs match an event-driven simulation in which the inputs
+of a cycle are applied, the logic settles and the outputs are sampled just
+before the rising clock edge.
+
+Example use:
+>>> from backend.components import Nand
+>>> from tests.mocks import ElementRootMock
+>>> nand = Nand.instantiate(0, ElementRootMock())
+>>> simulator = CycleSimulator([nand], inputs=[(nand, 0), (nand, 1)])
+>>> simulator.run([(True, True), (False, True)])
+[[False], [True]]
+"""
+
+from backend.simple_element import SimpleElement
+from backend.components.basic_logic_elements import And, Or, Xor, Nand, \
+    Nor
+from backend.components.flip_flop import DFlipFlopInstance
+from backend.components.interconnect import InterconnectInstance
+from backend.components.shared_compound_element import \
+    SharedCompoundElementInstance
+
+# Signal index of the constant False driving unconnected inputs
+CONSTANT = 0
+
+
+class CycleSimulationError(Exception):
+    """Raised for netlists that can't be simulated cycle-based."""
+    pass
+
+
+# Python code of the logic functions of the basic gates as (operator
+# joining the operands, template for the joined operands, code without
+# operands) tuples
+_EXPRESSIONS = {
+    And.logic_function: (" and ", "({0})", "True"),
+    Or.logic_function: (" or ", "({0})", "False"),
+    Nand.logic_function: (" and ", "(not ({0}))", "False"),
+    Nor.logic_function: (" or ", "(not ({0}))", "True"),
+    Xor.logic_function: (" + ", "(({0}) == 1)", "False")
+}
+
+
+class _Gate:
+    """
+    Combinational element of the levelised netlist.
+    """
+    __slots__ = ('element', 'inputs', 'outputs', 'level')
+
+    def __init__(self, element, inputs, outputs):
+        self.element = element
+        self.inputs = inputs  # Signal of each input
+        self.outputs = outputs  # Signal of each output
+        self.level = 0
+
+
+class CycleSimulator:
+    """
+    Simulates a synchronous gate netlist one clock cycle at a time.
+    """
+    def __init__(self, elements, inputs, outputs=None, clock=None):
+        """
+        :param elements: Elements forming the netlist. Elements which only
+            forward their connections, like compound elements, are ignored.
+            Shared compound elements are not supported.
+        :param inputs: List of (element, input port) pins driven by the
+            stimulus. Other inputs without a driver are constant False.
+        :param outputs: List of (element, output port) pins sampled every
+            cycle. Defaults to all unconnected outputs.
+        :param clock: (element, input port) pin of the clock. If given the
+            clock input of every flip-flop must be driven by it.
+        :raises CycleSimulationError: For combinational loops, flip-flops
+            not clocked by the clock and unsupported elements
+        """
+        nodes = []
+        for element in elements:
+            if isinstance(element, SharedCompoundElementInstance):
+                raise CycleSimulationError(
+                    "Shared compound element {0} must be expanded first"
+                    .format(element.id()))
+            elif element.is_sequential and \
+                    not isinstance(element, DFlipFlopInstance):
+                raise CycleSimulationError(
+                    "Sequential element {0} isn't a D flip-flop"
+                    .format(element.id()))
+            elif isinstance(element, (SimpleElement, InterconnectInstance)):
+                nodes.append(element)
+
+        node_set = set(nodes)
+        self._drivers = {}  # (element, input port) -> (element, output port)
+        for element in nodes:
+            for port, (sink, sink_port, _) \
+                    in enumerate(element.flattened_outputs()):
+                if sink in node_set:
+                    self._drivers[(sink, sink_port)] = (element, port)
+
+        self._signal_count = 1  # Signal 0 is CONSTANT
+        self._input_pins = {}  # (element, input port) -> signal
+        for element, port in inputs:
+            self._check_pin(node_set, element, port, False)
+            self._input_pins[(element, port)] = self._new_signal()
+        self.inputs = [self._input_pins[pin] for pin in inputs]
+
+        if clock is not None:
+            # The clock gets a signal of its own which is never evaluated
+            self._check_pin(node_set, clock[0], clock[1], False)
+            clock_signal = self._input_pins[tuple(clock)] = self._new_signal()
+
+        self._output_pins = {}  # (element, output port) -> signal
+        for element in nodes:
+            if not element.is_net:
+                for port in range(len(element.outputs)):
+                    self._output_pins[(element, port)] = self._new_signal()
+
+        self.flip_flops = []
+        self._captures = []  # (D signal, Q signal)
+        gates = []
+        for element in nodes:
+            if element.is_net:
+                continue
+
+            input_signals = [self._input_signal(element, port)
+                             for port in range(len(element.input_states))]
+            output_signals = [self._output_pins[(element, port)]
+                              for port in range(len(element.outputs))]
+
+            if element.is_sequential:
+                if clock is not None and input_signals[1] != clock_signal:
+                    raise CycleSimulationError(
+                        "Flip-flop {0} isn't clocked by the clock".format(
+                            element.id()))
+                self.flip_flops.append(element)
+                self._captures.append((input_signals[0], output_signals[0]))
+            else:
+                gates.append(_Gate(element, input_signals, output_signals))
+
+        if outputs is None:
+            outputs = [(element, port) for element in nodes
+                       for port, (sink, _, _)
+                       in enumerate(element.flattened_outputs())
+                       if sink not in node_set]
+        for element, port in outputs:
+            self._check_pin(node_set, element, port, True)
+        self.outputs = [self._output_signal(element, port)
+                        for element, port in outputs]
+
+        self.levels = self._levelise(gates)
+        self._evaluate, self._capture = self._compile()
+
+        self.values = [False] * self._signal_count
+        for element, (_, q) in zip(self.flip_flops, self._captures):
+            self.values[q] = element.state
+        self.cycles = 0
+
+    def _new_signal(self):
+        self._signal_count += 1
+        return self._signal_count - 1
+
+    @staticmethod
+    def _check_pin(node_set, element, port, is_output):
+        if element not in node_set:
+            raise CycleSimulationError(
+                "{0} is not part of the netlist".format(element.id()))
+
+        count = len(element.outputs) if is_output else len(element.inputs)
+        if not 0 <= port < count:
+            raise CycleSimulationError(
+                "{0} has no port {1}".format(element.id(), port))
+
+    def _input_signal(self, element, port, visited=None):
+        """
+        :return: Signal read by the given input pin
+        """
+        signal = self._input_pins.get((element, port))
+        if signal is not None:
+            return signal
+
+        driver = self._drivers.get((element, port))
+        if driver is None:
+            return CONSTANT
+
+        return self._output_signal(driver[0], driver[1], visited)
+
+    def _output_signal(self, element, port, visited=None):
+        """
+        :return: Signal carried by the given output pin
+        """
+        if not element.is_net:
+            return self._output_pins[(element, port)]
+
+        # Nets carry the signal of their input
+        if visited is None:
+            visited = set()
+        if element in visited:
+            raise CycleSimulationError(
+                "Net {0} drives itself".format(element.id()))
+        visited.add(element)
+        return self._input_signal(element, 0, visited)
+
+    @staticmethod
+    def _levelise(gates):
+        """
+        :return: List of levels, each a list of gates only depending on
+            gates of earlier levels
+        """
+        producer = {}  # signal -> gate
+        for gate in gates:
+            for signal in gate.outputs:
+                producer[signal] = gate
+
+        successors = {gate: [] for gate in gates}
+        pending = {}  # gate -> number of gates driving it
+        for gate in gates:
+            drivers = set(producer[signal] for signal in gate.inputs
+                          if signal in producer)
+            pending[gate] = len(drivers)
+            for driver in drivers:
+                successors[driver].append(gate)
+
+        order = [gate for gate in gates if not pending[gate]]
+        for gate in order:  # Grows while iterating
+            for successor in successors[gate]:
+                successor.level = max(successor.level, gate.level + 1)
+                pending[successor] -= 1
+                if not pending[successor]:
+                    order.append(successor)
+
+        if len(order) != len(gates):
+            raise CycleSimulationError(
+                "Combinational loop through {0}".format(
+                    sorted(gate.element.id() for gate in gates
+                           if pending[gate])))
+
+        levels = [[] for _ in range(max((g.level for g in gates),
+                                        default=-1) + 1)]
+        for gate in order:
+            levels[gate.level].append(gate)
+        return levels
+
+    def _compile(self):
+        """
+        :return: (evaluate, capture) functions taking the signal values.
+            evaluate computes all gates once, capture the next state of
+            all flip-flops.
+        """
+        namespace = {}
+        lines = ["def evaluate(v):"]
+
+        for level in self.levels:
+            for gate in level:
+                operands = ["v[{0}]".format(s) for s in gate.inputs]
+                function = gate.element.logic_function
+                expression = _EXPRESSIONS.get(function)
+                if expression is not None:
+                    operator, template, empty = expression
+                    code = template.format(operator.join(operands)) \
+                        if operands else empty
+                    lines.append("    v[{0}] = {1}".format(
+                        gate.outputs[0], code))
+                else:
+                    name = "f{0}".format(len(namespace))
+                    namespace[name] = function
+                    lines.append("    {0}, = {1}([{2}])".format(
+                        ", ".join("v[{0}]".format(s) for s in gate.outputs),
+                        name, ", ".join(operands)))
+        lines.append("    pass")
+
+        lines.append("def capture(v):")
+        if self._captures:
+            lines.append("    {0}, = {1},".format(
+                ", ".join("v[{0}]".format(q) for _, q in self._captures),
+                ", ".join("v[{0}]".format(d) for d, _ in self._captures)))
+        lines.append("    pass")
+
+        exec(compile("\n".join(lines), "<cycle simulation>", "exec"),
+             namespace)
+        return namespace['evaluate'], namespace['capture']
+
+    @property
+    def state(self):
+        """
+        :return: List with the state of every flip-flop in flip_flops
+        """
+        return [self.values[q] for _, q in self._captures]
+
+    def cycle(self, states):
+        """
+        Simulates one clock cycle.
+
+        :param states: State of each stimulus input during the cycle
+        :return: List with the state of each output sampled before the
+            rising clock edge
+        """
+        if len(states) != len(self.inputs):
+            raise CycleSimulationError("Expected {0} input states".format(
+                len(self.inputs)))
+
+        values = self.values
+        for signal, state in zip(self.inputs, states):
+            values[signal] = bool(state)
+
+        self._evaluate(values)
+        sampled = [values[signal] for signal in self.outputs]
+        self._capture(values)
+
+        self.cycles += 1
+        return sampled
+
+    def run(self, stimulus):
+        """
+        :param stimulus: Iterable of input states, one entry per cycle
+        :return: List of sampled output states, one entry per cycle
+        """
+        return [self.cycle(states) for states in stimulus]
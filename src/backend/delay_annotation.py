@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+"""
+Parser for delay back-annotation files.
+
+The supported format is a subset of the Standard Delay Format (SDF):
+
+(DELAYFILE
+  (TIMESCALE 1)
+  (CELL (CELLTYPE "And") (INSTANCE and1)
+    (DELAY (ABSOLUTE (IOPATH a y (1:2:3)) (IOPATH b y (2)))))
+  (CELL (CELLTYPE "Interconnect") (INSTANCE *)
+    (DELAY (ABSOLUTE (INTERCONNECT net1/0 and1/a (4))
+                     (INTERCONNECT net2/* and1/b (1))))))
+
+* Instances are referred to by their name metadata field or their id.
+* IOPATH entries set the gate delay of the instance. Our elements only
+  have a single delay so the largest IOPATH value is used.
+* INTERCONNECT entries set the delay of the connection on the given output
+  of the driving instance. An output of * sets the delay on all outputs of
+  the instance. The destination is informative only.
+* Values are given as (value), (min:typ:max) where typ is used or as
+  (rise fall) where the larger value is used. All values are multiplied
+  with the TIMESCALE factor if given. Units are not supported.
+
+Example use:
+>>> annotation = parse_delay_file(
+...     '(DELAYFILE (CELL (INSTANCE a) (DELAY (ABSOLUTE (IOPATH x y (2))))))')
+>>> annotation.gate_delays
+{'a': 2}
+"""
+
+import re
+
+# Output port value referring to all outputs of an instance
+ALL_OUTPUTS = None
+
+
+class DelayAnnotationError(Exception):
+    """Raised for delay files that can't be parsed or applied."""
+    pass
+
+
+class DelayAnnotation:
+    """
+    Delays read from a back-annotation file.
+    """
+    def __init__(self):
+        self.gate_delays = {}  # instance -> delay
+        self.wire_delays = []  # (instance, output port or ALL_OUTPUTS, delay)
+
+
+_TOKEN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+
+
+def _parse_expressions(text):
+    """
+    Parses the S-expressions of the file into nested lists of strings.
+    """
+    stack = [[]]
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match:
+            raise DelayAnnotationError(
+                "Unexpected character at {0}".format(position))
+        position = match.end()
+
+        opening, closing, quoted, atom = match.groups()
+        if opening:
+            stack.append([])
+        elif closing:
+            if len(stack) < 2:
+                raise DelayAnnotationError(
+                    "Unbalanced ')' at {0}".format(position))
+            expression = stack.pop()
+            stack[-1].append(expression)
+        else:
+            stack[-1].append(quoted if quoted is not None else atom)
+
+    if len(stack) != 1:
+        raise DelayAnnotationError("Unbalanced '('")
+
+    return stack[0]
+
+
+def _number(token):
+    try:
+        value = float(token)
+    except ValueError:
+        raise DelayAnnotationError("Invalid delay value {0}".format(token))
+    return int(value) if value.is_integer() else value
+
+
+def _delay_value(expressions):
+    """
+    :return: Delay given by the value expressions of an entry or None
+    """
+    values = []
+    for expression in expressions:
+        if not isinstance(expression, list):
+            raise DelayAnnotationError("Expected delay value")
+        for token in expression:
+            triple = token.split(':')
+            if len(triple) == 3:
+                token = triple[1]
+            elif len(triple) != 1:
+                raise DelayAnnotationError(
+                    "Invalid delay value {0}".format(token))
+            if token:
+                values.append(_number(token))
+
+    return max(values) if values else None
+
+
+def _keyword(expression):
+    if not expression or not isinstance(expression[0], str):
+        raise DelayAnnotationError("Expected keyword")
+    return expression[0].upper()
+
+
+def parse_delay_file(text):
+    """
+    Parses the content of a delay file.
+
+    :param text: Content of the file
+    :return: DelayAnnotation
+    """
+    expressions = _parse_expressions(text)
+    if len(expressions) != 1 or \
+            not isinstance(expressions[0], list) or \
+            _keyword(expressions[0]) != 'DELAYFILE':
+        raise DelayAnnotationError("Not a delay file")
+
+    annotation = DelayAnnotation()
+    scale = 1
+
+    for entry in expressions[0][1:]:
+        keyword = _keyword(entry)
+        if keyword == 'TIMESCALE':
+            scale = _number(entry[1])
+        elif keyword == 'CELL':
+            _parse_cell(entry[1:], annotation)
+
+    if scale != 1:
+        annotation.gate_delays = {instance: delay * scale for instance, delay
+                                  in annotation.gate_delays.items()}
+        annotation.wire_delays = [(instance, port, delay * scale)
+                                  for instance, port, delay
+                                  in annotation.wire_delays]
+
+    return annotation
+
+
+def _parse_cell(entries, annotation):
+    instance = None
+    for entry in entries:
+        keyword = _keyword(entry)
+        if keyword == 'INSTANCE':
+            instance = entry[1] if len(entry) > 1 else None
+        elif keyword == 'DELAY':
+            for kind in entry[1:]:
+                # ABSOLUTE and INCREMENT are treated the same
+                for delay in kind[1:]:
+                    _parse_delay(instance, delay, annotation)
+
+
+def _parse_delay(instance, entry, annotation):
+    keyword = _keyword(entry)
+    if keyword == 'IOPATH':
+        if instance in (None, '*'):
+            raise DelayAnnotationError("IOPATH requires an instance")
+        delay = _delay_value(entry[3:])
+        if delay is not None:
+            annotation.gate_delays[instance] = max(
+                delay, annotation.gate_delays.get(instance, delay))
+    elif keyword == 'INTERCONNECT':
+        source, _, port = entry[1].rpartition('/')
+        if not source:
+            raise DelayAnnotationError(
+                "Invalid interconnect source {0}".format(entry[1]))
+        if port == '*':
+            port = ALL_OUTPUTS
+        else:
+            try:
+                port = int(port)
+            except ValueError:
+                raise DelayAnnotationError(
+                    "Invalid interconnect port {0}".format(entry[1]))
+        delay = _delay_value(entry[3:])
+        if delay is not None:
+            annotation.wire_delays.append((source, port, delay))
+
+
+def load_delay_file(path):
+    """
+    :param path: Path of the delay file
+    :return: DelayAnnotation
+    """
+    with open(path, 'r') as f:
+        return parse_delay_file(f.read())
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -24,7 +24,7 @@ class Edge(Event):
         :param state: Signal value after the edge (True/False) at time `when`
             If none processing will be triggered but no value set.
         """
-        super().__init__(when, id(element))
+        super().__init__(when, element.handle())
         self.element = element
         self.input = input
         self.state = state
@@ -33,7 +33,7 @@ class Edge(Event):
         return "Edge(when={0},element={1} ({2}),input={3},state={4}" \
             .format(self.when,
                     self.element.id(),
-                    id(self.element),
+                    self.group,
                     self.input,
                     self.state)
 
@@ -57,13 +57,138 @@ class Edge(Event):
         return self.element.clock(self.when)
 
 
+class FanOutEdge(Event):
+    """
+    Expresses the same scheduled edge on a number of element input pins.
+    Saves scheduling one Edge per pin for signals with high fan-out.
+
+    All edges are applied before any other event scheduled for the same
+    time. Every sink is then clocked in its own group, just like it would
+    be by an Edge, so it is clocked once after all its edges of that time
+    have been applied. Sinks receiving edges after they have been clocked
+    at that time are clocked again.
+    """
+    # Edges have to be applied before the elements are clocked by any other
+    # event at the same time.
+    EDGE_GROUP = -1
+
+    def __init__(self, when, sinks, state):
+        """
+        :param when: Time to schedule the event for
+        :param sinks: List of (element, input) tuples
+        :param state: Signal value after the edge (True/False) at time `when`
+        """
+        super().__init__(when, self.EDGE_GROUP)
+        self.sinks = sinks
+        self.state = state
+
+    def __str__(self):
+        return "FanOutEdge(when={0},sinks={1},state={2}" \
+            .format(self.when,
+                    ','.join("{0}@{1}".format(i, e.handle())
+                             for e, i in self.sinks),
+                    self.state)
+
+    def __eq__(self, other):
+        return isinstance(other, FanOutEdge) \
+            and self.sinks == other.sinks \
+            and self.state == other.state \
+            and self.when == other.when
+
+    def process(self, last):
+        for element, input_port in self.sinks:
+            element.edge(input_port, self.state)
+
+        # Edges without state only clock the element
+        return [Edge(self.when, element, input_port, None)
+                for element, input_port in self.sinks]
+
+
 class Element(ComponentInstance):
     """
     Baseclass for all Elements that are part of the simulation.
     """
+    # True for elements representing nets between other elements
+    is_net = False
+
+    # True for elements holding state, e.g. flip-flops
+    is_sequential = False
+
     def __init__(self, parent, metadata, component_type):
         super().__init__(parent, metadata, component_type)
 
+        self._handle_table = self.get_handle_table()
+        self._flattened_outputs = None
+        self._flattened_epoch = -1
+
+        # Time of the last clock. Must be updated by clock implementations.
+        self.last_clock = -1
+
+    def topology_changed(self):
+        """
+        Must be called whenever a connection between elements changes.
+        Only invalidates the cached connections of elements in the same
+        simulation.
+        """
+        self._handle_table.topology_epoch += 1
+
+    def resolve_sink(self, input_port):
+        """
+        Returns the element actually simulating the given input. Elements
+        merely forwarding their inputs, like the ones compound elements
+        consist of, resolve to the element they are forwarding to. This
+        enables drivers to schedule their edges directly on the element
+        they affect so hierarchy levels cost nothing during simulation.
+
+        :param input_port: Input of this element
+        :return: (element, input port) tuple or None if not connected
+        """
+        return self, input_port
+
+    def set_connection_delay(self, output_port, delay, propagate=True):
+        """
+        Changes the delay of the connection on the given output.
+
+        :param output_port: Output of this element
+        :param delay: New delay in simulation units
+        :param propagate: If false disables propagation of the change
+        :return: True if the output is connected
+        """
+        element, input_port, _ = self.outputs[output_port]
+        if element is None:
+            return False
+
+        self.outputs[output_port] = (element, input_port, delay)
+        self.topology_changed()
+        self.set_metadata_field('outputs',
+                                self._out_con_to_data(self.outputs),
+                                propagate)
+        return True
+
+    def flattened_outputs(self):
+        """
+        Returns the outputs list of this element with every sink resolved
+        using resolve_sink. Results are cached till the next change in
+        connectivity.
+
+        :return: List of (element, input port, delay) tuples. Element is
+            None for outputs not connected to anything simulated.
+        """
+        epoch = self._handle_table.topology_epoch
+        if self._flattened_epoch != epoch:
+            flattened = []
+            for element, input_port, delay in self.outputs:
+                sink = element.resolve_sink(input_port) if element else None
+                if sink is None:
+                    flattened.append((None, 0, delay))
+                else:
+                    flattened.append((sink[0], sink[1], delay))
+
+            self._flattened_outputs = flattened
+            self._flattened_epoch = epoch
+
+        return self._flattened_outputs
+
     @abstractmethod
     def edge(self, input_port, state):
         """
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+"""
+Event queue exploiting the small number of distinct delays in a simulation.
+
+Events are scheduled relative to the current simulation time with one of
+only a few distinct delays (gate and wire delays). All events scheduled with
+the same delay are scheduled in ascending order of time. This queue keeps a
+bucket per delay which means new events almost always end up at the back of
+their bucket. Only the heads of the buckets are kept in a heap.
+
+Example use:
+>>> from backend.event import Event
+>>> class E(Event):
+...     def __init__(self, when, group): super().__init__(when, group)
+...     def process(self, last): return []
+>>> q = DelayBucketQueue()
+>>> for when in (3, 1, 2): q.put(E(when, 0))
+>>> [q.get_nowait().when for _ in range(len(q))]
+[1, 2, 3]
+"""
+
+from bisect import bisect_left
+from heapq import heappush, heappop
+from queue import Empty
+
+
+class DelayBucketQueue:
+    """
+    Priority queue for events ordered by time and group. Provides the
+    subset of the queue.PriorityQueue interface used by the core.
+
+    Events comparing equal are returned in reverse order of insertion.
+    """
+    def __init__(self):
+        # delay -> [first index, list of events, list of their tokens]
+        self._buckets = {}
+        # Heap of (when, group, -token, delay, token) entries for bucket
+        # heads. Every put hands out a new unique token, which keeps the
+        # heap from ever comparing events and identifies stale entries even
+        # if the same event object is queued again.
+        self._heads = []
+        self._sequence = 0
+        self._count = 0
+        self._now = 0  # Time of the event returned last
+
+    def __len__(self):
+        return self._count
+
+    def empty(self):
+        """
+        :return: True if no events are queued
+        """
+        return self._count == 0
+
+    def qsize(self):
+        return self._count
+
+    def put(self, event):
+        """
+        Queues an event.
+
+        :param event: Event to queue
+        """
+        delay = event.when - self._now
+        bucket = self._buckets.get(delay)
+        if bucket is None:
+            bucket = self._buckets[delay] = [0, [], []]
+
+        self._sequence += 1
+        token = self._sequence
+
+        first, events, tokens = bucket
+        if len(events) == first or events[-1] < event:
+            events.append(event)  # Common case
+            tokens.append(token)
+        else:
+            index = bisect_left(events, event, first)
+            events.insert(index, event)
+            tokens.insert(index, token)
+
+        if tokens[first] == token:
+            # New head. Previous head entry in heap becomes stale.
+            self._push_head(bucket, delay)
+
+        self._count += 1
+
+    def _push_head(self, bucket, delay):
+        first, events, tokens = bucket
+        event = events[first]
+        heappush(self._heads,
+                 (event.when, event.group, -tokens[first], delay,
+                  tokens[first]))
+
+    def peek(self):
+        """
+        :return: Next event without removing it from the queue
+        :raises Empty: If the queue is empty
+        """
+        heads = self._heads
+        while heads:
+            delay, token = heads[0][3:]
+            bucket = self._buckets.get(delay)
+            if bucket is not None and bucket[2][bucket[0]] == token:
+                return bucket[1][bucket[0]]
+            heappop(heads)  # Stale entry
+
+        raise Empty()
+
+    def get_nowait(self):
+        """
+        Removes and returns the next event.
+
+        :return: Next event
+        :raises Empty: If the queue is empty
+        """
+        event = self.peek()
+        delay = heappop(self._heads)[3]
+
+        bucket = self._buckets[delay]
+        bucket[0] += 1
+        first, events, tokens = bucket
+        if first == len(events):
+            del self._buckets[delay]
+        else:
+            if first > 64 and first * 2 > len(events):
+                # Drop consumed events
+                del events[:first]
+                del tokens[:first]
+                bucket[0] = 0
+            self._push_head(bucket, delay)
+
+        self._count -= 1
+        self._now = event.when
+        return event
+
+    def get(self, block=True, timeout=None):
+        return self.get_nowait()
+
+    @property
+    def queue(self):
+        """
+        :return: Sequence with the next event as first item
+        """
+        return (self.peek(),) if self._count else ()
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
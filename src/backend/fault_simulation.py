@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+"""
+Bit-parallel single stuck-at fault simulation.
+
+The gate netlist formed by simple elements and interconnects is evaluated
+for a good machine and any number of faulty machines at once. Every signal
+is held in a Python integer whose bit 0 carries the value of the good
+machine while bit i carries the value in the machine with fault i - 1.
+Faults are injected by forcing their bits on the faulty pin.
+
+Evaluation is functional: each stimulus vector is applied and the netlist
+is evaluated with zero delay till it settles. A fault is detected at the
+time of the first vector for which one of the observed outputs differs
+from the good machine.
+
+Example use:
+>>> from backend.components import Nand
+>>> from tests.mocks import ElementRootMock
+>>> nand = Nand.instantiate(0, ElementRootMock())
+>>> simulator = FaultSimulator([nand], inputs=[(nand, 0), (nand, 1)])
+>>> result = simulator.run([(0, (True, True)), (1, (False, True))])
+>>> result.detected_count, len(result.faults)
+(5, 6)
+"""
+
+from collections import namedtuple, deque
+
+from backend.simple_element import SimpleElement
+from backend.components.interconnect import InterconnectInstance
+from backend.components.parallel_logic import word_function
+from backend.components.shared_compound_element import \
+    SharedCompoundElementInstance
+
+
+class FaultSimulationError(Exception):
+    """Raised for netlists that can't be fault simulated."""
+    pass
+
+
+# Single stuck-at fault on the given input or output port of an element
+Fault = namedtuple('Fault', ['element', 'port', 'is_output', 'value'])
+
+
+class FaultSimulationResult:
+    """
+    Outcome of a fault simulation run.
+    """
+    def __init__(self, faults, detection_times, oscillating=()):
+        """
+        :param faults: List of simulated faults
+        :param detection_times: List with the detection time of every fault
+            or None for undetected faults
+        :param oscillating: Undetected faults which caused an oscillation
+            and were no longer simulated afterwards
+        """
+        self.faults = faults
+        self.detection_times = detection_times
+        self.oscillating = list(oscillating)
+
+    @property
+    def detected_count(self):
+        return sum(1 for when in self.detection_times if when is not None)
+
+    @property
+    def coverage(self):
+        """
+        :return: Fraction of detected faults
+        """
+        if not self.faults:
+            return 1.0
+        return self.detected_count / len(self.faults)
+
+    def detected(self):
+        """
+        :return: Dictionary of detected faults to their detection time
+        """
+        return {fault: when for fault, when
+                in zip(self.faults, self.detection_times) if when is not None}
+
+    def undetected(self):
+        """
+        :return: List of faults not detected by the stimulus
+        """
+        return [fault for fault, when
+                in zip(self.faults, self.detection_times) if when is None]
+
+
+class _Node:
+    """
+    Element of the gate netlist.
+    """
+    __slots__ = ('element', 'index', 'function', 'drivers', 'sinks',
+                 'input_masks', 'output_masks', 'outputs')
+
+    def __init__(self, element, index, function, input_count, output_count):
+        self.element = element
+        self.index = index
+        self.function = function
+        # (node, output port) driving each input or None
+        self.drivers = [None] * input_count
+        # Nodes reading each output
+        self.sinks = [[] for _ in range(output_count)]
+        # (force zero mask, force one mask) for each port
+        self.input_masks = [(0, 0)] * input_count
+        self.output_masks = [(0, 0)] * output_count
+        self.outputs = [0] * output_count
+
+
+class FaultSimulator:
+    """
+    Simulates single stuck-at faults on the pins of a gate netlist in
+    parallel with the good machine.
+    """
+    def __init__(self, elements, inputs, outputs=None, faults=None):
+        """
+        :param elements: Elements forming the netlist. Elements which only
+            forward their connections, like compound elements, are ignored.
+            Shared compound elements and sequential elements are not
+            supported.
+        :param inputs: List of (element, input port) pins driven by the
+            stimulus. Other inputs without a driver are constant False.
+        :param outputs: List of (element, output port) pins observed for
+            fault detection. Defaults to all unconnected outputs.
+        :param faults: List of Fault to simulate. Defaults to stuck-at
+            False and True on every pin of the netlist.
+        """
+        self._nodes = []
+        self._node_of = {}
+        functions = []  # (node, logic function) of gates
+
+        for element in elements:
+            if isinstance(element, SharedCompoundElementInstance):
+                raise FaultSimulationError(
+                    "Shared compound element {0} must be expanded first"
+                    .format(element.id()))
+            elif element.is_sequential:
+                raise FaultSimulationError(
+                    "Sequential element {0} can't be fault simulated"
+                    .format(element.id()))
+            elif isinstance(element, SimpleElement):
+                logic_function = element.logic_function
+                input_count = len(element.input_states)
+            elif isinstance(element, InterconnectInstance):
+                logic_function = None
+                input_count = 1
+            else:
+                continue
+
+            output_count = len(element.outputs)
+            # Interconnects carry their input on all outputs
+            node = _Node(element, len(self._nodes),
+                         lambda words, full, n=output_count: words * n,
+                         input_count, output_count)
+            if logic_function is not None:
+                functions.append((node, logic_function))
+
+            self._node_of[element] = node
+            self._nodes.append(node)
+
+        for node in self._nodes:
+            for port, (sink, sink_port, _) \
+                    in enumerate(node.element.flattened_outputs()):
+                sink_node = self._node_of.get(sink)
+                if sink_node is not None:
+                    sink_node.drivers[sink_port] = (node, port)
+                    node.sinks[port].append(sink_node)
+
+        self.inputs = [self._pin(element, port, False)
+                       for element, port in inputs]
+
+        if outputs is None:
+            self.outputs = [(node, port) for node in self._nodes
+                            for port, sinks in enumerate(node.sinks)
+                            if not sinks]
+        else:
+            self.outputs = [self._pin(element, port, True)
+                            for element, port in outputs]
+
+        if faults is None:
+            faults = []
+            for node in self._nodes:
+                for is_output, count in ((False, len(node.drivers)),
+                                         (True, len(node.outputs))):
+                    for port in range(count):
+                        for value in (False, True):
+                            faults.append(Fault(node.element, port,
+                                                is_output, value))
+        self.faults = faults
+
+        for node, logic_function in functions:
+            node.function = word_function(logic_function, len(faults) + 1)
+
+    def _pin(self, element, port, is_output):
+        node = self._node_of.get(element)
+        if node is None:
+            raise FaultSimulationError(
+                "{0} is not part of the netlist".format(element.id()))
+
+        count = len(node.outputs) if is_output else len(node.drivers)
+        if not 0 <= port < count:
+            raise FaultSimulationError(
+                "{0} has no port {1}".format(element.id(), port))
+
+        return node, port
+
+    def _inject(self):
+        """
+        Sets the masks forcing the faulty bits of every faulty pin.
+        """
+        for node in self._nodes:
+            node.input_masks = [(0, 0)] * len(node.drivers)
+            node.output_masks = [(0, 0)] * len(node.outputs)
+            node.outputs = [0] * len(node.outputs)
+
+        for bit, fault in enumerate(self.faults, 1):
+            node, port = self._pin(fault.element, fault.port, fault.is_output)
+            masks = node.output_masks if fault.is_output else node.input_masks
+            zeros, ones = masks[port]
+            if fault.value:
+                masks[port] = (zeros, ones | 1 << bit)
+            else:
+                masks[port] = (zeros | 1 << bit, ones)
+
+    def run(self, stimulus, max_evaluations=None):
+        """
+        Applies the stimulus to the good and all faulty machines.
+
+        :param stimulus: Iterable of (time, states) tuples with one state
+            for each of the stimulus inputs, in ascending order of time.
+        :param max_evaluations: Element evaluations per vector after which
+            the machines still changing are considered oscillating.
+            Defaults to 64 times the number of elements.
+        :return: FaultSimulationResult
+        """
+        if max_evaluations is None:
+            max_evaluations = 64 * max(len(self._nodes), 1)
+
+        self._inject()
+
+        full = (1 << (len(self.faults) + 1)) - 1
+        # (node, port) -> word applied by the stimulus
+        input_words = dict.fromkeys(self.inputs, 0)
+        detected = 0
+        oscillating = 0  # Faulty machines ignored from now on
+        detection_times = [None] * len(self.faults)
+
+        pending = deque(self._nodes)  # Initially everything is evaluated
+        queued = set(node.index for node in self._nodes)
+
+        for when, states in stimulus:
+            if len(states) != len(self.inputs):
+                raise FaultSimulationError(
+                    "Expected {0} states at {1}".format(len(self.inputs),
+                                                        when))
+
+            for pin, state in zip(self.inputs, states):
+                word = full if state else 0
+                if input_words[pin] != word:
+                    input_words[pin] = word
+                    node = pin[0]
+                    if node.index not in queued:
+                        queued.add(node.index)
+                        pending.append(node)
+
+            oscillating = self._settle(pending, queued, input_words, full,
+                                       oscillating, max_evaluations, when)
+
+            difference = 0
+            for node, port in self.outputs:
+                word = node.outputs[port]
+                difference |= word ^ (full if word & 1 else 0)
+
+            newly_detected = difference & ~detected & ~oscillating
+            if newly_detected:
+                detected |= newly_detected
+                for bit in range(1, len(self.faults) + 1):
+                    if newly_detected >> bit & 1:
+                        detection_times[bit - 1] = when
+
+        return FaultSimulationResult(
+            list(self.faults), detection_times,
+            [fault for bit, fault in enumerate(self.faults, 1)
+             if oscillating >> bit & 1 and not detected >> bit & 1])
+
+    @staticmethod
+    def _settle(pending, queued, input_words, full, ignored, max_evaluations,
+                when):
+        """
+        Evaluates pending elements till no signal changes anymore.
+
+        Faulty machines can oscillate with zero delay even if the good
+        machine does not. Machines still changing after max_evaluations are
+        tracked for another max_evaluations and then ignored.
+
+        :return: Mask of ignored machines
+        """
+        evaluations = 0
+        unsettled = 0
+        while pending:
+            evaluations += 1
+            if evaluations > 2 * max_evaluations:
+                if unsettled & 1:
+                    raise FaultSimulationError(
+                        "Netlist did not settle at {0}".format(when))
+                ignored |= unsettled
+                unsettled = 0
+                evaluations = 0
+
+            node = pending.popleft()
+            queued.discard(node.index)
+
+            words = []
+            for port, driver in enumerate(node.drivers):
+                word = input_words.get((node, port))
+                if word is None:
+                    word = driver[0].outputs[driver[1]] if driver else 0
+                zeros, ones = node.input_masks[port]
+                words.append(word & ~zeros | ones)
+
+            for port, word in enumerate(node.function(words, full)):
+                zeros, ones = node.output_masks[port]
+                word = word & ~zeros | ones
+                changed = (word ^ node.outputs[port]) & ~ignored
+                node.outputs[port] = word
+                if changed:
+                    if evaluations > max_evaluations:
+                        unsettled |= changed
+                    for sink in node.sinks[port]:
+                        if sink.index not in queued:
+                            queued.add(sink.index)
+                            pending.append(sink)
+
+        return ignored
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -217,6 +217,147 @@ class Interface:
 
         return request_id
 
+    def save_netlist(self, path, ids=None):
+        """
+        Schedules writing the given list of element IDs to a netlist file.
+
+        :param path: Path of the file to write
+        :param ids: List of IDs. If none everything is saved.
+        :return: Request id
+        """
+        request_id = self._gen_request_id()
+
+        request = {
+            'type': 'save-netlist',
+            'path': path,
+            'request-id': request_id
+        }
+
+        if ids is not None:
+            request['ids'] = ids
+
+        self._channel_out.put(request)
+
+        return request_id
+
+    def load_netlist(self, path):
+        """
+        Schedules instantiation of the elements in a netlist file. Replies
+        are the same as for deserialize.
+
+        :param path: Path of a file written by save_netlist
+        :return: Request id
+        """
+        request_id = self._gen_request_id()
+
+        self._channel_out.put(
+            {
+                'type': 'load-netlist',
+                'path': path,
+                'request-id': request_id
+            }
+        )
+
+        return request_id
+
+    def annotate_delays(self, path):
+        """
+        Schedules applying the delays in a back-annotation file to the
+        simulation.
+
+        :param path: Path of the delay file
+        :return: Request id
+        """
+        request_id = self._gen_request_id()
+
+        self._channel_out.put(
+            {
+                'type': 'annotate-delays',
+                'path': path,
+                'request-id': request_id
+            }
+        )
+
+        return request_id
+
+    def simulate_faults(self, inputs, stimulus, outputs=None):
+        """
+        Schedules a stuck-at fault simulation against the given stimulus.
+        The result is posted as a fault-simulation message.
+
+        :param inputs: List of (element id, input port) driven by stimulus
+        :param stimulus: List of (time, [state, ...]) vectors
+        :param outputs: List of (element id, output port) to observe. If
+            none all unconnected outputs are observed.
+        :return: Request id
+        """
+        request_id = self._gen_request_id()
+
+        request = {
+            'type': 'simulate-faults',
+            'inputs': inputs,
+            'stimulus': stimulus,
+            'request-id': request_id
+        }
+
+        if outputs is not None:
+            request['outputs'] = outputs
+
+        self._channel_out.put(request)
+
+        return request_id
+
+    def run_testbench(self, path, result_path=None, strobe=0):
+        """
+        Schedules applying the vectors of a stimulus file starting at the
+        current simulation time. Completion is signaled by a testbench-done
+        message.
+
+        :param path: Path of the CSV stimulus file
+        :param result_path: Optional path to write mismatches to
+        :param strobe: Delay between applying a vector and checking its
+            expected outputs
+        :return: Request id
+        """
+        request_id = self._gen_request_id()
+
+        self._channel_out.put(
+            {
+                'type': 'run-testbench',
+                'path': path,
+                'result-path': result_path,
+                'strobe': strobe,
+                'request-id': request_id
+            }
+        )
+
+        return request_id
+
+    def apply_macro_models(self, max_inputs=8, max_symbolic_inputs=0):
+        """
+        Schedules replacing combinational compound elements by lookup tables
+        during simulation. The ids of the replaced compounds are posted in a
+        macro-modelled message.
+
+        :param max_inputs: Compounds with more inputs are not modelled by a
+            lookup table
+        :param max_symbolic_inputs: Wider compounds of basic gates with at
+            most this many inputs are modelled by BDDs
+        :return: Request id
+        """
+        request_id = self._gen_request_id()
+
+        self._channel_out.put(
+            {
+                'type': 'macro-model',
+                'max-inputs': max_inputs,
+                'max-symbolic-inputs': max_symbolic_inputs,
+                'request-id': request_id
+            }
+        )
+
+        return request_id
+
     def enumerate_components(self):
         """
         Asks the backend to enumerate all component GUIDs registered
@@ -276,6 +417,26 @@ class Interface:
 
         return request_id
 
+    def expand_element(self, element_id):
+        """
+        Requests the metadata of the elements a shared compound element
+        consists of. They are posted as change messages.
+
+        :param element_id: Id of the shared compound element
+        :return: Request id
+        """
+        request_id = self._gen_request_id()
+
+        self._channel_out.put(
+            {
+                'type': 'expand',
+                'id': element_id,
+                'request-id': request_id
+            }
+        )
+
+        return request_id
+
     def connect(self, source_id, source_port, sink_id, sink_port, delay=0):
         """
         Schedules a connection of the source_port of the to the sink_port.
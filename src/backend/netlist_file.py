@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+"""
+Compact columnar file format for netlists.
+
+The nested metadata dictionaries produced by the 'serialize' message repeat
+every key for every element and carry 128bit ids as python integers. This
+module stores the same information column wise:
+
+* a string table holding GUIDs, names and the JSON encoding of all metadata
+  fields that have no dedicated column,
+* element arrays (id, GUID, name, nesting parent, position, delay, ...),
+* output and input connections in CSR form (one offset array per element and
+  flat target, port and delay arrays).
+
+All arrays are stored little endian and 8 byte aligned so a file can be
+memory-mapped and its columns accessed as memoryviews without parsing
+anything on a per element basis. Numeric columns remember whether a value
+was an integer, so it is restored as one.
+
+Limitation: Metadata fields without a dedicated column (e.g. the fields of
+the component type or a line tree) are kept as JSON. Reconstructing the
+metadata of an element parses its JSON string.
+
+Example use:
+>>> data = [{'id': 5, 'GUID': 'foo', 'name': 'bar', 'children': [],
+...          'inputs': [], 'outputs': []}]
+>>> NetlistFile(encode_netlist(data)).to_serialization() == data
+True
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b'LSNL'
+VERSION = 2
+
+# Sentinel values for absent entries in numeric columns
+NO_INDEX = -1
+NO_COUNT = -1
+NO_VALUE = float('nan')
+
+# Encoding of connection endpoints referring to elements outside the file
+# as -(index into external id table) - 2. -1 stays reserved for NO_INDEX.
+_EXTERNAL_OFFSET = 2
+
+# Metadata fields stored in dedicated columns or reconstructed from them
+_COLUMN_FIELDS = frozenset(('id', 'GUID', 'children', 'inputs', 'outputs'))
+
+# Numeric metadata fields with a float column each. Bit n of the int_fields
+# column is set if field n was an integer.
+_NUMERIC_FIELDS = ('x', 'y', 'delay')
+
+# Integers beyond this lose precision as floats
+_MAX_EXACT_INT = 2 ** 53
+
+# Section layout. Each entry is (name, array typecode).
+_SECTIONS = (('string_offsets', 'Q'),
+             ('string_data', 'B'),
+             ('id_low', 'Q'),
+             ('id_high', 'Q'),
+             ('guid', 'i'),
+             ('name', 'i'),
+             ('nesting', 'i'),
+             ('x', 'd'),
+             ('y', 'd'),
+             ('delay', 'd'),
+             ('int_fields', 'B'),
+             ('inputs_count', 'i'),
+             ('outputs_count', 'i'),
+             ('extra', 'i'),
+             ('out_offsets', 'Q'),
+             ('out_target', 'q'),
+             ('out_port', 'q'),
+             ('out_delay', 'd'),
+             ('out_delay_is_int', 'B'),
+             ('in_offsets', 'Q'),
+             ('in_source', 'q'),
+             ('in_port', 'q'),
+             ('external_low', 'Q'),
+             ('external_high', 'Q'))
+
+_HEADER = struct.Struct('<4sHH' + 'Q' * len(_SECTIONS))
+_ALIGNMENT = 8
+
+
+class NetlistFormatError(Exception):
+    """Raised when reading data that isn't a valid netlist file."""
+    pass
+
+
+def _split_id(component_id):
+    return component_id & 0xFFFFFFFFFFFFFFFF, component_id >> 64
+
+
+class _StringTable:
+    """Deduplicating string table used while encoding."""
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+
+    def add(self, string):
+        if string is None:
+            return NO_INDEX
+        position = self.index.get(string)
+        if position is None:
+            position = self.index[string] = len(self.strings)
+            self.strings.append(string)
+        return position
+
+    def columns(self):
+        offsets = array('Q', [0])
+        data = bytearray()
+        for string in self.strings:
+            data.extend(string.encode('utf-8'))
+            offsets.append(len(data))
+        return offsets, array('B', data)
+
+
+def _is_float(value):
+    return type(value) is float
+
+
+def _is_int(value):
+    return type(value) is int
+
+
+def _is_exact_int(value):
+    return _is_int(value) and -_MAX_EXACT_INT <= value <= _MAX_EXACT_INT
+
+
+def encode_netlist(serialization):
+    """
+    Encodes the data of a 'serialization' message into the columnar format.
+
+    :param serialization: List of (nested) element metadata dictionaries as
+        found in the data field of a 'serialization' message.
+    :return: bytes of the encoded netlist
+    """
+    records = []  # (metadata, nesting index) in pre-order
+
+    def flatten(datasets, nesting):
+        for data in datasets:
+            index = len(records)
+            records.append((data, nesting))
+            flatten(data.get('children', []), index)
+
+    flatten(serialization, NO_INDEX)
+
+    strings = _StringTable()
+    columns = {name: array(typecode) for name, typecode in _SECTIONS}
+    index_of = {data['id']: i for i, (data, _) in enumerate(records)}
+    external = {}
+
+    def endpoint(component_id):
+        if component_id is None:
+            return NO_INDEX
+        index = index_of.get(component_id)
+        if index is not None:
+            return index
+        if component_id not in external:
+            external[component_id] = len(external)
+            low, high = _split_id(component_id)
+            columns['external_low'].append(low)
+            columns['external_high'].append(high)
+        return -external[component_id] - _EXTERNAL_OFFSET
+
+    columns['out_offsets'].append(0)
+    columns['in_offsets'].append(0)
+
+    for data, nesting in records:
+        low, high = _split_id(data['id'])
+        columns['id_low'].append(low)
+        columns['id_high'].append(high)
+        columns['guid'].append(strings.add(data['GUID']))
+        columns['nesting'].append(nesting)
+
+        extra = {}
+        for field, value in data.items():
+            if field not in _COLUMN_FIELDS:
+                extra[field] = value
+
+        name = extra.get('name')
+        if type(name) is str:
+            del extra['name']
+        else:
+            name = None
+        columns['name'].append(strings.add(name))
+
+        int_fields = 0
+        for bit, field in enumerate(_NUMERIC_FIELDS):
+            value = extra.get(field)
+            if _is_float(value):
+                columns[field].append(extra.pop(field))
+            elif _is_exact_int(value):
+                columns[field].append(extra.pop(field))
+                int_fields |= 1 << bit
+            else:
+                columns[field].append(NO_VALUE)
+        columns['int_fields'].append(int_fields)
+
+        for field, column in (('#inputs', 'inputs_count'),
+                              ('#outputs', 'outputs_count')):
+            if _is_int(extra.get(field)):
+                columns[column].append(extra.pop(field))
+            else:
+                columns[column].append(NO_COUNT)
+
+        columns['extra'].append(
+            strings.add(json.dumps(extra, sort_keys=True)) if extra
+            else NO_INDEX)
+
+        for target, port, delay in data.get('outputs', []):
+            columns['out_target'].append(endpoint(target))
+            columns['out_port'].append(port)
+            columns['out_delay'].append(delay)
+            columns['out_delay_is_int'].append(_is_int(delay))
+        columns['out_offsets'].append(len(columns['out_target']))
+
+        for source, port in data.get('inputs', []):
+            columns['in_source'].append(endpoint(source))
+            columns['in_port'].append(port)
+        columns['in_offsets'].append(len(columns['in_source']))
+
+    columns['string_offsets'], columns['string_data'] = strings.columns()
+
+    if sys.byteorder != 'little':
+        for name, column in columns.items():
+            column.byteswap()
+
+    offsets = []
+    body = bytearray()
+    position = _HEADER.size + (-_HEADER.size) % _ALIGNMENT
+    for name, _ in _SECTIONS:
+        offsets.append(position)
+        raw = columns[name].tobytes()
+        body.extend(raw)
+        padding = (-len(raw)) % _ALIGNMENT
+        body.extend(b'\0' * padding)
+        position += len(raw) + padding
+
+    header = _HEADER.pack(MAGIC, VERSION, 0, *offsets)
+    header += b'\0' * ((-len(header)) % _ALIGNMENT)
+    return header + bytes(body) + struct.pack('<Q', position)
+
+
+class NetlistFile:
+    """
+    Read access to an encoded netlist. Columns are exposed as memoryviews
+    into the underlying buffer so opening even big files is cheap.
+    """
+    def __init__(self, buffer):
+        """
+        :param buffer: Object supporting the buffer protocol (bytes, mmap)
+            containing an encoded netlist.
+        """
+        self._buffer = buffer
+        view = memoryview(buffer)
+
+        if len(view) < _HEADER.size + 8:
+            raise NetlistFormatError("File too short")
+
+        header = _HEADER.unpack_from(view, 0)
+        magic, version = header[0], header[1]
+        if magic != MAGIC:
+            raise NetlistFormatError("Not a netlist file")
+        if version != VERSION:
+            raise NetlistFormatError("Unsupported version {0}".format(version))
+
+        offsets = list(header[3:])
+        (end,) = struct.unpack_from('<Q', view, len(view) - 8)
+        offsets.append(end)
+
+        for (name, typecode), start, stop in zip(_SECTIONS,
+                                                 offsets, offsets[1:]):
+            raw = view[start:stop]
+            itemsize = struct.calcsize(typecode)
+            raw = raw[:len(raw) - len(raw) % itemsize]
+            if sys.byteorder == 'little':
+                column = raw.cast(typecode)
+            else:
+                column = array(typecode, raw.tobytes())
+                column.byteswap()
+            setattr(self, name, column)
+
+        # Alignment padding adds trailing entries to narrow columns
+        count = len(self.id_low)
+        for name in ('guid', 'name', 'nesting', 'int_fields',
+                     'inputs_count', 'outputs_count', 'extra'):
+            setattr(self, name, getattr(self, name)[:count])
+        self.out_delay_is_int = \
+            self.out_delay_is_int[:len(self.out_target)]
+        self.string_data = self.string_data[:self.string_offsets[-1]]
+
+    @classmethod
+    def open(cls, path):
+        """
+        Memory-maps the netlist file at the given path.
+
+        :param path: Path of the file to open
+        :return: NetlistFile instance
+        """
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer)
+
+    def __len__(self):
+        """
+        :return: Number of elements in the netlist
+        """
+        return len(self.id_low)
+
+    def string(self, index):
+        """
+        :return: String with the given index in the string table or None
+        """
+        if index == NO_INDEX:
+            return None
+        start = self.string_offsets[index]
+        stop = self.string_offsets[index + 1]
+        return bytes(self.string_data[start:stop]).decode('utf-8')
+
+    def element_id(self, index):
+        """
+        :return: Component id of the element with the given index
+        """
+        return self.id_low[index] | (self.id_high[index] << 64)
+
+    def endpoint_id(self, encoded):
+        """
+        :return: Component id an encoded connection endpoint refers to
+        """
+        if encoded == NO_INDEX:
+            return None
+        if encoded >= 0:
+            return self.element_id(encoded)
+        external = -encoded - _EXTERNAL_OFFSET
+        return self.external_low[external] | \
+            (self.external_high[external] << 64)
+
+    def metadata(self, index):
+        """
+        Reconstructs the metadata of an element excluding connections and
+        children.
+
+        :param index: Element index
+        :return: Metadata dictionary
+        """
+        extra = self.string(self.extra[index])
+        data = json.loads(extra) if extra is not None else {}
+
+        data['id'] = self.element_id(index)
+        data['GUID'] = self.string(self.guid[index])
+
+        name = self.string(self.name[index])
+        if name is not None:
+            data['name'] = name
+
+        int_fields = self.int_fields[index]
+        for bit, field in enumerate(_NUMERIC_FIELDS):
+            value = getattr(self, field)[index]
+            if value == value:  # Not NaN
+                data[field] = int(value) if int_fields >> bit & 1 else value
+
+        for field, column in (('#inputs', self.inputs_count),
+                              ('#outputs', self.outputs_count)):
+            value = column[index]
+            if value != NO_COUNT:
+                data[field] = value
+
+        return data
+
+    def outputs(self, index):
+        """
+        :return: Output connections of the given element as list of
+            (sink id, sink port, delay) tuples.
+        """
+        return [(self.endpoint_id(self.out_target[i]),
+                 self.out_port[i],
+                 int(self.out_delay[i]) if self.out_delay_is_int[i]
+                 else self.out_delay[i])
+                for i in range(self.out_offsets[index],
+                               self.out_offsets[index + 1])]
+
+    def inputs(self, index):
+        """
+        :return: Input connections of the given element as list of
+            (source id, source port) tuples.
+        """
+        return [(self.endpoint_id(self.in_source[i]), self.in_port[i])
+                for i in range(self.in_offsets[index],
+                               self.in_offsets[index + 1])]
+
+    def to_serialization(self):
+        """
+        :return: Data as found in the data field of a 'serialization'
+            message.
+        """
+        top_level = []
+        datasets = []
+        for index in range(len(self)):
+            data = self.metadata(index)
+            data['inputs'] = self.inputs(index)
+            data['outputs'] = self.outputs(index)
+            data['children'] = []
+            datasets.append(data)
+
+            nesting = self.nesting[index]
+            if nesting == NO_INDEX:
+                top_level.append(data)
+            else:
+                datasets[nesting]['children'].append(data)
+
+        return top_level
+
+
+def save_netlist(path, serialization):
+    """
+    Writes the given serialization as netlist file.
+
+    :param path: Path of the file to write
+    :param serialization: Data of a 'serialization' message
+    """
+    with open(path, 'wb') as f:
+        f.write(encode_netlist(serialization))
+
+
+def load_netlist(path):
+    """
+    :param path: Path of the netlist file
+    :return: Memory-mapped NetlistFile
+    """
+    return NetlistFile.open(path)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -32,7 +32,7 @@ class OutEdge(Event):
         return "OutEdge(when={0},element={1} ({2}),output={3},state={4}" \
             .format(self.when,
                     self.element.id(),
-                    id(self.element),
+                    self.element.handle(),
                     self.output,
                     self.state)
 
@@ -94,7 +94,6 @@ class SimpleElement(Element):
                                 False)
 
         self.delay = delay
-        self.last_clock = -1
 
     @classmethod
     def _out_con_to_data(cls, connections):
@@ -111,6 +110,16 @@ class SimpleElement(Element):
                                      ','.join([str(i) for i in
                                                self.output_states]))
 
+    def set_delay(self, delay, propagate=True):
+        """
+        Changes the propagation delay of the element.
+
+        :param delay: New delay in simulation units
+        :param propagate: If false disables propagation of the change
+        """
+        self.delay = delay
+        self.set_metadata_field('delay', delay, propagate)
+
     def edge(self, input_port, state):
         """
         Handles a rising or falling edge on one of the elements inputs.
@@ -131,7 +140,8 @@ class SimpleElement(Element):
         :param when: Point in time
         :return: List of none or more future Event s
         """
-        assert self.last_clock != when, "Repeated clock for {0}".format(when)
+        # Repeated clocks at the same time are possible in zero delay loops.
+        # Those are detected by the event budgets of the core.
         self.last_clock = when
 
         self.set_metadata_field('input-states', list(self.input_states))
@@ -166,6 +176,7 @@ class SimpleElement(Element):
             return False
 
         self.outputs[output_port] = (element, input_port, delay)
+        self.topology_changed()
 
         self.set_metadata_field('outputs', self._out_con_to_data(self.outputs))
 
@@ -196,6 +207,7 @@ class SimpleElement(Element):
             return False
 
         self.outputs[output_port] = (None, 0, 0)
+        self.topology_changed()
 
         self.set_metadata_field('outputs', self._out_con_to_data(self.outputs))
 
@@ -278,7 +290,7 @@ class SimpleElement(Element):
         self.output_states[output] = state
         self.set_metadata_field('output-states', list(self.output_states))
 
-        element, input_port, delay = self.outputs[output]
+        element, input_port, delay = self.flattened_outputs()[output]
         if element is None:
             return []  # Nothing connected. No follow-up events
 
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+"""
+Testbench applying stimulus vectors from a file and checking outputs.
+
+Stimulus files are CSV tables with one vector per row:
+
+time,in:12:0,in:12:1,out:14:0
+0,0,1,
+10,1,,0
+20,,0,1
+
+* The time column holds the time of the vector relative to the start of
+  the testbench. Rows must be in ascending order of time.
+* in:<id>:<port> columns drive the given element input. Empty cells leave
+  the input unchanged.
+* out:<id>:<port> columns hold the expected state of the given element
+  output. They are checked at the time of the vector plus the strobe
+  delay before anything else happens at that time. Empty cells and X
+  are not checked.
+
+Vectors are streamed into the core by a single event re-scheduling itself
+for the next vector. Rows are only read from the file when due.
+"""
+
+import csv
+
+from backend.event import Event
+from backend.element import FanOutEdge
+
+# Strobes sample the outputs before any other event at their time
+STROBE_GROUP = -3
+# Stimulus is applied before the edges scheduled for the same time
+STIMULUS_GROUP = -2
+
+
+class TestbenchError(Exception):
+    """Raised for invalid stimulus files."""
+    pass
+
+
+def _parse_pin(column):
+    """
+    :return: (element id, port) tuple of an in:<id>:<port> column
+    """
+    try:
+        _, element_id, port = column.split(':')
+        return int(element_id), int(port)
+    except ValueError:
+        raise TestbenchError("Invalid column {0}".format(column))
+
+
+def _parse_state(cell, allow_unknown):
+    cell = cell.strip()
+    if cell == '1':
+        return True
+    elif cell == '0':
+        return False
+    elif cell == '' or (allow_unknown and cell.upper() == 'X'):
+        return None
+
+    raise TestbenchError("Invalid state {0}".format(cell))
+
+
+def observe(element, output_port):
+    """
+    :return: Current state of the given output of the element
+    """
+    output_states = getattr(element, 'output_states', None)
+    if output_states is not None:
+        return bool(output_states[output_port])
+
+    return bool(element.state)  # Interconnect
+
+
+class Testbench:
+    """
+    Stimulus and expected outputs read from a table.
+    """
+    def __init__(self, header, rows):
+        """
+        :param header: List of column names
+        :param rows: Iterable of lists of cells following the header
+        """
+        if not header or header[0].strip() != 'time':
+            raise TestbenchError("First column must be time")
+
+        self.inputs = []  # (element id, input port)
+        self.outputs = []  # (element id, output port)
+        self._columns = []  # (is output, index into inputs or outputs)
+
+        for column in header[1:]:
+            column = column.strip()
+            if column.startswith('in:'):
+                self._columns.append((False, len(self.inputs)))
+                self.inputs.append(_parse_pin(column))
+            elif column.startswith('out:'):
+                self._columns.append((True, len(self.outputs)))
+                self.outputs.append(_parse_pin(column))
+            else:
+                raise TestbenchError("Invalid column {0}".format(column))
+
+        self._rows = rows
+
+    def vectors(self):
+        """
+        Parses the rows on demand.
+
+        :return: Iterator of (time, input states, expected output states)
+            tuples. States are None for cells without a value.
+        """
+        last = None
+        for row in self._rows:
+            if not row:
+                continue
+
+            if len(row) != len(self._columns) + 1:
+                raise TestbenchError("Expected {0} columns in {1}".format(
+                    len(self._columns) + 1, row))
+
+            try:
+                when = int(row[0])
+            except ValueError:
+                raise TestbenchError("Invalid time {0}".format(row[0]))
+
+            if last is not None and when < last:
+                raise TestbenchError("Vector at {0} out of order".format(
+                    when))
+            last = when
+
+            inputs = [None] * len(self.inputs)
+            expected = [None] * len(self.outputs)
+            for (is_output, index), cell in zip(self._columns, row[1:]):
+                if is_output:
+                    expected[index] = _parse_state(cell, True)
+                else:
+                    inputs[index] = _parse_state(cell, False)
+
+            yield when, inputs, expected
+
+    def run(self, core, elements, strobe=0, on_done=None, start=None):
+        """
+        Schedules application of the vectors in the core.
+
+        :param core: Core to schedule in
+        :param elements: Mapping from element id to element
+        :param strobe: Delay between applying a vector and checking the
+            expected outputs of the vector
+        :param on_done: Called with the TestbenchResult once all vectors
+            have been applied and checked
+        :param start: Time vector times are relative to. Defaults to the
+            current core clock.
+        :return: TestbenchResult filled in while the simulation proceeds
+        """
+        result = TestbenchResult()
+        inputs = [elements[element_id].resolve_sink(port)
+                  for element_id, port in self.inputs]
+        outputs = [(elements[element_id], port)
+                   for element_id, port in self.outputs]
+
+        if start is None:
+            start = core.clock
+
+        stimulus = StimulusEvent(start, self.vectors(), inputs, outputs,
+                                 strobe, result, on_done)
+        if stimulus.advance():
+            core.schedule(stimulus)
+        else:
+            result.done = True
+            if on_done:
+                on_done(result)
+
+        return result
+
+
+def load_testbench(path):
+    """
+    Opens a stimulus file. The file is read while the testbench runs.
+
+    :param path: Path of the CSV stimulus file
+    :return: Testbench
+    """
+    def rows():
+        with open(path, 'r', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # Header
+            for row in reader:
+                yield row
+
+    with open(path, 'r', newline='') as f:
+        header = next(csv.reader(f), None)
+
+    return Testbench(header, rows())
+
+
+class TestbenchResult:
+    """
+    Outcome of a testbench run.
+    """
+    def __init__(self):
+        self.vectors = 0
+        self.strobes = 0
+        # List of (time, element id, output port, expected, actual)
+        self.mismatches = []
+        self.done = False
+
+    def write(self, path):
+        """
+        Writes a summary line followed by one line per mismatch.
+
+        :param path: Path of the result file
+        """
+        with open(path, 'w', newline='') as f:
+            f.write("# vectors={0} strobes={1} mismatches={2}\n".format(
+                self.vectors, self.strobes, len(self.mismatches)))
+            writer = csv.writer(f)
+            for when, element_id, port, expected, actual in self.mismatches:
+                writer.writerow([when, "{0}:{1}".format(element_id, port),
+                                 int(expected), int(actual)])
+
+
+class StrobeEvent(Event):
+    """
+    Compares the outputs with the expected states of a vector.
+    """
+    def __init__(self, when, outputs, expected, result, on_done=None,
+                 last=False):
+        super().__init__(when, STROBE_GROUP)
+        self.outputs = outputs
+        self.expected = expected
+        self.result = result
+        self.on_done = on_done
+        self.last = last  # Strobe of the last vector completing the run
+
+    def process(self, last):
+        result = self.result
+        if any(state is not None for state in self.expected):
+            result.strobes += 1
+
+        for (element, port), state in zip(self.outputs, self.expected):
+            if state is None:
+                continue
+            actual = observe(element, port)
+            if actual != state:
+                result.mismatches.append((self.when, element.id(), port,
+                                          state, actual))
+
+        if self.last:
+            result.done = True
+            if self.on_done is not None:
+                self.on_done(result)
+
+        return []
+
+
+class StimulusEvent(Event):
+    """
+    Applies the vectors of a testbench one after the other. The event
+    re-schedules itself for the time of the next vector.
+    """
+    def __init__(self, start, vectors, inputs, outputs, strobe, result,
+                 on_done):
+        """
+        :param start: Time the vector times are relative to
+        :param vectors: Iterator of vectors from Testbench.vectors
+        :param inputs: List of (element, input port) driven by the vectors
+        :param outputs: List of (element, output port) checked by strobes
+        :param strobe: Delay of the output checks
+        :param result: TestbenchResult to record into
+        :param on_done: Callback for the completed run
+        """
+        super().__init__(start, STIMULUS_GROUP)
+        self.start = start
+        self.vectors = vectors
+        self.inputs = inputs
+        self.outputs = outputs
+        self.strobe = strobe
+        self.result = result
+        self.on_done = on_done
+
+        self.states = [None] * len(inputs)  # Last applied state per input
+        self.next_vector = None
+
+    def advance(self):
+        """
+        Moves to the next vector.
+
+        :return: False if all vectors have been applied
+        """
+        self.next_vector = next(self.vectors, None)
+        if self.next_vector is None:
+            return False
+
+        self.when = self.start + self.next_vector[0]
+        return True
+
+    def process(self, last):
+        when = self.when
+        _, inputs, expected = self.next_vector
+        self.result.vectors += 1
+
+        rising = []
+        falling = []
+        for index, state in enumerate(inputs):
+            if state is None or state == self.states[index]:
+                continue
+            self.states[index] = state
+            sink = self.inputs[index]
+            if sink is not None:
+                (rising if state else falling).append(sink)
+
+        events = [FanOutEdge(when, sinks, state)
+                  for sinks, state in ((rising, True), (falling, False))
+                  if sinks]
+
+        if self.advance():
+            if any(state is not None for state in expected):
+                events.append(StrobeEvent(when + self.strobe, self.outputs,
+                                          expected, self.result))
+            events.append(self)
+        else:
+            # The strobe of the last vector completes the run
+            events.append(StrobeEvent(when + self.strobe, self.outputs,
+                                      expected, self.result, self.on_done,
+                                      last=True))
+
+        return events
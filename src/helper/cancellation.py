@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+"""
+Cooperative cancellation of work running on another thread.
+"""
+import threading
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancellationToken:
+    """
+    Flag shared between the thread doing some work and the threads that
+    might want to stop it. The work checks it regularly.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def is_cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        """Throws Cancelled if the token was cancelled."""
+        if self._event.is_set():
+            raise Cancelled()
+
+
+def cancellable(fun, token):
+    """
+    Decorator checking the token before calling the given function. Like
+    time_limited this is meant to wrap callbacks that are called
+    repeatedly by e.g. algorithms.
+
+    :param fun: Function to decorate
+    :param token: CancellationToken or None to never cancel
+    :return: decorated fun
+    """
+    if token is None:
+        return fun
+
+    def cancellable_execution(*args, **argv):
+        token.check()
+        return fun(*args, **argv)
+
+    return cancellable_execution
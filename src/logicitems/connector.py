@@ -57,12 +57,11 @@ class ConnectorItem(StateLineItem, ItemBase):
 
         con_items = set()
         if self.scene() is not None:
-            for item in self.scene().items(self.endPoint()):
+            for item in self.scene().items_at_point(self.endPoint()):
                 if item is not self:
                     if isinstance(item, LineTree):
                         con_items.add(item)
-                    elif isinstance(item, ConnectorItem) and \
-                            self.endPoint() == item.endPoint():
+                    elif isinstance(item, ConnectorItem):
                         assert item.parentItem() is not None
                         con_items.add(item.parentItem())
         return con_items
@@ -317,14 +317,17 @@ class InsertableItem(ItemBase, metaclass=InsertableRegistry):
         self._last_position = new_pos
 
         # notify change
+        self.invalidate_obstacles()
         self.register_change_during_inactivity()
 
     def itemChange(self, change, value):
         if change is QtGui.QGraphicsItem.ItemSceneChange:
+            self.invalidate_obstacles()  # of the old scene
             self._additional_notify_con_items = self.items_at_connections()
             self._additional_notify_pos_items = self.items_at_position()
         # on scene change
         elif change is QtGui.QGraphicsItem.ItemSceneHasChanged:
+            self.invalidate_obstacles()
             # re-register
             self._unregister()
             self._register()
@@ -337,6 +340,7 @@ class InsertableItem(ItemBase, metaclass=InsertableRegistry):
             self._invalidate_position_is_valid()
         # Register, unregister and notify surrounding on temporary state change
         elif change is ItemBase.ItemTemporaryHasChanged:
+            self.invalidate_obstacles()
             if value:
                 self._unregister()
             else:
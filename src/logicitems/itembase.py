@@ -88,6 +88,15 @@ class ItemBase(QtGui.QGraphicsItem):
         """
         return self.scene() is not None and self.scene().is_inactive()
 
+    def prepareGeometryChange(self):
+        super().prepareGeometryChange()
+        self.invalidate_obstacles()
+
+    def invalidate_obstacles(self):
+        """Notify the scene that the occupied grid points might change."""
+        if self.scene() is not None:
+            self.scene().invalidate_obstacles(self)
+
     # TODO: remove underscore of name
     @classmethod
     def _line_to_col_rect(cls, line, radius=None):
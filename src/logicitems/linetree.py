@@ -10,6 +10,7 @@ Lines are connected in trees from one output to multiple inputs.
 '''
 
 import copy
+import math
 
 from PySide import QtGui, QtCore
 from PySide.QtCore import QPointF, QLineF
@@ -78,7 +79,17 @@ class LineTree(StateLineItem, ConnectableItem):
                 pivot = p
             return root
 
-        return {'tree': cls._encode_tree(path_to_tree(path))}
+        return cls.metadata_from_tree(path_to_tree(path))
+
+    @classmethod
+    def metadata_from_tree(cls, tree):
+        """
+        Return metadata representing given tree.
+
+        :param tree: Tree given as dict of dict, with points in scene
+            coordinates as tuples (x, y) and only one root.
+        """
+        return {'tree': cls._encode_tree(tree)}
 
     @classmethod
     def GUI_GUID(cls):
@@ -181,9 +192,8 @@ class LineTree(StateLineItem, ConnectableItem):
                     # collect connections at point
                     scene_point = self.mapToScene(*point)
                     con_items = [item for item in
-                                 self.scene().items(scene_point)
-                                 if isinstance(item, ConnectorItem) and
-                                 item.endPoint() == scene_point]
+                                 self.scene().items_at_point(scene_point)
+                                 if isinstance(item, ConnectorItem)]
                     if len(con_items) >= 1 and \
                             len(children) >= (2 if root else 1) or \
                             len(con_items) >= 2:
@@ -193,20 +203,22 @@ class LineTree(StateLineItem, ConnectableItem):
 
         # there might be also connectors in the middle of lines.
         def iter_edge_indicators_in_lines(tree):
-            if self.scene() is None:
+            scene = self.scene()
+            if scene is None:
                 return
             for line in self._iter_lines(self._tree):
                 scene_line = QLineF(self.mapToScene(line.p1()),
                                     self.mapToScene(line.p2()))
-                l_bounding_rect = self._line_to_col_rect(scene_line)
-                for item in self.scene().items(l_bounding_rect):
-                    if isinstance(item, ConnectorItem) and \
-                            l_bounding_rect.contains(item.endPoint()) and \
-                            item.endPoint() != scene_line.p1() and \
-                            item.endPoint() != scene_line.p2():
-                        if item.is_input() or self.is_inactive():
+                for point in self._iter_grid_points_of_line(
+                        scene_line, scene.get_grid_spacing()):
+                    scene_point = QPointF(*point)
+                    if scene_point in (scene_line.p1(), scene_line.p2()):
+                        continue
+                    for item in scene.items_at_point(scene_point):
+                        if isinstance(item, ConnectorItem) and \
+                                (item.is_input() or self.is_inactive()):
                             yield LineEdgeIndicator(
-                                self, self.mapFromScene(item.endPoint()))
+                                self, self.mapFromScene(scene_point))
 
         self._edge_indicators = \
             list(iter_edge_indicators_at_edges(self._tree)) + \
@@ -289,6 +301,56 @@ class LineTree(StateLineItem, ConnectableItem):
             for item in self._iter_lines(children, _origin=destination):
                 yield item
 
+    def iter_scene_lines(self):
+        """
+        Iterator over all lines of the tree.
+
+        :return: iterator over QLineF in scene coordinates
+        """
+        for line in self._lines:
+            yield QLineF(self.mapToScene(line.p1()),
+                         self.mapToScene(line.p2()))
+
+    def iter_connection_points(self, scene=None):
+        """
+        Iterator over all points items can connect to.
+
+        These are the edges and all grid points on the lines.
+
+        :param scene: scene defining the grid or None for own scene
+        :return: iterator over points in scene coordinates as tuples
+        """
+        if scene is None:
+            scene = self.scene()
+        points = set()
+        for line in self.iter_scene_lines():
+            points.add(line.p1().toTuple())
+            points.add(line.p2().toTuple())
+            if scene is not None:
+                points.update(self._iter_grid_points_of_line(
+                    line, scene.get_grid_spacing()))
+        return iter(points)
+
+    @staticmethod
+    def _iter_grid_points_of_line(scene_line, spacing):
+        """
+        Iterator over the grid points on a horizontal or vertical line.
+
+        :param scene_line: QLineF in scene coordinates
+        :param spacing: grid spacing
+        :return: iterator over points in scene coordinates as tuples
+        """
+        (x1, y1), (x2, y2) = sorted((scene_line.p1().toTuple(),
+                                     scene_line.p2().toTuple()))
+        if y1 == y2 and y1 % spacing == 0:
+            for x in range(math.ceil(x1 / spacing),
+                           math.floor(x2 / spacing) + 1):
+                yield x * spacing, y1
+        elif x1 == x2 and x1 % spacing == 0:
+            for y in range(math.ceil(y1 / spacing),
+                           math.floor(y2 / spacing) + 1):
+                yield x1, y * spacing
+
     def _iter_edges(self, tree):
         """
         Iterator over all edges in the given tree.
@@ -320,13 +382,12 @@ class LineTree(StateLineItem, ConnectableItem):
 
         con_items = set()
         if scene is not None:
-            scene_shape = self.mapToScene(self._shape)
-            for item in scene.items(scene_shape):
-                if isinstance(item, ConnectorItem) and \
-                        not item.is_temporary() and \
-                        item.is_position_valid() and \
-                        scene_shape.contains(item.endPoint()):
-                    con_items.add(item)
+            for point in self.iter_connection_points(scene):
+                for item in scene.items_at_point(QPointF(*point)):
+                    if isinstance(item, ConnectorItem) and \
+                            not item.is_temporary() and \
+                            item.is_position_valid():
+                        con_items.add(item)
         return list(con_items)
 
     def numer_of_driving_inputs(self, scene=None):
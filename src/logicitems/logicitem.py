@@ -65,7 +65,7 @@ class LogicItem(ConnectableItem, QtGui.QGraphicsLayoutItem):
     def connect_all_outputs(self):
         """Overrides connect_all_outputs."""
         for con_item in self._outputs:
-            items = self.scene().items(con_item.endPoint())
+            items = self.scene().items_at_point(con_item.endPoint())
             found = False
             # first try to connect to line-trees
             for item in items:
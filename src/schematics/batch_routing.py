@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Routes the lines of whole netlists, e.g. after importing circuits.
+'''
+
+import logicitems
+from algorithms.batch_router import route_nets
+from algorithms.steiner_router import steiner_tree_search
+
+
+def route_connections(scene, connections, processes=1):
+    """
+    Routes lines for connections between the items placed in the scene.
+
+    All connections from the same output form one net and are connected
+    by a single line tree.
+
+    :param scene: GridScene containing the items
+    :param connections: Iterable of connections given as tuples
+        (source_id, source_port, sink_id, sink_port) as for
+        Interface.connect
+    :param processes: Number of processes, see batch_router.route_nets
+    :return: Dictionary mapping (source_id, source_port) to the metadata of
+        the LineTree of the net or to None, if it could not be routed.
+        Nets whose terminals all meet at one point need no lines and are
+        left out.
+    """
+    registry = scene.registry()
+
+    def end_point(item_id, port, is_input):
+        item = registry.frontend_item(item_id)
+        for child in item.childItems():
+            if isinstance(child, logicitems.ConnectorItem) and \
+                    child.is_input() == is_input and child.port() == port:
+                return scene.to_grid(child.endPoint())
+        raise KeyError("Item {} has no {} port {}".format(
+            item_id, "input" if is_input else "output", port))
+
+    nets = {}
+    for source_id, source_port, sink_id, sink_port in connections:
+        key = (source_id, source_port)
+        if key not in nets:
+            nets[key] = [end_point(source_id, source_port, False)]
+        nets[key].append(end_point(sink_id, sink_port, True))
+
+    trees = route_nets(nets, dict(scene.obstacle_index().items()),
+                       _get_search_rect(scene, []), processes)
+    return {key: None if tree is None else _tree_to_metadata(scene, tree)
+            for key, tree in trees.items() if tree != {}}
+
+
+def route_net(scene, points):
+    """
+    Routes a single line tree connecting all points at once.
+
+    Connecting e.g. an output to many inputs this way yields less wire and
+    fewer bends than routing every input separately. The interactive line
+    mode still draws one connection at a time and merges it into the
+    existing trees, since the user only gives one end point per click.
+
+    :param scene: GridScene containing the items
+    :param points: Points in scene coordinates as list of QPointF. The
+        first one is the root of the tree.
+    :return: Metadata of the LineTree or None, if it could not be routed.
+    """
+    grid_points = [scene.to_grid(point) for point in points]
+    search_rect = _get_search_rect(scene, grid_points)
+    # connector ends are part of their items
+    obstacles = scene.obstacle_index().view(
+        search_rect, {point: None for point in grid_points})
+    tree = steiner_tree_search(grid_points, obstacles, search_rect)
+    if not tree:
+        return None
+    return _tree_to_metadata(scene, tree)
+
+
+def _get_search_rect(scene, grid_points):
+    # leave space around the scene for lines to get around items
+    bound_rect = scene.itemsBoundingRect()
+    corners = [scene.to_grid(bound_rect.topLeft()),
+               scene.to_grid(bound_rect.bottomRight())] + grid_points
+    return [(min(x for x, _ in corners) - 2, min(y for _, y in corners) - 2),
+            (max(x for x, _ in corners) + 2, max(y for _, y in corners) + 2)]
+
+
+def _tree_to_metadata(scene, tree):
+    def to_scene(tree):
+        return {scene.to_scene_point(point).toTuple(): to_scene(children)
+                for point, children in tree.items()}
+
+    return logicitems.LineTree.metadata_from_tree(to_scene(tree))
@@ -9,6 +9,7 @@
 Defines scene that contain all the parts of the schematics.
 '''
 
+import math
 from logging import getLogger
 
 from threading import Thread
@@ -20,8 +21,10 @@ from backend.core import Core
 from backend.controller import Controller
 from backend.component_library import get_library
 from logicitems.item_registry import ItemRegistry
-from logicitems.insertable_item import InsertableRegistry
+from logicitems.insertable_item import InsertableItem, InsertableRegistry
 from actions.action_stack_model import ActionStackModel
+from algorithms.hightower import Solid, LineEdge, PassableLine
+from algorithms.obstacle_index import ObstacleIndex
 import logicitems
 
 
@@ -83,6 +86,16 @@ class GridScene(QtGui.QGraphicsScene):
         self._is_undo_grouping = False
         self._undo_group_id = 0
 
+        # obstacles for line routing, updated lazily
+        self._obstacle_index = ObstacleIndex()
+        self._obstacles_of_item = {}  # item -> set of (point, obj)
+        self._items_with_changed_obstacles = set()
+
+        # items located at points for connection lookups, updated lazily
+        self._point_index = {}  # scene point as tuple -> set of items
+        self._points_of_item = {}  # item -> set of (point, item)
+        self._items_with_changed_points = set()
+
     def _setup_backend(self):
         """Setup simulation backend for this scene."""
         self._core = Core()
@@ -337,6 +350,149 @@ class GridScene(QtGui.QGraphicsScene):
         if self.is_inactive():
             self._registered_during_inactivity.add(item)
 
+    def invalidate_obstacles(self, item):
+        """
+        Notify the scene that the item might occupy other grid points.
+
+        Items call this before their geometry changes, when they move or
+        when they are added or removed. The obstacle index and the point
+        index are updated the next time they are requested.
+        """
+        self._items_with_changed_obstacles.add(item.topLevelItem())
+        self._items_with_changed_points.add(item.topLevelItem())
+
+    def items_at_point(self, scene_point):
+        """
+        Returns the items located at the given point.
+
+        These are connectors ending at the point and line trees with an
+        edge or a line through the grid point. Temporary items are
+        included. Overlapping item bodies are not indexed, use the BSP tree
+        query of QGraphicsScene.items for those.
+
+        :param scene_point: Point in scene coordinates as QtCore.QPointF
+        :return: set of items
+        """
+        self._update_point_index()
+        return self._items_in_scene(
+            self._point_index.get(scene_point.toTuple(), ()))
+
+    def _items_in_scene(self, items):
+        """
+        :return: set of items, that have not been removed from the scene
+        """
+        res = set()
+        for item in items:
+            if item.scene() is self:
+                res.add(item)
+            else:
+                # removed after the index was updated
+                self._items_with_changed_points.add(item.topLevelItem())
+        return res
+
+    def _update_point_index(self):
+        """Updates the point index for all changed items."""
+        index = self._point_index
+        changed_items = self._items_with_changed_points
+        self._items_with_changed_points = set()
+        for item in changed_items:
+            if item.scene() is self and isinstance(
+                    item, (InsertableItem, logicitems.ConnectorItem)):
+                points = set(self._iter_item_points(item))
+            else:
+                points = set()
+            old_points = self._points_of_item.pop(item, set())
+            for point, owner in old_points - points:
+                index[point].discard(owner)
+                if not index[point]:
+                    del index[point]
+            for point, owner in points - old_points:
+                index.setdefault(point, set()).add(owner)
+            if points:
+                self._points_of_item[item] = points
+
+    def _iter_item_points(self, item):
+        """
+        :return: iterator over (scene point as tuple, item located there)
+            for the item and its connectors
+        """
+        if isinstance(item, logicitems.ConnectorItem):
+            yield item.endPoint().toTuple(), item
+            return
+        if isinstance(item, logicitems.LineTree):
+            for point in item.iter_connection_points():
+                yield point, item
+            return
+        for child in item.childItems():
+            if isinstance(child, logicitems.ConnectorItem):
+                yield child.endPoint().toTuple(), child
+
+    def obstacle_index(self):
+        """
+        Returns the index of the grid points occupied by the items.
+
+        Line trees occupy their grid points with LineEdge at edges and
+        PassableLine otherwise. All other insertable items, including their
+        children, are Solid wherever their shape covers a grid point.
+        Temporary items are not considered.
+
+        :return: algorithms.obstacle_index.ObstacleIndex
+        """
+        index = self._obstacle_index
+        for item in self._items_with_changed_obstacles:
+            if item.scene() is self and not item.is_temporary() and \
+                    isinstance(item, InsertableItem):
+                obstacles = set(self._iter_item_obstacles(item))
+            else:
+                obstacles = set()
+            old_obstacles = self._obstacles_of_item.pop(item, set())
+            for point, obj in old_obstacles - obstacles:
+                index.remove(point, obj)
+            for point, obj in obstacles - old_obstacles:
+                index.add(point, obj)
+            if obstacles:
+                self._obstacles_of_item[item] = obstacles
+        self._items_with_changed_obstacles.clear()
+        return index
+
+    def _iter_item_obstacles(self, item):
+        """
+        :return: iterator over (grid point, CollisionObject) occupied by item
+        """
+        if isinstance(item, logicitems.LineTree):
+            points = set()
+            for line in item.iter_scene_lines():
+                (x1, y1), (x2, y2) = sorted((self.to_grid(line.p1()),
+                                             self.to_grid(line.p2())))
+                points.update((x, y) for x in range(x1, x2 + 1)
+                              for y in range(y1, y2 + 1))
+            for point in points:
+                if item.is_edge(self.to_scene_point(point)):
+                    yield point, LineEdge
+                else:
+                    yield point, PassableLine
+            return
+
+        spacing = self.get_grid_spacing()
+        points = set()
+        pending = [item]
+        while pending:
+            child = pending.pop()
+            pending.extend(child.childItems())
+            if isinstance(child, (logicitems.LineAnchorIndicator,
+                                  logicitems.LineEdgeIndicator)):
+                continue
+            rect = child.sceneBoundingRect()
+            for x in range(math.ceil(rect.left() / spacing),
+                           math.floor(rect.right() / spacing) + 1):
+                for y in range(math.ceil(rect.top() / spacing),
+                               math.floor(rect.bottom() / spacing) + 1):
+                    if (x, y) not in points and child.contains(
+                            child.mapFromScene(self.to_scene_point((x, y)))):
+                        points.add((x, y))
+        for point in points:
+            yield point, Solid
+
     def mousePressEvent(self, mouseEvent):
         # Hack: prevent clearing the selection, e.g. while dragging or pressing
         # the right mouse button
@@ -9,12 +9,16 @@
 Defines submode functionality when inserting lines
 """
 
+from logging import getLogger
+import threading
+
 from PySide import QtCore
 
 from .submode_base import InsertLineSubModeBase, line_submode_filtered
 import logicitems
-from helper.time_limited import time_limited, TimeReached
 import algorithms.hightower as hightower
+from algorithms.route_search import RouteSearch
+from helper.cancellation import CancellationToken, Cancelled
 
 
 class InsertingLineSubMode(InsertLineSubModeBase):
@@ -22,6 +26,8 @@ class InsertingLineSubMode(InsertLineSubModeBase):
     # time budget to search for lines
     _max_line_search_time = 0.3
     """While new lines are inserted."""
+    # additional time budget of the maze router when hightower fails
+    _max_maze_search_time = 0.3
 
     def __init__(self, *args, **kargs):
         super().__init__(*args, **kargs)
@@ -36,6 +42,15 @@ class InsertingLineSubMode(InsertLineSubModeBase):
         self._insert_line_start_end_last = None
         # stores temporarily inserted line route object
         self._temp_line_route = None
+        # routes from the current start point
+        self._routing_session = None
+        # start point for the next line and whether to stop inserting,
+        # stored by a click waiting for the route to its end point
+        self._pending_click = None
+        # searches routes in the background, started on first use
+        self._routing_thread = LineRoutingThread()
+        self._routing_thread.found.connect(self._on_route_found)
+        self.destroyed.connect(lambda: self._routing_thread.quit(True))
 
     @line_submode_filtered
     def mousePressEvent(self, event):
@@ -46,20 +61,52 @@ class InsertingLineSubMode(InsertLineSubModeBase):
 
         # left button
         if event.button() is QtCore.Qt.LeftButton:
+            if self._pending_click is not None:
+                return  # still waiting for the route of the last click
             self.update_line_anchor_indicator(event.pos())
-            self.commit_inserted_temp_line()
-            # if there is no anchor, immediately start inserting new lines
-            if self._line_anchor is None:
-                self._do_start_insert_lines(event.pos())
-            else:  # otherwise stop for now
-                self.setLinesubMode(ReadyToInsertLineSubMode)
+            # if there is no anchor, immediately start inserting new lines,
+            # otherwise stop for now
+            self._pending_click = (self.get_line_insertion_point(
+                event.pos()), self._line_anchor is not None)
+            # the route to the current end point might not be there yet
+            if self._update_line_timer.isActive():
+                self._update_line_timer.stop()
+                self.do_update_line()
+            self._settle_pending_click()
         # right button
         elif event.button() is QtCore.Qt.RightButton:
             self.setLinesubMode(ReadyToInsertLineSubMode)
 
+    def _is_route_pending(self):
+        """Is the route to the current end point still being searched."""
+        session = self._routing_session
+        return self._update_line_timer.isActive() or \
+            (session is not None and session.pending_search() is not None)
+
+    def _settle_pending_click(self):
+        """
+        Commits the line of a pending click, once its route is shown, and
+        continues inserting or stops as decided by the click.
+        """
+        if self._pending_click is None or self._is_route_pending():
+            return
+
+        # prevent circular imports
+        from .ready_to_insert import ReadyToInsertLineSubMode
+
+        start, stop = self._pending_click
+        self._pending_click = None
+        self.commit_inserted_temp_line()
+        if stop:
+            self.setLinesubMode(ReadyToInsertLineSubMode)
+        else:
+            self._insert_line_start = start
+
     @line_submode_filtered
     def mouseMoveEvent(self, event):
         super().mouseMoveEvent(event)
+        if self._pending_click is not None:
+            return  # the end point is fixed by the click
 
         start = self._insert_line_start
         end = self.get_line_insertion_point(event.pos())
@@ -69,6 +116,11 @@ class InsertingLineSubMode(InsertLineSubModeBase):
 
     @line_submode_filtered
     def do_update_line(self):
+        self._update_line()
+        self._settle_pending_click()
+
+    def _update_line(self):
+        """Routes to the most recent end point."""
         start, end = self._insert_line_start_end
 
         p_start = self.scene().to_grid(start)
@@ -79,30 +131,65 @@ class InsertingLineSubMode(InsertLineSubModeBase):
             return
         self._insert_line_start_end_last = p_start, p_end
 
-        # remove old route
-        if self._temp_line_route is not None:
-            self._temp_line_route.undo_insert()
-            self._temp_line_route = None
-
         # create new route
-        line_route = LineRouteBetweenPoints(self.scene(), start, end,
-                                            self._max_line_search_time)
+        if self._routing_session is None or \
+                self._routing_session.p_start != p_start:
+            self._routing_session = LineRoutingSession(
+                self.scene(), start, self._max_line_search_time,
+                self._max_maze_search_time)
         try:
-            line_route.route()
+            result = self._routing_session.prepare(end)
         except RouteNotFoundException:
-            return
+            result = None
 
-        # temporarily add route to scene
-        line_route.do_temp_insert()
+        if not isinstance(result, RouteSearch):
+            self._routing_thread.cancel()
+            self._show_temp_line_route(result)
+        else:
+            # the old route is shown until the search completes
+            if not self._routing_thread.isRunning():
+                self._routing_thread.start()
+            self._routing_thread.request(result)
+
+    @QtCore.Slot(object, object)
+    def _on_route_found(self, search, path):
+        session = self._routing_session
+        if session is None or not session.is_pending(search):
+            return  # superseded by a newer search
+        try:
+            line_route = session.finish(search, path)
+        except RouteNotFoundException:
+            line_route = None
+        else:
+            if line_route is None:
+                # the scene changed while searching, route again
+                self._insert_line_start_end_last = None
+                self._update_line_timer.start()
+                return
+        self._show_temp_line_route(line_route)
+        self._settle_pending_click()
+
+    def _show_temp_line_route(self, line_route):
+        """Temporarily add route to scene, replacing the old one."""
+        if line_route is self._temp_line_route:
+            return
+        if self._temp_line_route is not None:
+            self._temp_line_route.undo_insert()
         self._temp_line_route = line_route
+        if line_route is not None:
+            line_route.do_temp_insert()
 
     def commit_inserted_temp_line(self):
         """Finalize inserted routed line."""
+        self._update_line_timer.stop()
+        self._routing_thread.cancel()
         if self._temp_line_route is None:
             return
 
         temp_line_route = self._temp_line_route
         self._temp_line_route = None
+        # cached routes must not be inserted twice
+        self._routing_session = None
 
         def do():
             temp_line_route.do_insert()
@@ -117,9 +204,13 @@ class InsertingLineSubMode(InsertLineSubModeBase):
     def linesub_leave(self):
         super().linesub_leave()
         # cleanup InsertingLine
+        self._pending_click = None
+        self._update_line_timer.stop()
+        self._routing_thread.cancel()
         if self._temp_line_route is not None:
             self._temp_line_route.undo_insert()
             self._temp_line_route = None
+        self._routing_session = None
 
 
 class RouteNotFoundException(Exception):
@@ -138,12 +229,196 @@ class EndpointTrees:
         return iter((self.start, self.end))
 
 
+class LineRoutingSession:
+    """
+    Routes lines from a fixed start point to a moving end point.
+
+    Routes are cached per end point as long as the obstacles in the scene
+    do not change. New routes try to follow the previous route first.
+    """
+    def __init__(self, scene, start, max_line_search_time=None,
+                 max_maze_search_time=None):
+        self.scene = scene
+        self.start = start
+        self.p_start = scene.to_grid(start)
+        self.max_line_search_time = max_line_search_time
+        self.max_maze_search_time = max_maze_search_time
+
+        self._routes = {}  # end in grid coordinates -> route or None
+        self._obstacle_version = None
+        self._last_route = None
+        self._pending = None  # (search, route) waiting to be finished
+
+    def route(self, end):
+        """
+        Returns route from start to end.
+
+        :param end: End point in scene coordinates
+        :return: routed LineRouteBetweenPoints, it might have been
+            inserted before.
+        :raises RouteNotFoundException: when no route can be found.
+        """
+        result = self.prepare(end)
+        if isinstance(result, RouteSearch):
+            result = self.finish(result, result.run())
+        return result
+
+    def prepare(self, end):
+        """
+        First part of route.
+
+        The returned search can be run on another thread. Its result is
+        then passed to finish. Only the search of the last call is pending.
+
+        :param end: End point in scene coordinates
+        :return: routed LineRouteBetweenPoints or RouteSearch to run.
+        :raises RouteNotFoundException: when no route can be found.
+        """
+        self._pending = None
+        version = self.scene.obstacle_index().version
+        if version != self._obstacle_version:
+            self._routes = {}
+            self._obstacle_version = version
+            self._last_route = None
+
+        p_end = self.scene.to_grid(end)
+        if p_end not in self._routes:
+            line_route = LineRouteBetweenPoints(
+                self.scene, self.start, end, self.max_line_search_time,
+                self.max_maze_search_time,
+                None if self._last_route is None else self._last_route.path)
+            try:
+                search = line_route.prepare()
+            except RouteNotFoundException:
+                search, line_route = None, None
+            if search is not None:
+                self._pending = (search, line_route)
+                return search
+            self._routes[p_end] = line_route
+
+        return self._get_route(p_end)
+
+    def is_pending(self, search):
+        """Is search the one returned by the last call to prepare."""
+        return self._pending is not None and self._pending[0] is search
+
+    def pending_search(self):
+        """Returns the search waiting to be finished or None."""
+        return None if self._pending is None else self._pending[0]
+
+    def finish(self, search, path):
+        """
+        Last part of route.
+
+        :param search: Pending RouteSearch
+        :param path: Result of the search
+        :return: routed LineRouteBetweenPoints or None, if the scene changed
+            since the search was prepared.
+        :raises RouteNotFoundException: when no route can be found.
+        """
+        assert self.is_pending(search)
+        _, line_route = self._pending
+        self._pending = None
+        if self.scene.obstacle_index().version != self._obstacle_version:
+            return None
+
+        try:
+            line_route.finish(path)
+        except RouteNotFoundException:
+            line_route = None
+        self._routes[search.p_end] = line_route
+        return self._get_route(search.p_end)
+
+    def _get_route(self, p_end):
+        line_route = self._routes[p_end]
+        if line_route is None:
+            raise RouteNotFoundException()
+        self._last_route = line_route
+        return line_route
+
+
+class LineRoutingThread(QtCore.QThread):
+    """
+    Runs route searches in the background.
+
+    Only the most recent search is of interest. Requesting a new search
+    cancels the running one.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.log = getLogger("routing")
+
+        self._condition = threading.Condition()
+        self._search = None  # search waiting to be run
+        self._token = None  # token of the running search
+        self._quit = False
+
+    def request(self, search):
+        """Runs search as soon as the running one is cancelled."""
+        with self._condition:
+            self._cancel()
+            self._search = search
+            self._condition.notify()
+
+    def cancel(self):
+        """Cancels running and waiting searches."""
+        with self._condition:
+            self._cancel()
+
+    def _cancel(self):
+        self._search = None
+        if self._token is not None:
+            self._token.cancel()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while self._search is None and not self._quit:
+                    self._condition.wait()
+                if self._quit:
+                    return
+                search, self._search = self._search, None
+                token = self._token = CancellationToken()
+
+            try:
+                path = search.run(token)
+            except Cancelled:
+                continue
+            except Exception:
+                self.log.exception("Route search failed")
+                path = None
+            finally:
+                with self._condition:
+                    self._token = None
+            self.found.emit(search, path)
+
+    @QtCore.Slot()
+    def quit(self, blocking=False):
+        with self._condition:
+            self._quit = True
+            self._cancel()
+            self._condition.notify()
+
+        if blocking:
+            self.wait()
+
+    # Emitted with the search and the found path or None
+    found = QtCore.Signal(object, object)
+
+
 class LineRouteBetweenPoints:
-    def __init__(self, scene, start, end, max_line_search_time=None):
+    def __init__(self, scene, start, end, max_line_search_time=None,
+                 max_maze_search_time=None, previous_path=None):
         self.scene = scene
         self.start = start
         self.end = end
         self.max_line_search_time = max_line_search_time
+        self.max_maze_search_time = max_maze_search_time
+        # path to a nearby end point, followed if possible
+        self.previous_path = previous_path
+        # path found by route in grid coordinates
+        self.path = None
+        self._endpoint_trees = None
 
         # store start and end in grid coordinates
         self.p_start = self.scene.to_grid(start)
@@ -171,7 +446,8 @@ class LineRouteBetweenPoints:
     def _get_linetrees_at_point(self, scene_point):
         """Get line trees at given scene point as list."""
         return [item for item in self.scene.items(scene_point)
-                if isinstance(item, logicitems.LineTree)]
+                if isinstance(item, logicitems.LineTree) and
+                not item.is_temporary()]
 
     def _get_endpoint_trees(self):
         # save line trees at endpoints
@@ -231,34 +507,61 @@ class LineRouteBetweenPoints:
         """
         Try to find route between given points.
 
+        :raises RouteNotFoundException: when no route can be found.
+        """
+        search = self.prepare()
+        if search is not None:
+            self.finish(search.run())
+
+    def prepare(self):
+        """
+        First part of route, finding direct routes.
+
+        If there is none, the search for a route is prepared. The search
+        can run on any thread, while prepare and finish must be called on
+        the thread of the scene.
+
+        :return: RouteSearch to run and pass the result to finish or None,
+            if the route was found already.
         :raises RouteNotFoundException: when no route can be found.
         """
         assert not self._is_routed
 
-        endpoint_trees = self._get_endpoint_trees()
+        self._endpoint_trees = self._get_endpoint_trees()
         get_obj_at_point = GetHightowerObjectAtPoint(
-            self.scene, self.p_start, self.p_end, endpoint_trees)
+            self.scene, self.p_start, self.p_end, self._endpoint_trees)
 
         # first try to find direct route
         res = self._direct_route(get_obj_at_point, vertical_first=True)
         if res is None and self.p_start[0] != self.p_end[0] and \
                 self.p_start[1] != self.p_end[1]:
             res = self._direct_route(get_obj_at_point, vertical_first=False)
+        if res is not None:
+            self.finish(res)
+            return None
+
+        search_rect = self._get_search_rect()
+        # probe a snapshot of the obstacle index instead of the scene
+        obstacles = self.scene.obstacle_index().view(
+            search_rect, get_obj_at_point.overrides())
+        return RouteSearch(self.p_start, self.p_end, obstacles, search_rect,
+                           self.previous_path, self.max_line_search_time,
+                           self.max_maze_search_time)
+
+    def finish(self, res):
+        """
+        Last part of route, creating the line tree of the path.
 
-        if res is None:
-            # We only want to search for a limited amount of time
-            time_limited_get_obj_at_point = time_limited(
-                get_obj_at_point, self.max_line_search_time)
-            search_rect = self._get_search_rect()
+        :param res: Path in grid coordinates as list of tuples (int, int)
+            or None, if no path was found.
+        :raises RouteNotFoundException: when no route can be found.
+        """
+        assert not self._is_routed
 
-            try:
-                res = hightower.hightower_line_search(
-                    self.p_start, self.p_end, time_limited_get_obj_at_point,
-                    search_rect, do_second_refinement=False)
-            except TimeReached:
-                raise RouteNotFoundException()
-            if res is None:
-                raise RouteNotFoundException()
+        if res is None:
+            raise RouteNotFoundException()
+        self.path = res
+        endpoint_trees = self._endpoint_trees
 
         # remove parts of the path that are already part of
         #     adjacent line trees of the end points
@@ -467,6 +770,9 @@ class GetHightowerObjectAtPoint:
         found_line_edge = False
 
         for item in items:
+            # e.g. the previous route still shown while searching
+            if isinstance(item, logicitems.ItemBase) and item.is_temporary():
+                continue
             if isinstance(item, logicitems.LineAnchorIndicator):
                 continue
             if isinstance(item, logicitems.LineEdgeIndicator):
@@ -493,6 +799,27 @@ class GetHightowerObjectAtPoint:
 
         return None
 
+    def overrides(self):
+        """
+        Returns the points for which the obstacle index of the scene differs.
+
+        The index of the scene does not know about the line being inserted.
+        Connector ends at the end points and the lines of the endpoint trees
+        might be ignored here.
+
+        :return: dictionary mapping grid points to hightower objects
+        """
+        points = {self.p_start, self.p_end}
+        for item in self.endpoint_trees:
+            if item is None:
+                continue
+            for line in item.iter_scene_lines():
+                (x1, y1), (x2, y2) = sorted((self.scene.to_grid(line.p1()),
+                                             self.scene.to_grid(line.p2())))
+                points.update((x, y) for x in range(x1, x2 + 1)
+                              for y in range(y1, y2 + 1))
+        return {point: self(point) for point in points}
+
     def line(self, line):
         """
         Returns which kind of hightower object can be found for the given line.
@@ -511,6 +838,9 @@ class GetHightowerObjectAtPoint:
         found_line_edge = False
 
         for item in items:
+            # e.g. the previous route still shown while searching
+            if isinstance(item, logicitems.ItemBase) and item.is_temporary():
+                continue
             if isinstance(item, logicitems.LineAnchorIndicator):
                 continue
             if isinstance(item, logicitems.LineEdgeIndicator):
@@ -247,27 +247,48 @@ from numbers import Integral
 from PySide import QtGui
 
 
+# Logic values are encoded in two bit-planes: bit 0 holds the value and
+# bit 1 is set for unknown values. Unknown values always have a value bit of
+# zero so every logic value has exactly one code.
+_LV_CODES = {'0': 0, '1': 1, 'X': 2}
+_LV_STRINGS = '01X'
+
+# Operator tables indexed by [code][other code]
+_LV_AND = ((0, 0, 0), (0, 1, 2), (0, 2, 2))
+_LV_OR = ((0, 1, 2), (1, 1, 1), (2, 1, 2))
+_LV_XOR = ((0, 1, 2), (1, 0, 2), (2, 2, 2))
+_LV_ADD = ((0, 2, 2), (2, 1, 2), (2, 2, 2))
+_LV_INV = (1, 0, 2)
+
+
+def _logic_value(code):
+    """ creates a logic value from its code skipping validation """
+    lv = object.__new__(LogicValue)
+    lv._code = code
+    return lv
+
+
 class LogicValue(object):
     """ inspired by four-valued logic common to most HDLs """
-    _representation = frozenset('01X')
-    __slots__ = ['_value', '__weakref__']
+    __slots__ = ['_code', '__weakref__']
 
     def __init__(self, value):
         """ one of '0', '1' or 'X' """
-        if value not in self._representation:
+        try:
+            self._code = _LV_CODES[value]
+        except (KeyError, TypeError):
             raise ValueError('Invalid logic value')
-        self._value = value
 
     def __repr__(self):
         return 'LogicValue(%r)' % str(self)
 
     def __str__(self):
-        return self._value
+        return _LV_STRINGS[self._code]
 
     def __eq__(self, other):
         """ == """
         if isinstance(other, LogicValue):
-            return self._value == other._value
+            return self._code == other._code
         else:
             return False
 
@@ -276,48 +297,29 @@ class LogicValue(object):
         return not self == other
 
     def __hash__(self):
-        return hash(LogicValue) ^ hash(self._value)
+        return hash(LogicValue) ^ self._code
 
     def __and__(self, other):
         """ & logical and """
         if not isinstance(other, LogicValue):
             return NotImplemented
-        values = (self._value, other._value)
-        if '0' in values:
-            return LogicValue('0')
-        elif 'X' in values:
-            return LogicValue('X')
-        else:
-            return LogicValue('1')
+        return _logic_value(_LV_AND[self._code][other._code])
 
     def __or__(self, other):
         """ | logical or """
         if not isinstance(other, LogicValue):
             return NotImplemented
-        values = (self._value, other._value)
-        if '1' in values:
-            return LogicValue('1')
-        elif 'X' in values:
-            return LogicValue('X')
-        else:
-            return LogicValue('0')
+        return _logic_value(_LV_OR[self._code][other._code])
 
     def __xor__(self, other):
         """ ^ logical xor """
         if not isinstance(other, LogicValue):
             return NotImplemented
-        if 'X' in (self._value, other._value):
-            return LogicValue('X')
-        elif self._value == other._value:
-            return LogicValue('0')
-        else:
-            return LogicValue('1')
-
-    _inv_table = {'0': '1', '1': '0', 'X': 'X'}
+        return _logic_value(_LV_XOR[self._code][other._code])
 
     def __invert__(self):
         """ ~ logical invert """
-        return LogicValue(self._inv_table[self._value])
+        return _logic_value(_LV_INV[self._code])
 
     def __add__(self, other):
         """
@@ -326,12 +328,11 @@ class LogicValue(object):
         """
         if not isinstance(other, LogicValue):
             return NotImplemented
-        if 'X' in (self._value, other._value):
-            return LogicValue('X')
-        elif self._value == other._value:
-            return LogicValue(self._value)
-        else:
-            return LogicValue('X')
+        return _logic_value(_LV_ADD[self._code][other._code])
+
+    def is_known(self):
+        """ True for '0' and '1' """
+        return self._code != 2
 
     def __bool__(self):
         """ bool, if, not """
@@ -346,7 +347,7 @@ class LogicValue(object):
             try:
                 return instance.__dict__[id(self)]
             except KeyError:
-                val = LogicValue(self._value)
+                val = _logic_value(self._code)
                 instance.__dict__[id(self)] = val
                 return val
 
@@ -356,7 +357,7 @@ class LogicValue(object):
         if isinstance(value, str):
             lv.__init__(value)
         elif isinstance(value, LogicValue):
-            lv._value = value._value
+            lv._code = value._code
         else:
             raise TypeError('Unsupported type, try "0" or '
                             'LogicValue("0") instead')
@@ -375,11 +376,201 @@ class LogicValue(object):
         self.__set__(None, value)
 
 
+class _ConstantLogicValue(LogicValue):
+    """ logic value that can't be changed through copy_from """
+    __slots__ = []
+
+    def copy_from(self, value):
+        raise TypeError('Constant logic values can not be changed')
+
+
+# Interned constants. Used by LogicVector to return elements without
+# allocating. Operators on them still return new, mutable logic values.
+LOGIC_0, LOGIC_1, LOGIC_X = [_ConstantLogicValue(value) for value in '01X']
+_LV_CONSTANTS = (LOGIC_0, LOGIC_1, LOGIC_X)
+
+
+class LogicVector(object):
+    """
+    Immutable vector of logic values stored as two bit-planes in Python
+    integers. Bit i of the value plane holds the value of element i and
+    bit i of the unknown plane is set if element i is 'X'. Operators work on
+    all elements at once with a handful of integer operations.
+
+    String representations list the elements in index order.
+    """
+    __slots__ = ['_width', '_value', '_unknown']
+
+    def __init__(self, values):
+        """ string of '0', '1', 'X' or iterable of LogicValue """
+        value = unknown = 0
+        width = 0
+        for width, element in enumerate(values, 1):
+            if isinstance(element, LogicValue):
+                code = element._code
+            else:
+                try:
+                    code = _LV_CODES[element]
+                except (KeyError, TypeError):
+                    raise ValueError('Invalid logic value')
+            value |= (code & 1) << (width - 1)
+            unknown |= (code >> 1) << (width - 1)
+
+        self._width = width
+        self._value = value
+        self._unknown = unknown
+
+    @classmethod
+    def from_planes(cls, width, value, unknown=0):
+        """
+        Creates a vector from its bit-planes.
+
+        :param width: Number of elements
+        :param value: Integer with the value bits
+        :param unknown: Integer with the bits of unknown elements set
+        """
+        vector = object.__new__(cls)
+        mask = (1 << width) - 1
+        vector._width = width
+        vector._unknown = unknown & mask
+        vector._value = value & mask & ~vector._unknown
+        return vector
+
+    @classmethod
+    def unknown(cls, width):
+        """ vector of width 'X' values, e.g. the state before reset """
+        return cls.from_planes(width, 0, -1)
+
+    @property
+    def planes(self):
+        """ (value, unknown) bit-planes """
+        return self._value, self._unknown
+
+    def __len__(self):
+        return self._width
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._width
+        if not 0 <= index < self._width:
+            raise IndexError('LogicVector index out of range')
+        return _LV_CONSTANTS[(self._value >> index & 1) |
+                             (self._unknown >> index & 1) << 1]
+
+    def __iter__(self):
+        for index in range(self._width):
+            yield self[index]
+
+    def __repr__(self):
+        return 'LogicVector(%r)' % str(self)
+
+    def __str__(self):
+        return ''.join(map(str, self))
+
+    def __eq__(self, other):
+        if isinstance(other, LogicVector):
+            return self._width == other._width \
+                and self._value == other._value \
+                and self._unknown == other._unknown
+        else:
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((LogicVector, self._width, self._value, self._unknown))
+
+    def __bool__(self):
+        raise ValueError("Casting a LogicVector to bool is not supported")
+
+    def _check(self, other):
+        if not isinstance(other, LogicVector):
+            return False
+        if other._width != self._width:
+            raise ValueError('LogicVector widths differ')
+        return True
+
+    def __and__(self, other):
+        """ & element wise logical and """
+        if not self._check(other):
+            return NotImplemented
+        # Elements known to be zero in either operand are zero
+        zero = ~(self._value | self._unknown) | \
+            ~(other._value | other._unknown)
+        return self.from_planes(self._width,
+                                self._value & other._value,
+                                (self._unknown | other._unknown) & ~zero)
+
+    def __or__(self, other):
+        """ | element wise logical or """
+        if not self._check(other):
+            return NotImplemented
+        one = self._value | other._value
+        return self.from_planes(self._width, one,
+                                (self._unknown | other._unknown) & ~one)
+
+    def __xor__(self, other):
+        """ ^ element wise logical xor """
+        if not self._check(other):
+            return NotImplemented
+        return self.from_planes(self._width,
+                                self._value ^ other._value,
+                                self._unknown | other._unknown)
+
+    def __invert__(self):
+        """ ~ element wise logical invert """
+        return self.from_planes(self._width, ~self._value, self._unknown)
+
+    def __add__(self, other):
+        """ + element wise merge of signals """
+        if not self._check(other):
+            return NotImplemented
+        return self.from_planes(self._width, self._value,
+                                self._unknown | other._unknown |
+                                (self._value ^ other._value))
+
+    def is_known(self):
+        """ True if no element is 'X' """
+        return not self._unknown
+
+    def unknown_indices(self):
+        """ indices of all 'X' elements """
+        unknown = self._unknown
+        return [index for index in range(unknown.bit_length())
+                if unknown >> index & 1]
+
+
+def reset_analysis(step, state, inputs, max_cycles=None):
+    """
+    X-aware reset analysis. Starting from a state of unknown values the
+    reset sequence is applied till the state is fully known.
+
+    :param step: Function taking the state and the inputs as LogicVector
+        and returning the next state as LogicVector
+    :param state: Initial state, usually LogicVector.unknown(width)
+    :param inputs: Iterable of input LogicVector applied one per cycle
+    :param max_cycles: Optional limit for the number of cycles
+    :return: (cycles, state) tuple. cycles is the number of cycles after
+        which the state became known or None if it never did.
+    """
+    cycles = 0
+    for applied in inputs:
+        if state.is_known() or \
+                (max_cycles is not None and cycles >= max_cycles):
+            break
+        state = step(state, applied)
+        cycles += 1
+
+    return (cycles if state.is_known() else None), state
+
+
 class JsonMeta(type):
     """
     Meta Class which helps to load arbitrary JsonObjects from json data
     """
     _json_classes = {}
+    _compiled_specs = {}  # spec key -> validator
 
     def __new__(cls, name, bases, attrs):
         inst = super(JsonMeta, cls).__new__(cls, name, bases, attrs)
@@ -399,6 +590,22 @@ class JsonMeta(type):
         """
         cls._json_classes[data['type']].validate_data(data)
 
+    @classmethod
+    def validate_all(cls, data_list):
+        """
+        Validates a list of json data in one pass.
+
+        Returns list of (index, exception) tuples of all invalid items.
+        """
+        errors = []
+        json_classes = cls._json_classes
+        for index, data in enumerate(data_list):
+            try:
+                json_classes[data['type']].validate_data(data)
+            except Exception as e:
+                errors.append((index, e))
+        return errors
+
     @classmethod
     def load_object(cls, data):
         """
@@ -408,6 +615,21 @@ class JsonMeta(type):
         """
         return cls._json_classes[data['type']](data)
 
+    @classmethod
+    def load_objects(cls, data_list):
+        """
+        Validates a list of json data and creates the objects.
+
+        raises ValueError listing all invalid items if any item is invalid.
+        """
+        errors = cls.validate_all(data_list)
+        if errors:
+            raise ValueError("Invalid json data: %s" % "; ".join(
+                "item %d: %s" % (index, e) for index, e in errors))
+
+        json_classes = cls._json_classes
+        return [json_classes[data['type']](data) for data in data_list]
+
     @classmethod
     def unregister_json_class(cls, json_class):
         del cls._json_classes[json_class.__name__]
@@ -443,48 +665,129 @@ class JsonMeta(type):
         - as a tuple of types: Then data is expected to have exactly that
                 structure. The length and all sub types have to match exactly.
 
+        The spec is compiled into a validator function on first use, see
+        compile_spec.
+        """
+        cls.compile_spec(spec)(data)
+
+    @classmethod
+    def _spec_key(cls, spec):
         """
+        Returns hashable key identifying the structure of spec.
+        """
+        if isinstance(spec, dict):
+            return (dict, tuple(sorted((key, cls._spec_key(sub_spec))
+                                       for key, sub_spec in spec.items())))
+        elif isinstance(spec, (list, tuple)):
+            return (type(spec), tuple(cls._spec_key(sub_spec)
+                                      for sub_spec in spec))
+        return spec
+
+    @classmethod
+    def compile_spec(cls, spec):
+        """
+        Returns function validating data against the given spec.
+
+        See validate_data_from_spec for the format of spec. Validators
+        are cached by the structure of spec, so equal specs are only
+        compiled once.
+        """
+        key = cls._spec_key(spec)
+        validator = cls._compiled_specs.get(key)
+        if validator is None:
+            validator = cls._compile_spec(spec)
+            cls._compiled_specs[key] = validator
+        return validator
+
+    @classmethod
+    def _compile_spec(cls, spec):
         # is spec a type?
         if issubclass(type(spec), type):
             if issubclass(spec, JsonObject):
-                if spec.__name__ in cls._json_classes:
+                json_classes = cls._json_classes
+                name = spec.__name__
+
+                def validate_object(data):
+                    # registration is checked on every call, as classes
+                    # can be unregistered after compilation
+                    if name not in json_classes:
+                        raise TypeError("Cannot validate virtual JsonObject "
+                                        "'%s'." % spec)
                     spec.validate_data(data)
-                else:
-                    raise TypeError("Cannot validate virtual JsonObject '%s'."
-                                    % spec)
+                return validate_object
             else:
                 assert spec in (str, Integral, float, bool), spec
-                if not isinstance(data, spec):
-                    raise TypeError("Data has wrong type, expected "
-                                    "'%s' but got '%s'." % (spec, type(data)))
-        else:
-            assert isinstance(spec, (dict, list, tuple)), type(spec)
-            if isinstance(spec, dict):
-                for key in spec:
-                    cls.validate_data_from_spec(spec[key], data[key])
-            elif isinstance(spec, list):
-                assert len(spec) > 0
+
+                def validate_type(data):
+                    if not isinstance(data, spec):
+                        raise TypeError("Data has wrong type, expected "
+                                        "'%s' but got '%s'." %
+                                        (spec, type(data)))
+                return validate_type
+
+        assert isinstance(spec, (dict, list, tuple)), type(spec)
+        if isinstance(spec, dict):
+            fields = [(key, cls.compile_spec(sub_spec))
+                      for key, sub_spec in spec.items()]
+
+            def validate_dict(data):
+                for key, validate in fields:
+                    validate(data[key])
+            return validate_dict
+
+        elif isinstance(spec, list):
+            assert len(spec) > 0
+            alternatives = [cls.compile_spec(sub_spec) for sub_spec in spec]
+
+            def validate_list(data):
                 for item in data:
-                    valid = False
-                    for sub_type in spec:
+                    for validate in alternatives:
                         try:
-                            cls.validate_data_from_spec(sub_type, item)
+                            validate(item)
                         except Exception:
                             pass
                         else:
-                            valid = True
                             break
-                    if not valid:
+                    else:
                         raise TypeError("Item has wrong type, expected "
                                         "'%s' but got '%s'." %
                                         (spec, type(item)))
-            elif isinstance(spec, tuple):
-                assert len(spec) > 0
-                if len(spec) != len(data):
+            return validate_list
+
+        else:
+            assert len(spec) > 0
+            length = len(spec)
+            items = [cls.compile_spec(sub_spec) for sub_spec in spec]
+
+            def validate_tuple(data):
+                if length != len(data):
                     raise ValueError("Invalid data length, expected '%s' "
-                                     "but got '%s'." % (len(spec), len(data)))
-                for sub_spec, item in zip(spec, data):
-                    cls.validate_data_from_spec(sub_spec, item)
+                                     "but got '%s'." % (length, len(data)))
+                for validate, item in zip(items, data):
+                    validate(item)
+            return validate_tuple
+
+    @classmethod
+    def get_validator(cls, json_class):
+        """
+        Returns function validating data of the given JsonObject class
+        against its json_spec. Compiled once and cached on the class.
+        """
+        validator = json_class.__dict__.get('_json_validator')
+        if validator is None:
+            spec = json_class.json_spec()
+            validate_fields = cls.compile_spec(spec) if spec else None
+            name = json_class.__name__
+
+            def validator(data):
+                if data['type'] != name:
+                    raise TypeError("Invalid data['type'] expected '%s', "
+                                    "got '%s'." % (name, data['type']))
+                if validate_fields is not None:
+                    validate_fields(data)
+
+            json_class._json_validator = validator
+        return validator
 
 
 def json_virtual(cls):
@@ -519,23 +822,35 @@ class JsonObject(object, metaclass=JsonMeta):
         """
         pass
 
+    @classmethod
+    def json_spec(cls):
+        """
+        Returns spec of the json data of this class as used by
+        validate_data_from_spec, without the 'type' key.
+
+        Subclasses extend the spec of their base class:
+            spec = super(SubCls, cls).json_spec()
+            spec.update({'key': type_spec})
+            return spec
+        """
+        return {}
+
     @classmethod
     def validate_data(cls, data):
         """
         This method is called before creating any objects and is used
         to decide if the json data is valid or not.
 
-        This method has to be implemented by any subclass and should
-        raise an Exception if the json data is invalid.
+        Raises an Exception if the json data is invalid. By default data is
+        validated against json_spec with a validator compiled once per class.
 
-        When overwriting this method you should first call:
+        Subclasses needing additional checks overwrite this method and
+        should first call:
             super(SubCls, cls).validate_data(data)
         Then you can use validate_data_from_spec to validate additional data
             cls.validate_data_from_spec(spec, data)
         """
-        if data['type'] != cls.__name__:
-            raise TypeError("Invalid data['type'] expected '%s', got '%s'." %
-                            (cls.__name__, data['type']))
+        type(cls).get_validator(cls)(data)
 
     def save(self):
         """
@@ -546,19 +861,21 @@ class JsonObject(object, metaclass=JsonMeta):
 
 class Schematic(JsonObject):
     @classmethod
-    def validate_data(cls, data):
-        super(Schematic, cls).validate_data(data)
-        cls.validate_data_from_spec({'instances': [Instance],
-                                     'signals': [Signal]}, data)
+    def json_spec(cls):
+        spec = super(Schematic, cls).json_spec()
+        spec.update({'instances': [Instance],
+                     'signals': [Signal]})
+        return spec
 
 
 @json_virtual
 class Instance(JsonObject):
     @classmethod
-    def validate_data(cls, data):
-        super(Instance, cls).validate_data(data)
-        cls.validate_data_from_spec({'name': str,
-                                     'id': str}, data)
+    def json_spec(cls):
+        spec = super(Instance, cls).json_spec()
+        spec.update({'name': str,
+                     'id': str})
+        return spec
 
 
 class Signal(JsonObject):
@@ -566,10 +883,11 @@ class Signal(JsonObject):
         self._slots = weakref.WeakSet()
 
     @classmethod
-    def validate_data(cls, data):
-        super(Signal, cls).validate_data(data)
-        cls.validate_data_from_spec({'interconnects': [Interconnect],
-                                     'connections': [SignalConnection]}, data)
+    def json_spec(cls):
+        spec = super(Signal, cls).json_spec()
+        spec.update({'interconnects': [Interconnect],
+                     'connections': [SignalConnection]})
+        return spec
 
     def connect(self, connector):
         """
@@ -587,18 +905,19 @@ class Signal(JsonObject):
 
 class Interconnect(JsonObject):
     @classmethod
-    def validate_data(cls, data):
-        super(Interconnect, cls).validate_data(data)
-        cls.validate_data_from_spec({'pos': ((float, float), (float, float))},
-                                    data)
+    def json_spec(cls):
+        spec = super(Interconnect, cls).json_spec()
+        spec.update({'pos': ((float, float), (float, float))})
+        return spec
 
 
 class SignalConnection(JsonObject):
     @classmethod
-    def validate_data(cls, data):
-        super(SignalConnection, cls).validate_data(data)
-        cls.validate_data_from_spec({'instance': Integral,
-                                     'connector': Integral}, data)
+    def json_spec(cls):
+        spec = super(SignalConnection, cls).json_spec()
+        spec.update({'instance': Integral,
+                     'connector': Integral})
+        return spec
 
 
 @json_virtual
@@ -622,35 +941,38 @@ class BaseIC(JsonObject):
         self.connectors = json_data.get('connectors', [])
 
     @classmethod
-    def validate_data(cls, data):
-        super(BaseIC, cls).validate_data(data)
-        cls.validate_data_from_spec({'id': str,  # TODO: check hex form
-                                     'author': str,
-                                     # TODO: check format '%Y-%m-%dT%H:%M:%SZ'
-                                     'date': str,
-                                     'description': str,
-                                     'symbol': Symbol}, data)
+    def json_spec(cls):
+        spec = super(BaseIC, cls).json_spec()
+        spec.update({'id': str,  # TODO: check hex form
+                     'author': str,
+                     # TODO: check format '%Y-%m-%dT%H:%M:%SZ'
+                     'date': str,
+                     'description': str,
+                     'symbol': Symbol})
+        return spec
 
 
 @json_virtual
 class BaseConnector(JsonObject):
     @classmethod
-    def validate_data(cls, data):
-        super(BaseConnector, cls).validate_data(data)
-        cls.validate_data_from_spec({'label': str,
-                                     'startpos': (float, float),
-                                     'anchorpos': (float, float),
-                                     'labelpos': (float, float)}, data)
+    def json_spec(cls):
+        spec = super(BaseConnector, cls).json_spec()
+        spec.update({'label': str,
+                     'startpos': (float, float),
+                     'anchorpos': (float, float),
+                     'labelpos': (float, float)})
+        return spec
 
 
 class ComputationIC(BaseIC):
     # TODO: authentication: SHA-Hash or RSA-Signature
     @classmethod
-    def validate_data(cls, data):
-        super(ComputationIC, cls).validate_data(data)
-        cls.validate_data_from_spec({'connectors': [InputConnector,
-                                                    OutputConnector],
-                                     'code': str}, data)
+    def json_spec(cls):
+        spec = super(ComputationIC, cls).json_spec()
+        spec.update({'connectors': [InputConnector,
+                                    OutputConnector],
+                     'code': str})
+        return spec
 
 
 class InputConnector(BaseConnector):
@@ -672,9 +994,10 @@ class InputConnector(BaseConnector):
         self._last_change = 0
 
     @classmethod
-    def validate_data(cls, data):
-        super(InputConnector, cls).validate_data(data)
-        cls.validate_data_from_spec({'delay': float}, data)
+    def json_spec(cls):
+        spec = super(InputConnector, cls).json_spec()
+        spec.update({'delay': float})
+        return spec
 
     def on_calculate_next_state(self, sim_time):
         self._int_state = self
@@ -692,11 +1015,11 @@ class OutputConnector(BaseConnector):
 
 class SchematicIC(BaseIC):
     @classmethod
-    def validate_data(cls, data):
-        super(SchematicIC, cls).validate_data(data)
-        cls.validate_data_from_spec({'connectors': [TransparentConnector],
-                                     'schematic': Schematic},
-                                    data)
+    def json_spec(cls):
+        spec = super(SchematicIC, cls).json_spec()
+        spec.update({'connectors': [TransparentConnector],
+                     'schematic': Schematic})
+        return spec
 
 
 class TransparentConnector(BaseConnector):
@@ -705,9 +1028,10 @@ class TransparentConnector(BaseConnector):
 
 class Symbol(JsonObject):
     @classmethod
-    def validate_data(cls, data):
-        super(Symbol, cls).validate_data(data)
-        cls.validate_data_from_spec({'primitive': [Primitive]}, data)
+    def json_spec(cls):
+        spec = super(Symbol, cls).json_spec()
+        spec.update({'primitive': [Primitive]})
+        return spec
 
 
 class Primitive(QtGui.QGraphicsItem, JsonObject,
@@ -9,12 +9,13 @@ from backend.core import Core
 from backend.controller import Controller
 from backend.event import Event
 from backend.components.basic_logic_elements import Xor, And, Nor, Or
+from backend.core import FREEZE, STOP, WARN
 from backend.components.compound_element import CompoundElement
 from backend.element import Edge
 from backend.components.interconnect import Interconnect
 from backend.component_library import ComponentLibrary
 from backend.component_library import get_library
-from tests.helpers import CallTrack
+from tests.helpers import CallTrack, drain_queue
 from tests import helpers
 from queue import Queue
 
@@ -172,6 +173,169 @@ class BackendCoreTest(helpers.CriticalTestCase):
         self.assertFalse(s.state)
         self.assertTrue(c.state)
 
+    def test_fan_out(self):
+        ctrl = TestingController()
+
+        clk = Interconnect.instantiate(0, ctrl)
+        a = Interconnect.instantiate(1, ctrl)
+        gates = [And.instantiate(2 + n, ctrl) for n in range(10)]
+        outs = [Interconnect.instantiate(20 + n, ctrl) for n in range(10)]
+
+        for n, gate in enumerate(gates):
+            self.assertTrue(clk.connect(n, gate, 0))
+            self.assertTrue(a.connect(n, gate, 1))
+            self.assertTrue(gate.connect(0, outs[n], 0))
+
+        core = ctrl.get_core()
+        core.schedule(Edge(10, a, 0, True))
+        core.schedule(Edge(10, clk, 0, True))
+        core.loop_until_stable_state_or_time()
+
+        self.assertTrue(all(out.state for out in outs))
+        # Both nets reach their ten sinks with one event each, which clocks
+        # every sink in its own group. Every gate is clocked once and
+        # drives its output with a single edge.
+        events = 2 + 2 * (1 + len(gates)) + len(gates) * 2
+        self.assertEqual(events, core.retired_events)
+
+        core.schedule(Edge(core.clock + 1, a, 0, True))
+        core.loop_until_stable_state_or_time()
+        self.assertEqual(events + 1, core.retired_events)
+
+    def test_zero_delay_reconvergence(self):
+        ctrl = TestingController()
+
+        # The And gate is clocked by its edge from z before the zero delay
+        # path from x through the Or gate changes its other input at the
+        # same time. That has to clock it again.
+        x = Interconnect.instantiate(0, ctrl)
+        z = Interconnect.instantiate(1, ctrl)
+        or_gate = Or.instantiate(2, ctrl, {'delay': 0})
+        y = Interconnect.instantiate(3, ctrl)
+        and_gate = And.instantiate(4, ctrl, {'delay': 0})
+        out = Interconnect.instantiate(5, ctrl)
+        others = [Or.instantiate(6 + n, ctrl) for n in range(2)]
+
+        self.assertTrue(x.connect(0, or_gate, 0))
+        self.assertTrue(x.connect(1, others[0], 0))
+        self.assertTrue(or_gate.connect(0, y, 0))
+        self.assertTrue(y.connect(0, and_gate, 1))
+        self.assertTrue(y.connect(1, others[1], 0))
+        self.assertTrue(z.connect(0, and_gate, 0))
+        self.assertTrue(and_gate.connect(0, out, 0))
+
+        core = ctrl.get_core()
+        core.schedule(Edge(10, z, 0, True))
+        core.schedule(Edge(10, x, 0, True))
+        core.loop_until_stable_state_or_time()
+
+        self.assertListEqual([1, 1], list(and_gate.input_states))
+        self.assertTrue(out.state)
+
+    def _build_ring(self, ctrl, delay):
+        # Nor with its first input connected to its output inverts forever
+        nor = Nor.instantiate(0, ctrl, {'delay': delay})
+        net = Interconnect.instantiate(1, ctrl)
+        self.assertTrue(nor.connect(0, net, 0))
+        self.assertTrue(net.connect(0, nor, 0))
+        return nor, net
+
+    def _reports(self, ctrl):
+        return drain_queue(ctrl.get_channel_out(),
+                           lambda m: m['type'] in ('warning', 'error'))
+
+    def test_zero_delay_loop(self):
+        ctrl = TestingController()
+        nor, net = self._build_ring(ctrl, 0)
+
+        core = ctrl.get_core()
+        core.timestep_budget = 50
+        core.timestep_policy = FREEZE
+        core.schedule(Edge(10, net, 0, True))
+
+        self.assertGreater(100, core.loop_until_stable_state_or_time(100))
+        self.assertEqual(10, core.clock)
+
+        reports = self._reports(ctrl)
+        self.assertEqual(1, len(reports))
+        self.assertEqual('error', reports[0]['type'])
+        self.assertEqual('zero-delay-loop', reports[0]['kind'])
+        self.assertSetEqual({0, 1}, set(reports[0]['ids']))
+        self.assertListEqual([1], reports[0]['nets'])
+        self.assertSetEqual({nor.handle(), net.handle()}, core.frozen)
+
+    def _build_fan_out(self, ctrl, count):
+        clk = Interconnect.instantiate(0, ctrl)
+        a = Interconnect.instantiate(1, ctrl)
+        gates = [And.instantiate(2 + n, ctrl) for n in range(count)]
+        outs = [Interconnect.instantiate(2 + count + n, ctrl)
+                for n in range(count)]
+
+        for n, gate in enumerate(gates):
+            self.assertTrue(clk.connect(n, gate, 0))
+            self.assertTrue(a.connect(n, gate, 1))
+            self.assertTrue(gate.connect(0, outs[n], 0))
+
+        return clk, a, gates, outs
+
+    def test_busy_timestep(self):
+        # Many independent elements active at the same time are no loop
+        ctrl = TestingController()
+        clk, a, gates, outs = self._build_fan_out(ctrl, 40)
+
+        core = ctrl.get_core()
+        self.assertEqual(WARN, core.timestep_policy)
+        core.timestep_budget = 50
+        core.timestep_policy = FREEZE
+        core.schedule(Edge(10, a, 0, True))
+        core.schedule(Edge(10, clk, 0, True))
+        core.loop_until_stable_state_or_time()
+
+        self.assertGreater(core.retired_events, core.timestep_budget)
+        self.assertTrue(all(out.state for out in outs))
+        self.assertListEqual([], self._reports(ctrl))
+        self.assertSetEqual(set(), core.frozen)
+
+    def test_frozen_fan_out(self):
+        ctrl = TestingController()
+        clk, a, gates, outs = self._build_fan_out(ctrl, 3)
+
+        core = ctrl.get_core()
+        core.frozen = {gates[1].handle()}
+        core.schedule(Edge(10, a, 0, True))
+        core.schedule(Edge(10, clk, 0, True))
+        core.loop_until_stable_state_or_time()
+
+        self.assertListEqual([0, 0], list(gates[1].input_states))
+        self.assertListEqual([True, False, True],
+                             [bool(out.state) for out in outs])
+
+    def test_oscillation(self):
+        ctrl = TestingController()
+        nor, net = self._build_ring(ctrl, 1)
+
+        core = ctrl.get_core()
+        core.element_budget = 80
+        core.budget_window = 100
+        core.element_policy = WARN
+        core.schedule(Edge(0, net, 0, True))
+
+        core.loop_until_stable_state_or_time(50)
+        self.assertListEqual([], self._reports(ctrl))
+
+        core.loop_until_stable_state_or_time(100)
+        reports = self._reports(ctrl)
+        self.assertEqual(1, len(reports))
+        self.assertEqual('warning', reports[0]['type'])
+        self.assertEqual('oscillation', reports[0]['kind'])
+        self.assertSetEqual({0, 1}, set(reports[0]['ids']))
+
+        # Stopping drops all pending events
+        core.element_policy = STOP
+        core.loop_until_stable_state_or_time()
+        self.assertTrue(core.event_queue.empty())
+        self.assertEqual('error', self._reports(ctrl)[0]['type'])
+
     def test_compound_element_behavior(self):
         # Test the half adder wrapped in a compound element
         ctrl = TestingController(library=get_library())
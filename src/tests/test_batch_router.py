@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Test the batch router for whole netlists.
+'''
+
+import random
+
+from tests import helpers
+from algorithms.hightower import Solid, LineEdge, PassableLine
+from algorithms.batch_router import route_nets
+
+
+def area_to_nets(area):
+    """
+    Upper case letters are sources, lower case letters the sinks of their
+    nets. Obstacles are drawn as for the hightower tests.
+    """
+    lines = area.split('\n')
+    search_rect = [(-1, -1), (max(len(line) for line in lines), len(lines))]
+    nets = {}
+    obstacles = {}
+    kinds = {'#': Solid, '+': LineEdge, '-': PassableLine, '|': PassableLine}
+    for y, line in enumerate(lines):
+        for x, char in enumerate(line):
+            if char.isupper():
+                nets.setdefault(char.lower(), []).insert(0, (x, y))
+            elif char.islower():
+                nets.setdefault(char, []).append((x, y))
+            elif char in kinds:
+                obstacles[(x, y)] = kinds[char]
+    return nets, obstacles, search_rect
+
+
+def iter_tree_lines(tree):
+    for point, children in tree.items():
+        for child in children:
+            yield point, child
+        yield from iter_tree_lines(children)
+
+
+def tree_tracks(tree, terminals):
+    """
+    Tracks of a tree as (point, horizontal) computed from its lines.
+    """
+    orientations = {}
+    for start, end in iter_tree_lines(tree):
+        assert start[0] == end[0] or start[1] == end[1]
+        horizontal = start[1] == end[1]
+        dx = (end[0] > start[0]) - (end[0] < start[0])
+        dy = (end[1] > start[1]) - (end[1] < start[1])
+        point = start
+        while point != end:
+            orientations.setdefault(point, []).append(horizontal)
+            point = (point[0] + dx, point[1] + dy)
+            orientations.setdefault(point, []).append(horizontal)
+
+    tracks = set()
+    for point, at_point in orientations.items():
+        if len(at_point) == 2 and at_point[0] == at_point[1] and \
+                point not in terminals:
+            tracks.add((point, at_point[0]))
+        else:
+            tracks.update(((point, True), (point, False)))
+    return tracks
+
+
+class BatchRouterSpec(helpers.CriticalTestCase):
+    def check_trees(self, trees, nets, obstacles, search_rect):
+        (left, top), (right, bottom) = search_rect
+        owners = {point: key for key, terminals in nets.items()
+                  for point in terminals}
+        used = {}
+        for key, tree in trees.items():
+            if not tree:
+                continue
+            self.assertEqual([nets[key][0]], list(tree))
+            tracks = tree_tracks(tree, nets[key])
+            self.assertTrue(set(nets[key]) <= {p for p, _ in tracks})
+            for point, horizontal in tracks:
+                self.assertTrue(left <= point[0] <= right and
+                                top <= point[1] <= bottom)
+                self.assertEqual(key, owners.get(point, key))
+                self.assertNotIn(obstacles.get(point), (Solid, LineEdge))
+                self.assertNotIn((point, horizontal), used)
+                used[(point, horizontal)] = key
+        # existing lines are only crossed
+        for point, obj in obstacles.items():
+            if obj is PassableLine:
+                x, y = point
+                for horizontal, neighbours in (
+                        (True, ((x - 1, y), (x + 1, y))),
+                        (False, ((x, y - 1), (x, y + 1)))):
+                    if any(obstacles.get(n) for n in neighbours):
+                        self.assertNotIn((point, horizontal), used)
+
+    def route(self, area, **kargs):
+        nets, obstacles, search_rect = area_to_nets(area)
+        trees = route_nets(nets, obstacles, search_rect, **kargs)
+        self.assertEqual(set(nets), set(trees))
+        self.check_trees(trees, nets, obstacles, search_rect)
+        return trees
+
+    def test_crossing(self):
+        trees = self.route("""
+             B
+        A    #    a
+             b
+        """)
+        # keeps away from the terminal of b
+        self.assertDictEqual({(8, 2): {(8, 0): {(18, 0): {(18, 2): {}}}}},
+                             trees['a'])
+        self.assertIsNotNone(trees['b'])
+
+    def test_tree(self):
+        trees = self.route("""
+        A       a
+
+        a       a
+        """)
+        lines = list(iter_tree_lines(trees['a']))
+        self.assertEqual(3, len(lines))
+        self.assertEqual(12, sum(abs(start[0] - end[0]) +
+                                 abs(start[1] - end[1])
+                                 for start, end in lines))
+
+    def test_single_terminal(self):
+        self.assertDictEqual({'a': {}}, self.route("A"))
+
+    def test_existing_lines(self):
+        trees = self.route("""
+            +
+        A   |   a
+            |
+        B   +   b
+        """, margin=2)
+        # crosses the line, but goes around its edges
+        self.assertDictEqual({(8, 2): {(16, 2): {}}}, trees['a'])
+        self.assertDictEqual({(8, 4): {(8, 3): {(16, 3): {(16, 4): {}}}}},
+                             trees['b'])
+
+    def test_unreachable(self):
+        trees = self.route("""
+                ###
+        A       #a#
+                ###
+        B     b
+        """)
+        self.assertIsNone(trees['a'])
+        self.assertIsNotNone(trees['b'])
+
+    def random_nets(self, rng, rect, count, density):
+        (left, top), (right, bottom) = rect
+        points = [(x, y) for x in range(left + 1, right)
+                  for y in range(top + 1, bottom)]
+        rng.shuffle(points)
+        nets = {}
+        for key in range(count):
+            nets[key] = [points.pop() for _ in range(rng.choice((2, 2, 3)))]
+        obstacles = {point: Solid
+                     for point in points[:int(density * len(points))]}
+        return nets, obstacles
+
+    def test_rip_up_and_reroute(self):
+        rng = random.Random(1)
+        failures_without, failures = 0, 0
+        for _ in range(40):
+            rect = [(0, 0), (14, 10)]
+            nets, obstacles = self.random_nets(rng, rect, 4, 0.2)
+            trees = route_nets(nets, obstacles, rect, max_iterations=0)
+            self.check_trees(trees, nets, obstacles, rect)
+            failures_without += list(trees.values()).count(None)
+            trees = route_nets(nets, obstacles, rect)
+            self.check_trees(trees, nets, obstacles, rect)
+            failures += list(trees.values()).count(None)
+        self.assertLess(failures, failures_without)
+
+    def test_processes(self):
+        rng = random.Random(2)
+        rect = [(0, 0), (120, 120)]
+        nets, obstacles = self.random_nets(rng, rect, 30, 0.05)
+        # short nets in separate regions
+        nets = {key: [terminals[0], (terminals[0][0] + 4, terminals[0][1])]
+                for key, terminals in nets.items()
+                if terminals[0][0] < 110}
+        for terminals in nets.values():
+            obstacles.pop(terminals[1], None)
+
+        trees = route_nets(nets, obstacles, rect)
+        self.check_trees(trees, nets, obstacles, rect)
+        self.assertDictEqual(trees, route_nets(nets, obstacles, rect,
+                                               processes=2))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Test routing the lines of whole netlists in the scene.
+'''
+
+from PySide import QtGui
+
+from schematics import GridScene
+from schematics.batch_routing import route_connections, route_net
+from logicitems import LineTree, ConnectorItem
+from tests.helpers import wait_until_registry_enumerated
+from tests import helpers
+
+AND_GUID = "7793F2A0-B313-4489-ABF3-8570ECDFE3EE"
+
+
+class BatchRoutingSpec(helpers.CriticalTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.app = QtGui.QApplication.instance()
+        if not self.app:
+            self.app = QtGui.QApplication([])
+
+        self.scene = GridScene()
+
+        # wait until all types have been enumerated
+        wait_until_registry_enumerated(self.scene, self.app)
+
+    def tearDown(self):
+        # FIXME: No idea why this workaround is necessary :(
+        self.scene.deleteLater()
+        self.scene._core.quit()
+        self.scene._core_thread.join()
+        self.scene._registry._registry_handler.quit(True)
+        self.scene = None
+
+        self.app.processEvents()
+
+        super().tearDown()
+
+    def add_and(self, x, y):
+        item = self.scene.registry().instantiate_frontend_item(AND_GUID)
+        item.setPos(self.scene.to_scene_point((x, y)))
+        self.scene.addItem(item)
+        return item
+
+    def end_point(self, item, port, is_input):
+        for child in item.childItems():
+            if isinstance(child, ConnectorItem) and \
+                    child.is_input() == is_input and child.port() == port:
+                return self.scene.to_grid(child.endPoint())
+
+    def line_ends(self, metadata):
+        """Returns the ends of all lines of the tree in grid coordinates."""
+        tree = self.scene.registry().instantiate_frontend_item(
+            backend_guid=LineTree.GUI_GUID(),
+            additional_metadata=metadata)
+        ends = set()
+        for line in tree.iter_scene_lines():
+            ends.add(self.scene.to_grid(line.p1()))
+            ends.add(self.scene.to_grid(line.p2()))
+        return ends
+
+    def test_route_connections(self):
+        source = self.add_and(0, 0)
+        sink = self.add_and(10, 6)
+        connections = [(source.id(), 0, sink.id(), 0),
+                       (source.id(), 0, sink.id(), 1)]
+
+        trees = route_connections(self.scene, connections)
+
+        self.assertListEqual([(source.id(), 0)], list(trees))
+        ends = self.line_ends(trees[(source.id(), 0)])
+        self.assertIn(self.end_point(source, 0, False), ends)
+        self.assertIn(self.end_point(sink, 0, True), ends)
+        self.assertIn(self.end_point(sink, 1, True), ends)
+
+    def test_route_net(self):
+        self.add_and(5, -1)
+        points = [self.scene.to_scene_point(point)
+                  for point in ((0, 0), (12, -4), (12, 4), (8, 8))]
+
+        metadata = route_net(self.scene, points)
+
+        self.assertIsNotNone(metadata)
+        ends = self.line_ends(metadata)
+        for point in points:
+            self.assertIn(self.scene.to_grid(point), ends)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+from itertools import product
+
+from backend.bdd import BDDManager, BDDError, FALSE, TRUE, \
+    compile_definition, counterexample, dfs_order, equivalent
+from backend.component_library import get_library
+from backend.components import CompoundElement, And, Or, Xor, Nor
+from backend.components.interconnect import Interconnect
+from backend.components.lookup_table import apply_macro_models, \
+    get_macro_model
+from backend.components.shared_compound_element import describe_compound, \
+    get_definition
+from backend.element import Edge
+from tests.test_backend_core import TestingController, build_halfadder, \
+    build_fulladder
+from tests import helpers
+
+
+def build_sum_of_products(parent, width):
+    """
+    :return: Compound computing a0 & b0 | a1 & b1 | ... with inputs
+        a0, a1, ..., b0, b1, ...
+    """
+    compound = CompoundElement.instantiate(100, parent)
+    result = None
+    for i in range(width):
+        and_gate = And.instantiate(101 + 2 * i, compound)
+        compound.input_bank.connect(i, and_gate, 0)
+        compound.input_bank.connect(width + i, and_gate, 1)
+
+        if result is None:
+            result = and_gate
+        else:
+            or_gate = Or.instantiate(102 + 2 * i, compound)
+            result.connect(0, or_gate, 0)
+            and_gate.connect(0, or_gate, 1)
+            result = or_gate
+
+    result.connect(0, compound.output_bank, 0)
+    return compound
+
+
+class BDDTest(helpers.CriticalTestCase):
+    """
+    Unit tests for BDD compilation of combinational logic.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.ctrl = TestingController(library=get_library())
+        self.core = self.ctrl.get_core()
+
+    def _definition(self, compound):
+        return get_definition(describe_compound(compound), get_library())
+
+    def test_manager(self):
+        manager = BDDManager(3, [2, 0, 1])
+        a, b, c = (manager.variable(i) for i in range(3))
+
+        # Canonical
+        self.assertEqual(manager.apply_and(a, b), manager.apply_and(b, a))
+        self.assertEqual(FALSE, manager.apply_and(a, manager.apply_not(a)))
+        self.assertEqual(TRUE, manager.apply_or(a, manager.apply_not(a)))
+
+        f = manager.apply_or(manager.apply_and(a, b), c)
+        for inputs in product((False, True), repeat=3):
+            self.assertEqual(inputs[0] and inputs[1] or inputs[2],
+                             manager.evaluate(f, inputs))
+
+        self.assertEqual(3, manager.size([f]))
+        self.assertIsNone(manager.satisfy(FALSE))
+        self.assertTrue(manager.evaluate(f, manager.satisfy(f)))
+
+        self.assertRaises(BDDError, BDDManager, 2, [0, 0])
+
+    def test_full_adder(self):
+        cones = compile_definition(self._definition(
+            build_fulladder("fa", self.ctrl)))
+
+        for inputs in product((False, True), repeat=3):
+            ones = sum(inputs)
+            self.assertListEqual([ones % 2 == 1, ones >= 2],
+                                 cones.evaluate(inputs))
+
+    def test_variable_order(self):
+        definition = self._definition(build_sum_of_products(self.ctrl, 8))
+
+        order = dfs_order(definition)
+        self.assertListEqual(list(range(16)), sorted(order))
+        # Pairs of inputs of the same and gate are adjacent
+        for i in range(0, 16, 2):
+            self.assertEqual(8, abs(order[i] - order[i + 1]))
+
+        self.assertEqual(16, compile_definition(definition).size())
+        self.assertGreater(compile_definition(definition, 'natural').size(),
+                           256)
+
+    def test_equivalence(self):
+        ha = self._definition(build_halfadder("ha", self.ctrl))
+        self.assertTrue(equivalent(ha, self._definition(
+            build_halfadder("other", self.ctrl))))
+
+        # Carry computed with an or gate
+        edited = CompoundElement.instantiate(3, self.ctrl)
+        xor_gate = Xor.instantiate(1, edited)
+        or_gate = Or.instantiate(2, edited)
+        for port in range(2):
+            edited.input_bank.connect(port, xor_gate, port)
+            edited.input_bank.connect(port, or_gate, port)
+        xor_gate.connect(0, edited.output_bank, 0)
+        or_gate.connect(0, edited.output_bank, 1)
+
+        example = counterexample(ha, self._definition(edited))
+        self.assertIsNotNone(example)
+        self.assertNotEqual(example[0], example[1])
+
+        self.assertRaises(BDDError, equivalent, ha, self._definition(
+            build_fulladder("fa", self.ctrl)))
+
+    def test_unsupported(self):
+        latch = CompoundElement.instantiate(0, self.ctrl)
+        first = Nor.instantiate(1, latch)
+        second = Nor.instantiate(2, latch)
+        latch.input_bank.connect(0, first, 0)
+        latch.input_bank.connect(1, second, 1)
+        first.connect(0, second, 0)
+        second.connect(0, first, 1)
+        first.connect(0, latch.output_bank, 0)
+
+        self.assertRaises(BDDError, compile_definition,
+                          self._definition(latch))
+
+    def test_symbolic_model(self):
+        fa = build_fulladder("fa", self.ctrl)
+        self.assertIsNone(get_macro_model(fa, max_inputs=2))
+
+        model = get_macro_model(fa, max_inputs=2, max_symbolic_inputs=3)
+        self.assertIsNone(model.table)
+        self.assertIsNotNone(model.cones)
+        self.assertListEqual([2, 3], model.delays)
+
+        outputs = [Interconnect.instantiate(10 + i, self.ctrl)
+                   for i in range(2)]
+        for port, output in enumerate(outputs):
+            self.assertTrue(fa.connect(port, output, 0))
+
+        self.assertListEqual([fa], apply_macro_models(
+            [fa], max_inputs=2, max_symbolic_inputs=3))
+
+        for states in product((False, True), repeat=3):
+            for port, state in enumerate(states):
+                self.core.schedule(Edge(self.core.clock + 1, fa, port,
+                                        state))
+            self.core.loop_until_stable_state_or_time(self.core.clock + 100)
+
+            ones = sum(states)
+            self.assertListEqual([ones % 2 == 1, ones >= 2],
+                                 [o.state for o in outputs])
@@ -9,7 +9,9 @@
 from backend.component_library import (get_library,
                                        ComponentLibrary,
                                        ComponentInstance,
-                                       ComponentType)
+                                       ComponentType,
+                                       HandleTable,
+                                       MetadataView, materialize)
 
 from backend.components import And, Xor
 from tests.mocks import ElementRootMock
@@ -100,6 +102,73 @@ class ComponentInstanceTests(helpers.CriticalTestCase):
 
         self.assertDictEqual(metadata, self.inst.get_metadata())
 
+    def test_metadata_view(self):
+        view = self.inst.get_metadata_view({'key': 'overlay'})
+
+        self.assertEqual('overlay', view['key'])
+        self.assertEqual('bar', view['foo'])
+        self.assertNotIn('doesnotexist', view)
+        self.assertEqual(4, len(view))
+        self.assertDictEqual({'foo': 'bar',
+                              'key': 'overlay',
+                              'id': 0,
+                              'GUID': '628AAFE2-82B3-4465-83A6-87D0FC46071F'},
+                             dict(view))
+
+        # Views reflect later changes without copying
+        self.inst.set_metadata_field('new', 'shiny')
+        self.assertEqual('shiny', view['new'])
+        with self.assertRaises(TypeError):
+            view['foo'] = 'biz'
+
+    def test_metadata_view_precedence(self):
+        view = MetadataView({'a': 1}, {'a': 2, 'b': 2}, {'c': 3})
+        self.assertListEqual(['a', 'b', 'c'], sorted(view))
+        self.assertDictEqual({'a': 1, 'b': 2, 'c': 3}, dict(view))
+
+    def test_materialize(self):
+        child = MetadataView({'id': 2}, {'GUID': 'G'})
+        view = MetadataView({'children': [child]}, {'id': 1})
+        data = materialize([view])
+
+        self.assertListEqual([{'id': 1, 'children': [{'id': 2,
+                                                       'GUID': 'G'}]}],
+                             data)
+        self.assertIs(dict, type(data[0]['children'][0]))
+        self.assertEqual('x', materialize('x'))
+
+    def test_handle(self):
+        table = self.root.get_handle_table()
+        self.assertEqual(0, self.inst.handle())
+        self.assertIs(self.inst, table.instance(self.inst.handle()))
+        self.assertIs(self.inst, table[0])
+        self.assertEqual(0, table.component_id(self.inst.handle()))
+
+    def test_handle_table(self):
+        class Inst:
+            def __init__(self, component_id):
+                self._id = component_id
+
+            def id(self):
+                return self._id
+
+        table = HandleTable()
+        a = Inst(2 ** 127)
+        b = Inst(5)
+        self.assertEqual(0, table.add(a))
+        table[5] = b
+        table[5] = b  # Mustn't assign a second handle
+        self.assertEqual(2, table.capacity())
+        self.assertEqual(1, table.handle(5))
+        self.assertListEqual([2 ** 127, 5], list(table))
+
+        del table[2 ** 127]
+        self.assertNotIn(2 ** 127, table)
+        self.assertIsNone(table.instance(0))
+        self.assertEqual(1, len(table))
+        # Handles are never reused
+        self.assertEqual(2, table.add(Inst(6)))
+
     def test_metadata_set_field_propagation(self):
         self.inst.set_metadata_field('biz', 'buz')
         self.inst.set_metadata_field('biz', 'buz')
@@ -149,7 +218,8 @@ class ComponentInstanceTests(helpers.CriticalTestCase):
                     'id': 0,
                     'GUID': '628AAFE2-82B3-4465-83A6-87D0FC46071F'}
 
-        self.assertDictEqual(metadata, self.root.history[0])
+        # Views are only materialized when posted to the frontend
+        self.assertDictEqual(metadata, materialize(self.root.history[0]))
 
     def test_get_library(self):
         self.assertEqual('astringandnotalibrary', self.inst.get_library())
@@ -7,8 +7,10 @@
 #
 
 from backend.components.compound_element import CompoundElement
+from backend.components.basic_logic_elements import And
 from backend.components.interconnect import Interconnect
 from backend.component_library import get_library
+from backend.element import Edge
 from tests.mocks import ElementRootMock
 from tests import helpers
 
@@ -40,3 +42,43 @@ class CompoundElementTest(helpers.CriticalTestCase):
 
         self.assertListEqual([False, True, False, True, False, False],
                              [outs[i].state for i in range(0, 6)])
+
+    def test_flattened_outputs(self):
+        p = ElementRootMock(get_library())
+        outer = CompoundElement.instantiate(0, p)
+        inner = CompoundElement.instantiate(1, outer)
+        gate = And.instantiate(2, inner)
+
+        outer.input_bank.connect(0, inner, 1)
+        inner.input_bank.connect(1, gate, 0)
+
+        driver = Interconnect.instantiate(3, p)
+        driver.connect(output_port=0, element=outer, input_port=0, delay=2)
+
+        # Edges skip both hierarchy levels
+        driver.edge(0, True)
+        self.assertListEqual([Edge(2, gate, 0, True)], driver.clock(0))
+
+        # Changes inside the hierarchy invalidate the flattened connection
+        inner.input_bank.disconnect(1)
+        self.assertListEqual([(None, 0, 2)], driver.flattened_outputs())
+
+    def test_flattened_outputs_cached_per_simulation(self):
+        p = ElementRootMock(get_library())
+        compound = CompoundElement.instantiate(0, p)
+        gate = And.instantiate(1, compound)
+        compound.input_bank.connect(0, gate, 0)
+
+        driver = Interconnect.instantiate(2, p)
+        driver.connect(output_port=0, element=compound, input_port=0)
+        flattened = driver.flattened_outputs()
+
+        # Connecting elements of another simulation keeps the cache
+        other = ElementRootMock(get_library())
+        Interconnect.instantiate(0, other).connect(
+            output_port=0, element=Interconnect.instantiate(1, other),
+            input_port=0)
+        self.assertIs(flattened, driver.flattened_outputs())
+
+        compound.input_bank.disconnect(0)
+        self.assertListEqual([(None, 0, 0)], driver.flattened_outputs())
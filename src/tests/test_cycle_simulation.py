@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+from backend.components import DFlipFlop, Xor, Nor, And
+from backend.components.interconnect import Interconnect
+from backend.cycle_simulation import CycleSimulator, CycleSimulationError
+from backend.element import Edge
+from backend.fault_simulation import FaultSimulator, FaultSimulationError
+from tests.test_backend_core import TestingController
+from tests import helpers
+
+
+class CycleSimulationTest(helpers.CriticalTestCase):
+    """
+    Unit tests for the cycle-based simulation of synchronous designs.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.ctrl = TestingController()
+        self.core = self.ctrl.get_core()
+
+    def _build_lfsr(self):
+        """
+        Three bit shift register with the last stage xor the input fed
+        back into the first stage.
+        """
+        self.data = Interconnect.instantiate(1, self.ctrl)
+        self.clk = Interconnect.instantiate(2, self.ctrl)
+        self.ffs = [DFlipFlop.instantiate(3, self.ctrl, {'state': True}),
+                    DFlipFlop.instantiate(4, self.ctrl),
+                    DFlipFlop.instantiate(5, self.ctrl)]
+        self.qs = [Interconnect.instantiate(6 + i, self.ctrl)
+                   for i in range(3)]
+        xor = Xor.instantiate(9, self.ctrl)
+
+        for i, (ff, q) in enumerate(zip(self.ffs, self.qs)):
+            self.assertTrue(ff.connect(0, q, 0))
+            self.assertTrue(self.clk.connect(i, ff, 1))
+        self.assertTrue(self.qs[0].connect(0, self.ffs[1], 0))
+        self.assertTrue(self.qs[1].connect(0, self.ffs[2], 0))
+        self.assertTrue(self.qs[2].connect(0, xor, 0))
+        self.assertTrue(self.data.connect(0, xor, 1))
+        self.assertTrue(xor.connect(0, self.ffs[0], 0))
+
+    def _simulate_events(self, stimulus):
+        for q in self.qs:
+            self.core.schedule(Edge(0, q, 0, None))  # Propagate initial Q
+
+        sampled = []
+        for cycle, (state,) in enumerate(stimulus):
+            start = 20 * cycle + 1
+            self.core.schedule(Edge(start, self.data, 0, state))
+            self.core.loop_until_stable_state_or_time(start + 9)
+            sampled.append([bool(ff.output_states[0]) for ff in self.ffs])
+
+            self.core.schedule(Edge(start + 10, self.clk, 0, True))
+            self.core.schedule(Edge(start + 15, self.clk, 0, False))
+            self.core.loop_until_stable_state_or_time(start + 20)
+        return sampled
+
+    def test_flip_flop(self):
+        ff = DFlipFlop.instantiate(1, self.ctrl)
+        out = Interconnect.instantiate(2, self.ctrl)
+        self.assertTrue(ff.connect(0, out, 0))
+
+        def apply(when, port, state):
+            self.core.schedule(Edge(when, ff, port, state))
+            self.core.loop_until_stable_state_or_time(when + 5)
+            return out.state
+
+        self.assertFalse(apply(10, 0, True))  # D alone changes nothing
+        self.assertTrue(apply(20, 1, True))  # Rising edge captures D
+        self.assertTrue(apply(30, 0, False))
+        self.assertTrue(apply(40, 1, False))  # Falling edge keeps Q
+        self.assertFalse(apply(50, 1, True))
+
+    def test_matches_event_simulation(self):
+        self._build_lfsr()
+        stimulus = [(state,) for state in
+                    (False, False, True, False, True, True, False, False,
+                     False, True, False, False, False, False, True, False)]
+
+        simulator = CycleSimulator(self.ctrl.elements.values(),
+                                   inputs=[(self.data, 0)],
+                                   outputs=[(ff, 0) for ff in self.ffs],
+                                   clock=(self.clk, 0))
+        # Xor is the only gate between the flip-flops
+        self.assertEqual(1, len(simulator.levels))
+        self.assertListEqual([True, False, False], simulator.state)
+
+        expected = self._simulate_events(stimulus)
+        self.assertListEqual(expected, simulator.run(stimulus))
+        self.assertEqual(len(stimulus), simulator.cycles)
+        # State after the last clock edge
+        self.assertListEqual([bool(ff.output_states[0]) for ff in self.ffs],
+                             simulator.state)
+
+    def test_levels(self):
+        # Chain of and gates, each on its own level
+        gates = [And.instantiate(i, self.ctrl) for i in range(4)]
+        for first, second in zip(gates, gates[1:]):
+            self.assertTrue(first.connect(0, second, 0))
+
+        inputs = [(gates[0], 0)] + [(gate, 1) for gate in gates]
+        simulator = CycleSimulator(gates, inputs=inputs)
+        self.assertListEqual([[gate] for gate in gates],
+                             [[g.element for g in level]
+                              for level in simulator.levels])
+        self.assertListEqual([[True], [False]],
+                             simulator.run([(True,) * 5,
+                                            (True, True, False, True, True)]))
+
+    def test_invalid_netlists(self):
+        # Nor latch is a combinational loop
+        first = Nor.instantiate(1, self.ctrl)
+        second = Nor.instantiate(2, self.ctrl)
+        first.connect(0, second, 0)
+        second.connect(0, first, 1)
+        self.assertRaises(CycleSimulationError, CycleSimulator,
+                          [first, second], [])
+
+        # Flip-flop clocked by something else than the clock
+        ff = DFlipFlop.instantiate(3, self.ctrl)
+        clk = Interconnect.instantiate(4, self.ctrl)
+        self.assertRaises(CycleSimulationError, CycleSimulator,
+                          [ff, clk], [], clock=(clk, 0))
+        self.assertTrue(clk.connect(0, ff, 1))
+        CycleSimulator([ff, clk], [], clock=(clk, 0))
+
+        self.assertRaises(CycleSimulationError, CycleSimulator,
+                          [ff], [(clk, 0)])
+        self.assertRaises(FaultSimulationError, FaultSimulator,
+                          [ff], [(ff, 0)])
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+import os
+import queue
+import tempfile
+
+from backend.controller import Controller
+from backend.component_library import get_library
+from backend.components import And, Interconnect
+from backend.delay_annotation import parse_delay_file, \
+    DelayAnnotationError, ALL_OUTPUTS
+from tests.helpers import drain_queue
+from tests.test_controller import CoreMock
+from tests.test_backend_core import build_halfadder
+from tests import helpers
+
+DELAY_FILE = """
+(DELAYFILE
+  (SDFVERSION "3.0")
+  (TIMESCALE 2)
+  (CELL (CELLTYPE "And") (INSTANCE and1)
+    (DELAY (ABSOLUTE (IOPATH a y (1:2:3)) (IOPATH b y (1.5)))))
+  (CELL (CELLTYPE "Interconnect") (INSTANCE *)
+    (DELAY (ABSOLUTE (INTERCONNECT net/0 and1/a (4))
+                     (INTERCONNECT and1/* out/0 (1 3))))))
+"""
+
+
+class DelayAnnotationTest(helpers.CriticalTestCase):
+    """
+    Unit tests for the delay file parser and its application.
+    """
+
+    def test_parse(self):
+        annotation = parse_delay_file(DELAY_FILE)
+
+        self.assertDictEqual({'and1': 4}, annotation.gate_delays)
+        self.assertListEqual([('net', 0, 8), ('and1', ALL_OUTPUTS, 6)],
+                             annotation.wire_delays)
+
+    def test_invalid(self):
+        for text in ('', '(CELL)', '(DELAYFILE (CELL', '(DELAYFILE))',
+                     '(DELAYFILE (CELL (INSTANCE a) (DELAY (ABSOLUTE '
+                     '(IOPATH a y (x))))))',
+                     '(DELAYFILE (CELL (INSTANCE *) (DELAY (ABSOLUTE '
+                     '(INTERCONNECT a/b c/d (1))))))'):
+            self.assertRaises(DelayAnnotationError, parse_delay_file, text)
+
+    def test_annotate(self):
+        ctrl = Controller(core=CoreMock(), library=get_library(),
+                          queue_type=queue.Queue)
+        interface = ctrl.get_interface()
+
+        _, net = interface.create_element(Interconnect.GUID(),
+                                          additional_metadata={'name': 'net'})
+        _, gate = interface.create_element(And.GUID(),
+                                           additional_metadata={'name':
+                                                                'and1'})
+        _, out = interface.create_element(Interconnect.GUID())
+        interface.connect(net, 0, gate, 0)
+        interface.connect(gate, 0, out, 0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'delays.sdf')
+            with open(path, 'w') as f:
+                f.write(DELAY_FILE)
+
+            interface.annotate_delays(path)
+            ctrl.process(0)
+
+        msg = drain_queue(ctrl.get_channel_out(),
+                          lambda m: m['type'] != 'alive')
+        self.assertEqual('delays-annotated', msg[-1]['type'])
+        self.assertEqual(1, msg[-1]['gates'])
+        self.assertEqual(2, msg[-1]['connections'])
+
+        self.assertEqual(4, ctrl.elements[gate].delay)
+        self.assertListEqual([(gate, 0, 8)],
+                             ctrl.elements[net].get_metadata_field('outputs'))
+        self.assertListEqual([(out, 0, 6)],
+                             ctrl.elements[gate].get_metadata_field('outputs'))
+
+    def _annotate(self, ctrl, text):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'delays.sdf')
+            with open(path, 'w') as f:
+                f.write(text)
+
+            ctrl.get_interface().annotate_delays(path)
+            ctrl.process(0)
+
+        return drain_queue(ctrl.get_channel_out(),
+                           lambda m: m['type'] != 'alive')
+
+    def test_annotate_net_and_compound(self):
+        ctrl = Controller(core=CoreMock(), library=get_library(),
+                          queue_type=queue.Queue)
+        half_adder = build_halfadder('ha', ctrl)
+        net = Interconnect.instantiate(10, ctrl, {'name': 'net'})
+        gate = And.instantiate(11, ctrl)
+        self.assertTrue(net.connect(0, gate, 0))
+
+        msg = self._annotate(ctrl, """
+            (DELAYFILE
+              (CELL (INSTANCE net) (DELAY (ABSOLUTE (IOPATH a y (2)))))
+              (CELL (INSTANCE *)
+                (DELAY (ABSOLUTE (INTERCONNECT ha/1 x/0 (5))))))""")
+
+        self.assertEqual('delays-annotated', msg[-1]['type'])
+        self.assertEqual(2, msg[-1]['connections'])
+        self.assertListEqual([(gate, 0, 2)], net.outputs)
+
+        # The carry output is driven by the And gate inside
+        xor_gate, and_gate = [driver for driver, _
+                              in half_adder.output_drivers()]
+        self.assertListEqual([(half_adder.output_bank, 1, 5)],
+                             and_gate.outputs)
+        self.assertListEqual([(half_adder.output_bank, 0, 0)],
+                             xor_gate.outputs)
+        self.assertEqual(5, and_gate.flattened_outputs()[0][2])
+
+    def test_annotate_invalid(self):
+        ctrl = Controller(core=CoreMock(), library=get_library(),
+                          queue_type=queue.Queue)
+        build_halfadder('ha', ctrl)
+        gate = And.instantiate(11, ctrl, {'name': 'and1', 'delay': 1})
+
+        for cells in ('(CELL (INSTANCE ha) (DELAY (ABSOLUTE '
+                      '(IOPATH a y (2)))))',
+                      '(CELL (INSTANCE nothere) (DELAY (ABSOLUTE '
+                      '(IOPATH a y (2)))))',
+                      '(CELL (INSTANCE *) (DELAY (ABSOLUTE '
+                      '(INTERCONNECT and1/3 x/0 (2)))))'):
+            with self.assertRaises(DelayAnnotationError):
+                self._annotate(ctrl, """
+                    (DELAYFILE
+                      (CELL (INSTANCE and1)
+                        (DELAY (ABSOLUTE (IOPATH a y (7)))))
+                      {0})""".format(cells))
+
+            # Nothing is applied
+            self.assertEqual(1, gate.delay)
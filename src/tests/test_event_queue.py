@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+from queue import Empty
+import random
+
+from backend.event import Event
+from backend.event_queue import DelayBucketQueue
+from tests import helpers
+
+
+class E(Event):
+    def __init__(self, when, group):
+        super().__init__(when, group)
+
+    def process(self, last):
+        return []
+
+
+class DelayBucketQueueTest(helpers.CriticalTestCase):
+    """
+    Unit tests for the delay bucketed event queue.
+    """
+
+    def test_empty(self):
+        q = DelayBucketQueue()
+        self.assertTrue(q.empty())
+        self.assertEqual(0, len(q))
+        self.assertEqual((), q.queue)
+        self.assertRaises(Empty, q.get_nowait)
+        self.assertRaises(Empty, q.peek)
+
+    def test_ties(self):
+        q = DelayBucketQueue()
+        e1, e2, e3 = E(5, 1), E(5, 1), E(5, 0)
+        for e in (e1, e2, e3):
+            q.put(e)
+
+        self.assertIs(e3, q.queue[0])
+        self.assertListEqual([e3, e2, e1],
+                             [q.get_nowait() for _ in range(3)])
+
+    def test_order(self):
+        rand = random.Random(42)
+        q = DelayBucketQueue()
+        pending = []  # (when, group) of all queued events
+
+        def put(when):
+            event = E(when, rand.randint(-1, 3))
+            q.put(event)
+            pending.append((event.when, event.group))
+
+        for _ in range(20):
+            put(rand.choice((0, 1, 2, 5)))
+
+        retrieved = 0
+        while not q.empty():
+            event = q.get_nowait()
+            expected = min(pending)
+            pending.remove(expected)
+            self.assertEqual(expected, (event.when, event.group))
+
+            retrieved += 1
+            if retrieved < 2000:
+                for _ in range(rand.randint(0, 2)):
+                    put(event.when + rand.choice((0, 1, 2, 5, 0.5)))
+
+        self.assertEqual(0, len(q))
+        self.assertListEqual([], pending)
+
+    def test_requeue_same_event(self):
+        # Events like the testbench stimulus re-queue themselves with a
+        # new time and group after being processed.
+        q = DelayBucketQueue()
+        e1, e2, e3 = E(1, 0), E(1, -1), E(2, 0)
+        q.put(e1)
+        q.put(e2)  # Displaces e1 as head of its bucket
+        q.put(e3)
+        self.assertListEqual([e2, e1], [q.get_nowait(), q.get_nowait()])
+
+        # Lands in the bucket e1 used before, now keyed after e3
+        e1.when, e1.group = 2, float('inf')
+        q.put(e1)
+        self.assertListEqual([e3, e1], [q.get_nowait(), q.get_nowait()])
+        self.assertTrue(q.empty())
+
+    def test_requeue_order(self):
+        rand = random.Random(7)
+        for _ in range(100):
+            q = DelayBucketQueue()
+            pending = []
+
+            for _ in range(10):
+                event = E(rand.randint(0, 3), rand.randint(-1, 3))
+                q.put(event)
+                pending.append((event.when, event.group))
+
+            while not q.empty():
+                event = q.get_nowait()
+                expected = min(pending)
+                pending.remove(expected)
+                self.assertEqual(expected, (event.when, event.group))
+
+                if rand.random() < 0.5 and len(pending) < 50:
+                    event.when += rand.choice((0, 0, 1, 2))
+                    event.group = rand.choice((-1, 0, 2, float('inf')))
+                    q.put(event)
+                    pending.append((event.when, event.group))
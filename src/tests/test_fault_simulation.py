@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+from itertools import product
+
+from backend.component_library import get_library, ComponentType
+from backend.components import And, Nor
+from backend.components.interconnect import Interconnect
+from backend.components.shared_compound_element import \
+    SharedCompoundElement, describe_compound
+from backend.fault_simulation import FaultSimulator, Fault, \
+    FaultSimulationError
+from backend.simple_element import SimpleElement
+from tests.test_backend_core import TestingController, build_halfadder
+from tests import helpers
+
+
+EXHAUSTIVE = list(enumerate(product((False, True), repeat=2)))
+
+
+class Majority(ComponentType):
+    """
+    Gate without a word level function in the fault simulator.
+    """
+    METADATA = {"GUID": "0A4D2E4C-7A52-4C7B-9D1C-2F1A7E5C9B31",
+                "#inputs": 3,
+                "#outputs": 1,
+                "delay": 1}
+
+    @staticmethod
+    def logic_function(inputs):
+        return [sum(inputs) >= 2]
+
+    @classmethod
+    def instantiate(cls, id, parent, additional_metadata={}):
+        metadata = dict(additional_metadata)
+        metadata["id"] = id
+        return SimpleElement(parent, metadata, cls, cls.logic_function)
+
+
+class FaultSimulationTest(helpers.CriticalTestCase):
+    """
+    Unit tests for the bit-parallel stuck-at fault simulator.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.ctrl = TestingController(library=get_library())
+
+    def _halfadder(self):
+        half_adder = build_halfadder("ha", self.ctrl)
+        _, _, a, b, xor_gate, and_gate = half_adder.get_children()
+        return half_adder, a, b, xor_gate, and_gate
+
+    def test_halfadder_coverage(self):
+        half_adder, a, b, xor_gate, and_gate = self._halfadder()
+
+        simulator = FaultSimulator([half_adder] + half_adder.get_children(),
+                                   inputs=[(a, 0), (b, 0)])
+        self.assertListEqual([(xor_gate, 0), (and_gate, 0)],
+                             [(node.element, port)
+                              for node, port in simulator.outputs])
+        # Interconnects: 1 input, 2 outputs. Gates: 2 inputs, 1 output.
+        self.assertEqual(2 * 4 * 3, len(simulator.faults))
+
+        result = simulator.run(EXHAUSTIVE)
+        self.assertEqual(1.0, result.coverage)
+        self.assertListEqual([], result.undetected())
+
+    def test_detection_time(self):
+        _, a, b, xor_gate, and_gate = self._halfadder()
+
+        simulator = FaultSimulator([a, b, xor_gate, and_gate],
+                                   inputs=[(a, 0), (b, 0)])
+        result = simulator.run(EXHAUSTIVE)
+        detected = result.detected()
+
+        # Outputs stuck at True show with the first vector
+        self.assertEqual(0, detected[Fault(xor_gate, 0, True, True)])
+        self.assertEqual(0, detected[Fault(and_gate, 0, True, True)])
+        # Xor stuck at False needs a single True input
+        self.assertEqual(1, detected[Fault(xor_gate, 0, True, False)])
+        # And stuck at False needs both inputs True
+        self.assertEqual(3, detected[Fault(and_gate, 0, True, False)])
+        # The branch of b into the and needs a on True and b on False
+        self.assertEqual(2, detected[Fault(b, 1, True, True)])
+
+    def test_partial_stimulus(self):
+        _, a, b, xor_gate, and_gate = self._halfadder()
+
+        simulator = FaultSimulator([a, b, xor_gate, and_gate],
+                                   inputs=[(a, 0), (b, 0)],
+                                   outputs=[(and_gate, 0)])
+        result = simulator.run([(5, (True, True))])
+
+        self.assertEqual(5, result.detected()[Fault(a, 0, False, False)])
+        self.assertIn(Fault(xor_gate, 0, True, True), result.undetected())
+        self.assertLess(result.coverage, 1.0)
+
+    def test_feedback(self):
+        # Nor latch: set on input 0 of first, reset on input 1 of second
+        first = Nor.instantiate(0, self.ctrl)
+        second = Nor.instantiate(1, self.ctrl)
+        q = Interconnect.instantiate(2, self.ctrl)
+        nq = Interconnect.instantiate(3, self.ctrl, {'#outputs': 2})
+        self.assertTrue(first.connect(0, nq, 0))
+        self.assertTrue(nq.connect(0, second, 0))
+        self.assertTrue(second.connect(0, q, 0))
+        self.assertTrue(q.connect(0, first, 1))
+
+        simulator = FaultSimulator([first, second, q, nq],
+                                   inputs=[(first, 0), (second, 1)],
+                                   outputs=[(nq, 1)])
+        result = simulator.run([(0, (True, False)), (1, (False, False)),
+                                (2, (False, True)), (3, (False, False))])
+
+        detected = result.detected()
+        self.assertEqual(0, detected[Fault(first, 0, True, True)])
+        self.assertEqual(2, detected[Fault(second, 1, False, False)])
+
+        # Without set both gates start from False inputs and race
+        self.assertListEqual([Fault(first, 0, False, False)],
+                             result.oscillating)
+        self.assertListEqual(result.oscillating, result.undetected())
+
+    def test_bitwise_fallback(self):
+        gate = Majority.instantiate(0, self.ctrl)
+
+        simulator = FaultSimulator([gate], inputs=[(gate, i)
+                                                   for i in range(3)])
+        result = simulator.run(enumerate(product((False, True), repeat=3)))
+
+        self.assertEqual(8, len(result.faults))
+        self.assertEqual(1.0, result.coverage)
+        self.assertEqual(1, result.detected()[Fault(gate, 0, False, True)])
+
+    def test_shared_compound(self):
+        definition = describe_compound(build_halfadder("ha", self.ctrl))
+        shared = SharedCompoundElement.instantiate(
+            100, self.ctrl, {'definition': definition})
+
+        self.assertRaises(FaultSimulationError, FaultSimulator, [shared],
+                          inputs=[])
+
+    def test_invalid_pins(self):
+        gate = And.instantiate(0, self.ctrl)
+        other = And.instantiate(1, self.ctrl)
+
+        self.assertRaises(FaultSimulationError, FaultSimulator, [gate],
+                          inputs=[(other, 0)])
+        self.assertRaises(FaultSimulationError, FaultSimulator, [gate],
+                          inputs=[(gate, 2)])
+
+        simulator = FaultSimulator([gate], inputs=[(gate, 0)])
+        self.assertRaises(FaultSimulationError, simulator.run,
+                          [(0, (True, False))])
+
+    def test_controller(self):
+        interface = self.ctrl.get_interface()
+
+        a = Interconnect.instantiate(10, self.ctrl)
+        b = Interconnect.instantiate(11, self.ctrl)
+        and_gate = And.instantiate(12, self.ctrl)
+        self.assertTrue(a.connect(0, and_gate, 0))
+        self.assertTrue(b.connect(0, and_gate, 1))
+
+        rid = interface.simulate_faults([(10, 0), (11, 0)], EXHAUSTIVE,
+                                        [(12, 0)])
+        self.ctrl.process(0)
+
+        messages = helpers.drain_queue(
+            self.ctrl.get_channel_out(),
+            lambda m: m['type'] == 'fault-simulation')
+        self.assertEqual(1, len(messages))
+        self.assertEqual(rid, messages[0]['in-reply-to'])
+        self.assertEqual(1.0, messages[0]['coverage'])
+        self.assertIn((12, 0, True, False, 3), messages[0]['faults'])
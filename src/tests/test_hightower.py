@@ -9,12 +9,15 @@
 Test the hightower algorithm.
 '''
 
+import itertools
+import random
 from unittest import expectedFailure
 
 from tests import helpers
 from algorithms.hightower import (do_lines_intersect, is_point_on_line,
                                   hightower_line_search, Solid, PassableLine,
-                                  LineEdge)
+                                  LineEdge, get_intersect_point,
+                                  get_normalize_line)
 
 
 def return_none(point):
@@ -391,3 +394,86 @@ class HightowerSpec(helpers.CriticalTestCase):
         res = hightower_line_search(*high_input)
 
         self.assertListEqual(res, exp_res)
+
+
+def walking_escape_line(point, horizontal, get_obj_at_point, search_rect):
+    def end(step):
+        last_free_point = current = point
+        while True:
+            if horizontal:
+                current = (current[0] + step, current[1])
+            else:
+                current = (current[0], current[1] + step)
+            if not (search_rect[0][0] <= current[0] <= search_rect[1][0] and
+                    search_rect[0][1] <= current[1] <= search_rect[1][1]):
+                return last_free_point
+            obj = get_obj_at_point(current)
+            if obj in (Solid, LineEdge):
+                return last_free_point
+            elif obj is None:
+                last_free_point = current
+    return end(-1), end(1)
+
+
+def reference_second_refinement(path, get_obj_at_point, search_rect):
+    """
+    Second refinement testing the escape lines through all points.
+    """
+    path = list(path)
+    i = 0
+    while i < len(path) - 1:
+        vertical = path[i][0] == path[i + 1][0]
+        axis = 1 if vertical else 0
+        step = 1 if path[i][axis] < path[i + 1][axis] else -1
+        for m in itertools.count():
+            value = path[i][axis] + step * m
+            if (path[i + 1][axis] - value) * step <= 0:
+                break
+            q = (path[i][0], value) if vertical else (value, path[i][1])
+            k = walking_escape_line(q, vertical, get_obj_at_point,
+                                    search_rect)
+            for j in range(i + 2, len(path) - 1, 2):
+                test_line = get_normalize_line((path[j], path[j + 1]))
+                if do_lines_intersect(k, test_line):
+                    p_prime = get_intersect_point(k, test_line)
+                    if m == 0:
+                        path[i + 1:j + 1] = [p_prime]
+                    else:
+                        path[i + 1:j + 1] = [q, p_prime]
+                    break
+            else:
+                continue
+            break
+        i += 1
+    return path
+
+
+class SecondRefinementSpec(helpers.CriticalTestCase):
+    def test_same_as_testing_all_points(self):
+        rng = random.Random(3)
+        search_rect = [(-1, -1), (40, 30)]
+        kinds = [Solid, PassableLine, LineEdge]
+        refined = 0
+        for _ in range(200):
+            density = rng.choice((0.05, 0.15, 0.3))
+            blocks = {(x, y): rng.choice(kinds)
+                      for x in range(40) for y in range(30)
+                      if rng.random() < density}
+            points = [(x, y) for x in range(40) for y in range(30)
+                      if (x, y) not in blocks]
+            point_a, point_b = rng.sample(points, 2)
+
+            path = hightower_line_search(point_a, point_b, blocks.get,
+                                         search_rect,
+                                         do_second_refinement=False)
+            res = hightower_line_search(point_a, point_b, blocks.get,
+                                        search_rect)
+            if path is None:
+                self.assertIsNone(res)
+                continue
+            expected = reference_second_refinement(path, blocks.get,
+                                                   search_rect)
+            self.assertListEqual(expected, res)
+            refined += expected != path
+        # the refinement is actually tested
+        self.assertGreater(refined, 10)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Test adapting paths to moved end points.
+'''
+
+from tests import helpers
+from tests.test_hightower import area_to_input_data
+from algorithms.incremental_routing import adapt_path, is_valid_path
+
+
+class AdaptPathSpec(helpers.CriticalTestCase):
+    def setUp(self):
+        area = """
+          A
+
+           -------
+                    B
+              #
+        """
+        (self.point_a, self.point_b, self.get_obj_at_point,
+         self.search_rect), _ = area_to_input_data(area)
+        self.path = [self.point_a, (10, 4), self.point_b]
+
+    def adapt(self, point_b, path=None):
+        return adapt_path(path or self.path, point_b, self.get_obj_at_point,
+                          self.search_rect)
+
+    def test_valid_path(self):
+        self.assertTrue(is_valid_path(self.path, self.get_obj_at_point,
+                                      self.search_rect))
+        # bend on the line
+        self.assertFalse(is_valid_path(
+            [self.point_a, (12, 1), (12, 3), (20, 3), self.point_b],
+            self.get_obj_at_point, self.search_rect))
+        # through the solid
+        self.assertFalse(is_valid_path(
+            [self.point_a, (10, 5), (20, 5), self.point_b],
+            self.get_obj_at_point, self.search_rect))
+        # outside
+        self.assertFalse(is_valid_path(
+            [self.point_a, (10, 20)], self.get_obj_at_point,
+            self.search_rect))
+
+    def test_move_along_last_segment(self):
+        self.assertListEqual([self.point_a, (10, 4), (21, 4)],
+                             self.adapt((21, 4)))
+        self.assertListEqual([self.point_a, (10, 4), (12, 4)],
+                             self.adapt((12, 4)))
+        self.assertListEqual([self.point_a, (10, 4)], self.adapt((10, 4)))
+        # turns the other way
+        self.assertListEqual([self.point_a, (10, 4), (7, 4)],
+                             self.adapt((7, 4)))
+
+    def test_move_last_bend(self):
+        self.assertListEqual([self.point_a, (10, 6), (20, 6)],
+                             self.adapt((20, 6)))
+        self.assertListEqual([self.point_a, (10, 2), (13, 2)],
+                             self.adapt((13, 2)))
+        # crosses the line
+        self.assertListEqual([self.point_a, (10, 3), (20, 3)],
+                             self.adapt((20, 3)))
+        # through the solid
+        self.assertIsNone(self.adapt((20, 5)))
+        # straight line needs a new bend
+        self.assertIsNone(self.adapt((12, 4), [self.point_a, (10, 4)]))
@@ -6,7 +6,8 @@
 # be found in the LICENSE.txt file.
 
 from backend.components.interconnect import Interconnect
-from backend.element import Edge
+from backend.element import Edge, FanOutEdge
+from backend.components import And
 from tests.mocks import ElementRootMock
 from tests import helpers
 
@@ -31,6 +32,12 @@ class InterconnectTest(helpers.CriticalTestCase):
             def id(self):
                 return 0
 
+            def handle(self):
+                return 0
+
+            def resolve_sink(self, input_port):
+                return self, input_port
+
             def connected(self, *args, **argv):
                 return True
 
@@ -54,3 +61,34 @@ class InterconnectTest(helpers.CriticalTestCase):
                               Edge(20, b, 2, False)],
                              i.clock(10))
         self.assertFalse(i.state)
+
+    def test_fan_out(self):
+        p = ElementRootMock()
+        i = Interconnect.instantiate(0, p)
+        gates = [And.instantiate(1 + n, p) for n in range(3)]
+
+        self.assertTrue(i.connect(0, gates[0], 0, delay=2))
+        self.assertTrue(i.connect(1, gates[1], 1, delay=2))
+        self.assertTrue(i.connect(2, gates[2], 0, delay=5))
+
+        i.edge(0, True)
+        self.assertListEqual([FanOutEdge(2, [(gates[0], 0), (gates[1], 1)],
+                                         True),
+                              Edge(5, gates[2], 0, True)],
+                             i.clock(0))
+
+    def test_change_suppression(self):
+        p = ElementRootMock()
+        i = Interconnect.instantiate(0, p)
+        gate = And.instantiate(1, p)
+        self.assertTrue(i.connect(0, gate, 0))
+
+        i.edge(0, False)
+        self.assertListEqual([], i.clock(0))
+
+        # Clocks without edges still propagate
+        self.assertListEqual([Edge(1, gate, 0, False)], i.clock(1))
+
+        i.edge(0, True)
+        i.edge(0, False)
+        self.assertListEqual([], i.clock(2))
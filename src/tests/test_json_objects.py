@@ -9,6 +9,7 @@
 Test the json data format as used in the simulation model.
 '''
 
+from numbers import Integral
 
 from tests import helpers
 from simulation_model import JsonMeta, json_virtual, JsonObject
@@ -104,3 +105,52 @@ class JsonObjectSpec(helpers.CriticalTestCase):
         obj = Test()
         self.assertDictEqual(obj.save(), {'type': 'Test'})
         JsonMeta.validate_data(obj.save())
+
+    def test_json_spec(self):
+        class Test(JsonObject):
+            @classmethod
+            def json_spec(cls):
+                spec = super(Test, cls).json_spec()
+                spec.update({'value': str})
+                return spec
+
+        class Sub(Test):
+            @classmethod
+            def json_spec(cls):
+                spec = super(Sub, cls).json_spec()
+                spec.update({'count': Integral})
+                return spec
+
+        JsonMeta.validate_data({'type': 'Test', 'value': 'a'})
+        JsonMeta.validate_data({'type': 'Sub', 'value': 'a', 'count': 1})
+        self.assertRaises(Exception, JsonMeta.validate_data,
+                          {'type': 'Test', 'value': 1})
+        self.assertRaises(Exception, JsonMeta.validate_data,
+                          {'type': 'Sub', 'value': 'a'})
+        # Validators are compiled once per class
+        self.assertIs(JsonMeta.get_validator(Sub),
+                      JsonMeta.get_validator(Sub))
+        self.assertIsNot(JsonMeta.get_validator(Test),
+                         JsonMeta.get_validator(Sub))
+
+    def test_bulk_validation(self):
+        class Test(JsonObject):
+            @classmethod
+            def json_spec(cls):
+                spec = super(Test, cls).json_spec()
+                spec.update({'value': str})
+                return spec
+
+        data = [{'type': 'Test', 'value': 'a'},
+                {'type': 'Test', 'value': 1},
+                {'type': 'fail'},
+                {'type': 'Test', 'value': 'b'},
+                'Test']
+
+        errors = JsonMeta.validate_all(data)
+        self.assertListEqual([1, 2, 4], [index for index, _ in errors])
+        self.assertIsInstance(errors[0][1], TypeError)
+
+        self.assertRaises(ValueError, JsonMeta.load_objects, data)
+        objects = JsonMeta.load_objects([data[0], data[3]])
+        self.assertListEqual([Test, Test], [type(obj) for obj in objects])
@@ -233,6 +233,74 @@ class LineNearestPointTest(helpers.CriticalTestCase):
             hor_tree.get_nearest_point(tsp(10, -10)), tsp(0, 0))
 
 
+class ScenePointIndexTest(helpers.CriticalTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.app = QtGui.QApplication.instance()
+        if not self.app:
+            self.app = QtGui.QApplication([])
+
+        self.scene = GridScene()
+
+        # wait until all types have been enumerated
+        wait_until_registry_enumerated(self.scene, self.app)
+
+    def tearDown(self):
+        # FIXME: No idea why this workaround is necessary :(
+        self.scene.deleteLater()
+        self.scene._core.quit()
+        self.scene._core_thread.join()
+        self.scene._registry._registry_handler.quit(blocking=True)
+        self.scene._controller._channel_in.close()
+        self.scene._controller._channel_in.join_thread()
+        self.scene._controller._channel_out.close()
+        self.scene._controller._channel_out.join_thread()
+        self.scene = None
+
+        self.app.processEvents()
+
+        super().tearDown()
+
+    def tsp(self, x, y):
+        return self.scene.to_scene_point((x, y))
+
+    def test_line_tree_points(self):
+        tree = linetree_from_path([self.tsp(0, 0), self.tsp(4, 0),
+                                   self.tsp(4, 3)])
+        self.scene.addItem(tree)
+
+        self.assertSetEqual({tree}, self.scene.items_at_point(self.tsp(0, 0)))
+        self.assertSetEqual({tree}, self.scene.items_at_point(self.tsp(2, 0)))
+        self.assertSetEqual({tree}, self.scene.items_at_point(self.tsp(4, 2)))
+        self.assertSetEqual(set(), self.scene.items_at_point(self.tsp(2, 1)))
+
+        self.scene.removeItem(tree)
+        self.assertSetEqual(set(), self.scene.items_at_point(self.tsp(2, 0)))
+
+    def test_connector_moves(self):
+        and_item = self.scene.registry().instantiate_frontend_item(
+            "7793F2A0-B313-4489-ABF3-8570ECDFE3EE")
+        and_item.setPos(self.tsp(10, 10))
+        self.scene.addItem(and_item)
+        connector = and_item._outputs[0]
+        old_point = connector.endPoint()
+        self.assertIn(connector, self.scene.items_at_point(old_point))
+
+        tree = linetree_from_path([old_point, old_point + self.tsp(5, 0)])
+        self.scene.addItem(tree)
+        self.assertSetEqual({tree}, connector.items_at_connection())
+        self.assertSetEqual({and_item}, tree.items_at_connections())
+        self.assertIn(and_item, tree.items_at_position())
+
+        and_item.setPos(self.tsp(10, 20))
+        self.assertNotIn(connector, self.scene.items_at_point(old_point))
+        self.assertIn(connector,
+                      self.scene.items_at_point(connector.endPoint()))
+        self.assertSetEqual(set(), tree.items_at_connections())
+        self.assertNotIn(and_item, tree.items_at_position())
+
+
 class LineMergeRegressionTest(helpers.CriticalTestCase):
     """Merge test not relying on introspecting inner states."""
     def test_simple_corner(self):
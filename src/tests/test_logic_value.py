@@ -10,8 +10,10 @@ Test logic values of the simulation model.
 '''
 
 import operator
+from itertools import product
 
-from simulation_model import LogicValue
+from simulation_model import LogicValue, LogicVector, LOGIC_0, LOGIC_1, \
+    LOGIC_X, reset_analysis
 from tests import helpers
 
 
@@ -310,3 +312,76 @@ class ParserTest(helpers.CriticalTestCase):
         lv.copy_from(LogicValue('X'))
         self.assertEqual(lv, LV_X)
         self.assertIs(lv, lv1)
+
+    def test_constants(self):
+        self.assertListEqual([LOGIC_0, LOGIC_1, LOGIC_X], [LV_0, LV_1, LV_X])
+        self.assertRaises(TypeError, LOGIC_0.copy_from, LV_1)
+        self.assertEqual(LOGIC_0, LV_0)
+        # operators on constants still create new values
+        self.assertIsNot(LOGIC_1, LOGIC_1 & LOGIC_1)
+        self.assertIs(type(LOGIC_1 & LOGIC_1), LogicValue)
+
+
+class LogicVectorTest(helpers.CriticalTestCase):
+    def test_construction(self):
+        vector = LogicVector('01X')
+        self.assertEqual(3, len(vector))
+        self.assertEqual('01X', str(vector))
+        self.assertEqual("LogicVector('01X')", repr(vector))
+        self.assertEqual(vector, LogicVector([LV_0, LV_1, LV_X]))
+        self.assertTupleEqual((0b010, 0b100), vector.planes)
+        self.assertRaises(ValueError, LogicVector, '01b')
+        self.assertEqual('XXXX', str(LogicVector.unknown(4)))
+        # Unknown elements are normalized to a value bit of zero
+        self.assertEqual(vector, LogicVector.from_planes(3, 0b110, 0b100))
+
+    def test_items(self):
+        vector = LogicVector('01X')
+        self.assertIs(LOGIC_0, vector[0])
+        self.assertIs(LOGIC_X, vector[-1])
+        self.assertRaises(IndexError, lambda: vector[3])
+        self.assertListEqual([LV_0, LV_1, LV_X], list(vector))
+
+    def test_operators_match_scalar(self):
+        pairs = list(product('01X', repeat=2))
+        left = LogicVector(a for a, _ in pairs)
+        right = LogicVector(b for _, b in pairs)
+
+        for op in (operator.and_, operator.or_, operator.xor, operator.add):
+            self.assertEqual(
+                LogicVector(op(LogicValue(a), LogicValue(b))
+                            for a, b in pairs),
+                op(left, right), op.__name__)
+
+        self.assertEqual(LogicVector(~LogicValue(a) for a, _ in pairs),
+                         ~left)
+
+    def test_width_mismatch(self):
+        self.assertRaises(ValueError, operator.and_, LogicVector('01'),
+                          LogicVector('0'))
+        self.assertFalse(LogicVector('01') == '01')
+        self.assertRaises(ValueError, bool, LogicVector('1'))
+
+    def test_unknown(self):
+        self.assertTrue(LogicVector('0110').is_known())
+        self.assertFalse(LogicVector('01X0X').is_known())
+        self.assertListEqual([2, 4], LogicVector('01X0X').unknown_indices())
+
+    def test_reset_analysis(self):
+        # Two bit shift register: reset value enters from input
+        def step(state, inputs):
+            return LogicVector([inputs[0], state[0]])
+
+        cycles, state = reset_analysis(step, LogicVector.unknown(2),
+                                       [LogicVector('0')] * 5)
+        self.assertEqual(2, cycles)
+        self.assertEqual(LogicVector('00'), state)
+
+        cycles, state = reset_analysis(step, LogicVector.unknown(2),
+                                       [LogicVector('X')] * 5)
+        self.assertIsNone(cycles)
+        self.assertFalse(state.is_known())
+
+        cycles, _ = reset_analysis(step, LogicVector.unknown(2),
+                                   [LogicVector('1')] * 5, max_cycles=1)
+        self.assertIsNone(cycles)
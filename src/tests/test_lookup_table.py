@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+from itertools import product
+
+from backend.component_library import get_library
+from backend.components import CompoundElement, Nor
+from backend.components.interconnect import Interconnect
+from backend.components.lookup_table import get_macro_model, \
+    apply_macro_models, LookupTableInstance
+from backend.element import Edge
+from tests.helpers import drain_queue
+from tests.test_backend_core import TestingController, build_halfadder, \
+    build_fulladder
+from tests import helpers
+
+
+class LookupTableTest(helpers.CriticalTestCase):
+    """
+    Unit tests for macro-modelling compound elements with lookup tables.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.ctrl = TestingController(library=get_library())
+        self.core = self.ctrl.get_core()
+
+    def _outputs(self, element, first_id):
+        outputs = [Interconnect.instantiate(first_id + i, self.ctrl)
+                   for i in range(2)]
+        for port, output in enumerate(outputs):
+            self.assertTrue(element.connect(port, output, 0))
+        return outputs
+
+    def _apply(self, element, states):
+        for port, state in enumerate(states):
+            self.core.schedule(Edge(self.core.clock + 1, element, port, state))
+        self.assertGreater(self.core.clock + 100,
+                           self.core.loop_until_stable_state_or_time(
+                               self.core.clock + 100))
+
+    def test_half_adder_model(self):
+        model = get_macro_model(build_halfadder("ha", self.ctrl))
+
+        self.assertEqual(2, model.input_count)
+        self.assertEqual(2, model.output_count)
+        # Output 0 is the sum, output 1 the carry
+        self.assertListEqual([0b00, 0b01, 0b01, 0b10], model.table)
+        self.assertListEqual([1, 1], model.delays)
+
+    def test_full_adder_model(self):
+        model = get_macro_model(build_fulladder("fa", self.ctrl))
+
+        self.assertEqual(3, model.input_count)
+        for pattern in range(8):
+            ones = bin(pattern).count('1')
+            self.assertEqual((ones % 2) | (ones >= 2) << 1,
+                             model.table[pattern])
+        # Carry passes two half adders and the or gate
+        self.assertListEqual([2, 3], model.delays)
+
+    def test_cache(self):
+        first = get_macro_model(build_halfadder("ha", self.ctrl))
+        second = get_macro_model(build_halfadder("ha", self.ctrl))
+        self.assertIs(first, second)
+
+    def test_limits(self):
+        self.assertIsNone(get_macro_model(build_fulladder("fa", self.ctrl),
+                                          max_inputs=2))
+
+        # Nor latch isn't combinational
+        latch = CompoundElement.instantiate(0, self.ctrl)
+        first = Nor.instantiate(1, latch)
+        second = Nor.instantiate(2, latch)
+        latch.input_bank.connect(0, first, 0)
+        latch.input_bank.connect(1, second, 1)
+        first.connect(0, second, 0)
+        second.connect(0, first, 1)
+        first.connect(0, latch.output_bank, 0)
+
+        self.assertIsNone(get_macro_model(latch))
+
+    def test_simulation(self):
+        reference = build_fulladder("ref", self.ctrl)
+        reference_outputs = self._outputs(reference, 10)
+
+        fa = build_fulladder("fa", self.ctrl)
+        fa_outputs = self._outputs(fa, 20)
+        children = list(fa.get_children())
+
+        self.assertListEqual([fa], apply_macro_models([fa]))
+        self.assertIsInstance(fa.macro_model, LookupTableInstance)
+        self.assertIs(fa.macro_model, fa.resolve_sink(2)[0])
+        self.assertListEqual(children, fa.get_children())
+
+        for states in product((False, True), repeat=3):
+            self._apply(reference, states)
+            self._apply(fa, states)
+
+            self.assertListEqual([o.state for o in reference_outputs],
+                                 [o.state for o in fa_outputs])
+
+        # Simulating the children again
+        fa.set_macro_model(None)
+        self.assertIsNone(fa.macro_model)
+        self.assertNotIsInstance(fa.resolve_sink(2)[0], LookupTableInstance)
+
+    def test_switch_macro_model(self):
+        fa = build_fulladder("fa", self.ctrl)
+        fa_outputs = self._outputs(fa, 20)
+        table = self.ctrl.get_handle_table()
+        count = len(table)
+
+        for states in product((False, True), repeat=3):
+            self.assertListEqual([fa], apply_macro_models([fa]))
+            model = fa.macro_model
+            self.assertEqual(count + 1, len(table))
+            self.assertIs(model, table.instance(model.handle()))
+            self._apply(fa, states)
+
+            fa.set_macro_model(None)
+            self.assertEqual(count, len(table))
+            self.assertIsNone(table.instance(model.handle()))
+            self._apply(fa, states)
+
+            self.assertEqual(sum(states) % 2, fa_outputs[0].state)
+            self.assertEqual(sum(states) >= 2, fa_outputs[1].state)
+
+        # Deleting the compound releases its model too
+        apply_macro_models([fa])
+        model = fa.macro_model
+        fa.destruct()
+        self.assertIsNone(table.instance(model.handle()))
+
+    def test_controller(self):
+        interface = self.ctrl.get_interface()
+        ha = build_halfadder("ha", self.ctrl)
+
+        interface.apply_macro_models(max_inputs=4)
+        self.ctrl.process(0)
+
+        messages = drain_queue(self.ctrl.get_channel_out(),
+                               lambda m: m['type'] == 'macro-modelled')
+        self.assertListEqual([[ha.id()]], [m['ids'] for m in messages])
+        self.assertIsNotNone(ha.macro_model)
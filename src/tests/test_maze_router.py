@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Test the maze router.
+'''
+
+import random
+
+from tests import helpers
+from tests.test_hightower import area_to_input_data
+from tests.test_obstacle_index import random_blocks
+from algorithms.hightower import hightower_line_search, Solid, LineEdge
+from algorithms.maze_router import maze_line_search
+
+
+def iter_path_points(path):
+    """All points of a path and whether the path bends there."""
+    for i, (start, end) in enumerate(zip(path, path[1:])):
+        dx = (end[0] > start[0]) - (end[0] < start[0])
+        dy = (end[1] > start[1]) - (end[1] < start[1])
+        point = start
+        yield point, i > 0
+        while point != end:
+            point = (point[0] + dx, point[1] + dy)
+            if point != end:
+                yield point, False
+    yield path[-1], True
+
+
+def is_reachable(point_a, point_b, get_obj_at_point, search_rect):
+    """Flood fill, ignoring that paths may only bend on free points."""
+    (left, top), (right, bottom) = search_rect
+    pending, seen = [point_a], {point_a}
+    while pending:
+        x, y = pending.pop()
+        for point in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if point not in seen and left <= point[0] <= right and \
+                    top <= point[1] <= bottom and \
+                    get_obj_at_point(point) not in (Solid, LineEdge):
+                seen.add(point)
+                pending.append(point)
+    return point_b in seen
+
+
+class MazeRouterSpec(helpers.CriticalTestCase):
+    def check_path(self, path, point_a, point_b, get_obj_at_point,
+                   search_rect):
+        self.assertEqual(point_a, path[0])
+        self.assertEqual(point_b, path[-1])
+        (left, top), (right, bottom) = search_rect
+        for start, end in zip(path, path[1:]):
+            self.assertTrue(start[0] == end[0] or start[1] == end[1])
+        for point, is_bend in iter_path_points(path):
+            self.assertTrue(left <= point[0] <= right and
+                            top <= point[1] <= bottom)
+            obj = get_obj_at_point(point)
+            if is_bend:
+                self.assertIsNone(obj, point)
+            else:
+                self.assertNotIn(obj, (Solid, LineEdge), point)
+
+    def test_same_points(self):
+        self.assertListEqual([(3, 4), (3, 4)], maze_line_search(
+            (3, 4), (3, 4), lambda point: None, [(0, 0), (10, 10)]))
+
+    def test_straight(self):
+        self.assertListEqual([(1, 4), (8, 4)], maze_line_search(
+            (1, 4), (8, 4), lambda point: None, [(0, 0), (10, 10)]))
+
+    def test_hightower_failure(self):
+        # Expected failure of the hightower algorithm
+        area = """
+
+               #####
+          1 A  #####
+               ###########
+             #############
+             ####### B ###
+             #######   ###
+           #####  4  5 ###
+           #####    ######
+           #####    ######
+          2       3 ######
+        """
+        high_input, exp_res = area_to_input_data(area)
+        res = maze_line_search(*high_input)
+        self.check_path(res, *high_input)
+        self.assertEqual(len(exp_res), len(res))
+
+    def test_crossing_lines(self):
+        area = """
+           |   +
+        A  |   + B
+        ---+----
+           |
+        """
+        high_input, _ = area_to_input_data(area)
+        res = maze_line_search(*high_input)
+        self.check_path(res, *high_input)
+        # Bending on the lines is not allowed
+        self.assertEqual(4, len(res))
+
+    def test_cave_unsolvable(self):
+        area = """
+             #######
+             #     #
+             #  A  #
+             #     #
+         B   #######
+        """
+        high_input, _ = area_to_input_data(area)
+        self.assertIsNone(maze_line_search(*high_input))
+
+    def test_random(self):
+        rng = random.Random(13)
+        rect = [(-1, -1), (25, 18)]
+        size = 27 * 20
+        for _ in range(100):
+            blocks = random_blocks(rng, rect, 0.3)
+            points = [(x, y) for x in range(0, 25) for y in range(0, 18)
+                      if (x, y) not in blocks]
+            point_a, point_b = rng.sample(points, 2)
+
+            # Minimum bends with an expensive bend
+            res = maze_line_search(point_a, point_b, blocks.get, rect,
+                                   bend_cost=size)
+            if res is None:
+                self.assertFalse(is_reachable(point_a, point_b, blocks.get,
+                                              rect))
+                continue
+            self.check_path(res, point_a, point_b, blocks.get, rect)
+
+            # Hightower may bend where escape lines intersect on a line
+            expected = hightower_line_search(point_a, point_b, blocks.get,
+                                             rect)
+            if expected is not None and all(
+                    blocks.get(point) is None for point in expected):
+                self.assertLessEqual(len(res), len(expected))
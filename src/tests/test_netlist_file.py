@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+import os
+import queue
+import tempfile
+
+from backend.controller import Controller
+from backend.component_library import ComponentLibrary
+from backend.components import And, Nand
+from backend.netlist_file import encode_netlist, NetlistFile, \
+    NetlistFormatError, save_netlist, load_netlist, NO_INDEX
+from tests.helpers import drain_queue
+from tests.test_controller import CoreMock
+from tests import helpers
+
+
+class NetlistFileTest(helpers.CriticalTestCase):
+    """
+    Unit tests for the columnar netlist file format.
+    """
+
+    def test_round_trip(self):
+        big_id = 2 ** 127 + 12345
+        outside_id = 2 ** 100 + 7
+        data = [{'id': big_id,
+                 'GUID': 'A',
+                 'name': 'first',
+                 'x': 100.0,
+                 'y': 200.5,
+                 'delay': 1,
+                 '#inputs': 2,
+                 '#outputs': 1,
+                 'input-states': [0, 1],
+                 'inputs': [(None, 0), (outside_id, 3)],
+                 'outputs': [(5, 1, 0.5)],
+                 'children': [{'id': 5,
+                               'GUID': 'B',
+                               'tree': [[[0, 0], []]],
+                               'inputs': [(None, 0), (big_id, 0)],
+                               'outputs': [(None, 0, 0), (outside_id, 2, 3)],
+                               'children': []}]},
+                {'id': 6,
+                 'GUID': 'A',
+                 'inputs': [],
+                 'outputs': [],
+                 'children': []}]
+
+        netlist = NetlistFile(encode_netlist(data))
+
+        self.assertEqual(3, len(netlist))
+        self.assertEqual(data, netlist.to_serialization())
+
+    def test_round_trip_types(self):
+        data = [{'id': 1, 'GUID': 'G', 'x': 3, 'y': 4.0, 'delay': 2,
+                 'inputs': [], 'outputs': [(2, 0, 5), (3, 0, 5.0)],
+                 'children': []}]
+
+        netlist = NetlistFile(encode_netlist(data))
+        metadata = netlist.metadata(0)
+
+        self.assertIs(int, type(metadata['x']))
+        self.assertIs(float, type(metadata['y']))
+        self.assertIs(int, type(metadata['delay']))
+        self.assertListEqual([int, float],
+                             [type(delay) for _, _, delay
+                              in netlist.outputs(0)])
+        # Numeric fields don't end up in the JSON of other fields
+        self.assertEqual(NO_INDEX, netlist.extra[0])
+
+    def test_columns(self):
+        data = [{'id': i, 'GUID': 'G', 'x': float(i), 'inputs': [],
+                 'outputs': [(i + 1, 0, 2.0)], 'children': []}
+                for i in range(3)]
+
+        netlist = NetlistFile(encode_netlist(data))
+
+        self.assertListEqual([0.0, 1.0, 2.0], list(netlist.x))
+        self.assertListEqual([0, 1, 2, 3], list(netlist.out_offsets))
+        self.assertListEqual([1, 2], list(netlist.out_target[:2]))
+        self.assertEqual(3, netlist.endpoint_id(netlist.out_target[2]))
+        self.assertEqual(1, len(set(netlist.guid)))
+
+    def test_invalid_data(self):
+        self.assertRaises(NetlistFormatError, NetlistFile, b'')
+        self.assertRaises(NetlistFormatError, NetlistFile, b'\0' * 1024)
+
+    def test_file_round_trip(self):
+        data = [{'id': 1, 'GUID': 'G', 'inputs': [], 'outputs': [],
+                 'children': []}]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'netlist.lsnl')
+            save_netlist(path, data)
+            netlist = load_netlist(path)
+            self.assertEqual(data, netlist.to_serialization())
+            del netlist
+
+
+class ControllerNetlistTest(helpers.CriticalTestCase):
+    def setUp(self):
+        super().setUp()
+
+        cl = ComponentLibrary()
+        cl.register(And)
+        cl.register(Nand)
+
+        self.ctrl = Controller(core=CoreMock(), library=cl,
+                               queue_type=queue.Queue)
+
+        self.interface = self.ctrl.get_interface()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'netlist.lsnl')
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def test_save_and_load(self):
+        _, a1 = self.interface.create_element(And.GUID())
+        _, a2 = self.interface.create_element(Nand.GUID())
+        self.interface.connect(a1, 0, a2, 1)
+
+        self.interface.save_netlist(self.path)
+        self.ctrl.process(0)
+        drain_queue(self.ctrl.get_channel_out())
+
+        rid = self.interface.load_netlist(self.path)
+        self.ctrl.process(1)
+
+        msg = drain_queue(self.ctrl.get_channel_out(),
+                          lambda m: m['type'] != 'alive')
+
+        self.assertEqual('deserialization-start', msg[0]['type'])
+        self.assertEqual(rid, msg[0]['in-reply-to'])
+        self.assertEqual('deserialization-end', msg[-1]['type'])
+
+        new_a1, new_a2 = msg[-1]['ids']
+        element = self.ctrl.elements[new_a1]
+        self.assertEqual(And.GUID(), element.get_metadata_field('GUID'))
+        self.assertListEqual([(new_a2, 1, 0)],
+                             element.get_metadata_field('outputs'))
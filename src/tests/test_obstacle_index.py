@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Test the obstacle index used by the hightower algorithm.
+'''
+
+import random
+
+from tests import helpers
+from algorithms.hightower import (hightower_line_search, Solid, PassableLine,
+                                  LineEdge)
+from algorithms.obstacle_index import ObstacleIndex
+
+
+def escape_line_end_by_walking(view, point, horizontal, up_or_left):
+    """Reference implementation probing point by point."""
+    step = -1 if up_or_left else 1
+    last_free_point = point
+    while True:
+        if horizontal:
+            point = (point[0] + step, point[1])
+        else:
+            point = (point[0], point[1] + step)
+        if not view.is_point_in_bounds(point):
+            return last_free_point
+        obj = view(point)
+        if obj in (Solid, LineEdge):
+            return last_free_point
+        elif obj is None:
+            last_free_point = point
+
+
+def cover_bound_by_walking(view, point, horizontal, up_or_left,
+                           to_up_or_left):
+    """Reference implementation as found in the hightower algorithm."""
+    step = -1 if up_or_left else 1
+    while True:
+        if horizontal:
+            next = (point[0] + step, point[1])
+        else:
+            next = (point[0], point[1] + step)
+        if escape_line_end_by_walking(view, next, not horizontal,
+                                      to_up_or_left) != next:
+            break
+        if not view.is_point_in_bounds(next):
+            break
+        point = next
+    return point
+
+
+def random_blocks(rng, rect, density):
+    blocks = {}
+    (left, top), (right, bottom) = rect
+    # leave the border free as assumed by the hightower algorithm
+    for x in range(left + 1, right):
+        for y in range(top + 1, bottom):
+            if rng.random() < density:
+                blocks[(x, y)] = rng.choice((Solid, LineEdge, PassableLine))
+    return blocks
+
+
+def index_from_blocks(blocks):
+    index = ObstacleIndex()
+    for point, obj in blocks.items():
+        index.add(point, obj)
+    return index
+
+
+class ObstacleIndexSpec(helpers.CriticalTestCase):
+    def test_reference_counting(self):
+        index = ObstacleIndex()
+        index.add((1, 2), PassableLine)
+        index.add((1, 2), Solid)
+        index.add((1, 2), PassableLine)
+        self.assertIs(Solid, index((1, 2)))
+        index.remove((1, 2), Solid)
+        self.assertIs(PassableLine, index((1, 2)))
+        index.remove((1, 2), PassableLine)
+        self.assertIs(PassableLine, index((1, 2)))
+        index.remove((1, 2), PassableLine)
+        self.assertIsNone(index((1, 2)))
+
+    def test_next_blocked(self):
+        index = ObstacleIndex()
+        for x in (2, 3, 4, 9):
+            index.add((x, 0), Solid)
+        index.add((6, 0), PassableLine)
+        view = index.view([(-10, -10), (10, 10)])
+
+        self.assertEqual((9, 0), view.next_blocked((5, 0), True, False))
+        self.assertEqual((4, 0), view.next_blocked((5, 0), True, True))
+        self.assertEqual((3, 0), view.next_blocked((4, 0), True, True))
+        self.assertEqual((2, 0), view.next_blocked((0, 0), True, False))
+        self.assertIsNone(view.next_blocked((9, 0), True, False))
+        self.assertEqual((3, 0), view.next_blocked((3, 5), False, True))
+
+    def test_view_is_snapshot(self):
+        index = ObstacleIndex()
+        index.add((1, 1), Solid)
+        view = index.view([(0, 0), (5, 5)], {(2, 1): LineEdge, (1, 1): None})
+        version = index.version
+        index.add((3, 1), Solid)
+        index.remove((1, 1), Solid)
+
+        self.assertIsNone(view((1, 1)))
+        self.assertIs(LineEdge, view((2, 1)))
+        self.assertIsNone(view((3, 1)))
+        self.assertEqual((5, 1), view.escape_line_end((3, 1), True, False))
+
+        self.assertGreater(index.version, version)
+        self.assertIsNone(index((2, 1)))
+        self.assertIs(Solid, index((3, 1)))
+        self.assertEqual((2, 1), index.view([(0, 0), (5, 5)]).escape_line_end(
+            (0, 1), True, False))
+
+    def test_incremental(self):
+        rng = random.Random(3)
+        rect = [(-2, -2), (12, 12)]
+        index = ObstacleIndex()
+        present = []
+        for _ in range(2000):
+            if present and rng.random() < 0.4:
+                point, obj = present.pop(rng.randrange(len(present)))
+                index.remove(point, obj)
+            else:
+                point = (rng.randint(-2, 12), rng.randint(-2, 12))
+                obj = rng.choice((Solid, LineEdge, PassableLine))
+                index.add(point, obj)
+                present.append((point, obj))
+
+        blocks = {}
+        for point, obj in present:
+            if blocks.get(point) is not Solid and \
+                    not (blocks.get(point) is LineEdge and
+                         obj is PassableLine):
+                blocks[point] = obj
+        view = index.view(rect)
+        for x in range(-2, 13):
+            for y in range(-2, 13):
+                self.assertIs(blocks.get((x, y)), view((x, y)))
+                self.assertIs(blocks.get((x, y)), index((x, y)))
+        self.check_against_walking(view)
+
+    def check_against_walking(self, view):
+        (left, top), (right, bottom) = view.rect
+        for x in range(left, right + 1):
+            for y in range(top, bottom + 1):
+                for horizontal in (True, False):
+                    for up_or_left in (True, False):
+                        self.assertEqual(
+                            escape_line_end_by_walking(
+                                view, (x, y), horizontal, up_or_left),
+                            view.escape_line_end(
+                                (x, y), horizontal, up_or_left))
+                        for to_up_or_left in (True, False):
+                            self.assertEqual(
+                                cover_bound_by_walking(
+                                    view, (x, y), horizontal, up_or_left,
+                                    to_up_or_left),
+                                view.cover_bound(
+                                    (x, y), horizontal, up_or_left,
+                                    to_up_or_left),
+                                ((x, y), horizontal, up_or_left,
+                                 to_up_or_left))
+
+    def test_random_against_walking(self):
+        rng = random.Random(5)
+        for density in (0.1, 0.3, 0.6):
+            for _ in range(5):
+                rect = [(-3, -2), (13, 11)]
+                index = index_from_blocks(random_blocks(rng, rect, density))
+                self.check_against_walking(index.view(rect))
+
+    def test_same_hightower_result(self):
+        rng = random.Random(11)
+        rect = [(-1, -1), (30, 20)]
+        for _ in range(50):
+            blocks = random_blocks(rng, rect, 0.15)
+            view = index_from_blocks(blocks).view(rect)
+            points = [(x, y) for x in range(0, 30) for y in range(0, 20)
+                      if (x, y) not in blocks]
+            point_a, point_b = rng.sample(points, 2)
+
+            expected = hightower_line_search(point_a, point_b, blocks.get,
+                                             rect)
+            res = hightower_line_search(
+                point_a, point_b, view, rect,
+                get_escape_line_end=view.escape_line_end,
+                get_cover_bound=view.cover_bound)
+            self.assertEqual(expected, res)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Test route searches running on obstacle snapshots.
+'''
+
+import random
+import threading
+
+from tests import helpers
+from tests.test_obstacle_index import random_blocks, index_from_blocks
+from algorithms.hightower import hightower_line_search, Solid
+from algorithms.obstacle_index import ObstacleIndex
+from algorithms.route_search import RouteSearch
+from helper.cancellation import CancellationToken, Cancelled, cancellable
+
+
+class CancellationSpec(helpers.CriticalTestCase):
+    def test_cancellable(self):
+        token = CancellationToken()
+        fun = cancellable(lambda x: 2 * x, token)
+        self.assertEqual(4, fun(2))
+        token.cancel()
+        self.assertTrue(token.is_cancelled())
+        self.assertRaises(Cancelled, fun, 2)
+
+    def test_without_token(self):
+        fun = abs
+        self.assertIs(fun, cancellable(fun, None))
+
+
+class RouteSearchSpec(helpers.CriticalTestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.rect = [(-1, -1), (30, 20)]
+        self.blocks = random_blocks(rng, self.rect, 0.15)
+        self.index = index_from_blocks(self.blocks)
+        points = [(x, y) for x in range(0, 30) for y in range(0, 20)
+                  if (x, y) not in self.blocks]
+        self.point_a, self.point_b = rng.sample(points, 2)
+
+    def search(self, **kargs):
+        return RouteSearch(self.point_a, self.point_b,
+                           self.index.view(self.rect), self.rect, **kargs)
+
+    def test_same_as_hightower(self):
+        expected = hightower_line_search(self.point_a, self.point_b,
+                                         self.blocks.get, self.rect)
+        self.assertIsNotNone(expected)
+        self.assertEqual(expected, self.search().run())
+
+    def test_follows_previous_path(self):
+        path = [self.point_a, (35, self.point_a[1]), self.point_b]
+        # invalid, leaves the search rect
+        self.assertNotEqual(path, self.search(previous_path=path).run())
+
+        path = self.search().run()
+        self.assertEqual(path, self.search(previous_path=path).run())
+
+    def test_previous_path_far_from_best(self):
+        rect = [(-1, -1), (30, 20)]
+        view = ObstacleIndex().view(rect)
+
+        def search(previous_path):
+            return RouteSearch((0, 0), (10, 0), view, rect,
+                               previous_path=previous_path).run()
+
+        # valid, but far longer than the straight line
+        self.assertEqual([(0, 0), (10, 0)],
+                         search([(0, 0), (0, 15), (10, 15), (10, 5)]))
+        # close enough to be followed
+        self.assertEqual([(0, 0), (0, 2), (10, 2), (10, 0)],
+                         search([(0, 0), (0, 2), (10, 2), (10, 1)]))
+
+    def test_cancelled(self):
+        token = CancellationToken()
+        token.cancel()
+        self.assertRaises(Cancelled, self.search().run, token)
+
+    def test_snapshot_on_other_thread(self):
+        search = self.search()
+        expected = search.run()
+        # changing the index does not affect the running search
+        for x in range(0, 30):
+            self.index.add((x, self.point_a[1]), Solid)
+
+        result = []
+        thread = threading.Thread(target=lambda: result.append(search.run()))
+        thread.start()
+        thread.join()
+        self.assertEqual([expected], result)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Test the routing benchmark harness.
+'''
+
+import glob
+import os
+import tempfile
+
+from tests import helpers
+from algorithms.hightower import Solid
+from algorithms.routing_benchmark import (
+    ENGINES, UNLIMITED_ENGINES, CORPUS_DIR, ObstacleMap, Result, random_map,
+    schematic_map, maze_map, save_map, load_map, run_benchmark,
+    format_results, path_length, path_bends, is_valid_path)
+
+
+class RoutingBenchmarkSpec(helpers.CriticalTestCase):
+    def test_path_metrics(self):
+        path = [(0, 0), (5, 0), (7, 0), (7, 3), (2, 3)]
+        self.assertEqual(7 + 3 + 5, path_length(path))
+        self.assertEqual(2, path_bends(path))
+
+        blocks = {(3, 1): Solid}
+        rect = [(0, 0), (10, 10)]
+        self.assertTrue(is_valid_path(path, (0, 0), (2, 3), blocks, rect))
+        self.assertFalse(is_valid_path([(0, 1), (5, 1)], (0, 1), (5, 1),
+                                       blocks, rect))
+        self.assertFalse(is_valid_path([(0, 1), (2, 3)], (0, 1), (2, 3),
+                                       {}, rect))
+        self.assertFalse(is_valid_path([(0, 1), (12, 1)], (0, 1), (12, 1),
+                                       {}, rect))
+
+    def test_percentile(self):
+        result = Result('engine', 'map')
+        result.latencies = [5, 1, 4, 2, 3, 6, 7, 8, 9, 10]
+        self.assertEqual(5, result.percentile(50))
+        self.assertEqual(9, result.percentile(90))
+        self.assertEqual(10, result.percentile(99))
+        self.assertEqual(1, result.percentile(0))
+
+    def test_maps(self):
+        captured = [load_map(path) for path in
+                    glob.glob(os.path.join(CORPUS_DIR, '*.json'))]
+        self.assertTrue(captured)
+        for obstacle_map in [random_map('random', 30, 20, 0.2, seed=1),
+                             schematic_map('schematic', 40, 30, seed=1),
+                             maze_map('maze', 21, 15, seed=1)] + captured:
+            (left, top), (right, bottom) = obstacle_map.rect
+            # the border is free as assumed by the hightower algorithm
+            for point in obstacle_map.blocks:
+                self.assertTrue(left < point[0] < right and
+                                top < point[1] < bottom)
+            self.assertEqual(20, len(obstacle_map.queries))
+            for point_a, point_b in obstacle_map.queries:
+                self.assertNotIn(point_a, obstacle_map.blocks)
+                self.assertNotIn(point_b, obstacle_map.blocks)
+
+    def test_save_and_load(self):
+        obstacle_map = schematic_map('schematic', 40, 30, query_count=3)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'map.json')
+            save_map(obstacle_map, path)
+            loaded = load_map(path)
+        self.assertEqual(obstacle_map.name, loaded.name)
+        self.assertEqual(obstacle_map.rect, loaded.rect)
+        self.assertDictEqual(obstacle_map.blocks, loaded.blocks)
+        self.assertListEqual(obstacle_map.queries, loaded.queries)
+
+    def test_run_all_engines(self):
+        corpus = [random_map('random', 30, 20, 0.1, query_count=3),
+                  maze_map('maze', 21, 15, query_count=3),
+                  ObstacleMap('blocked', {(5, y): Solid for y in range(1, 9)},
+                              [(0, 0), (10, 9)], [((2, 5), (8, 5))])]
+        results = run_benchmark(corpus, timeout=10, repeat=2)
+        self.assertEqual(len(ENGINES) * len(corpus), len(results))
+        for result in results:
+            queries = {'blocked': 1}.get(result.map_name, 3)
+            self.assertEqual(2 * queries, result.count)
+            self.assertEqual(0, result.invalid)
+            self.assertEqual(0, result.timeouts)
+            self.assertEqual(result.count,
+                             result.failures + len(result.lengths))
+            if result.engine in ('maze', 'steiner', 'batch',
+                                 'route-search'):
+                # these always find existing paths
+                self.assertEqual(0, result.failures)
+
+        table = format_results(results).split('\n')
+        self.assertEqual(len(results) + 1, len(table))
+        self.assertIn('p99 ms', table[0])
+
+    def test_skip_unlimited_engines(self):
+        name, area = next(iter(UNLIMITED_ENGINES.items()))
+        small = ObstacleMap('small', {}, [(0, 0), (10, 10)], query_count=1)
+        large = ObstacleMap('large', {}, [(0, 0), (area, 2)], query_count=1)
+
+        results = run_benchmark([small, large], [name])
+        self.assertListEqual(['small'], [r.map_name for r in results])
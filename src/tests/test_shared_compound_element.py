@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+import gc
+from itertools import product
+import weakref
+
+from backend.components import And, Xor
+from backend.components.interconnect import Interconnect
+from backend.components.shared_compound_element import \
+    SharedCompoundElement, describe_compound, get_definition
+from backend.component_library import ComponentLibrary, get_library
+from backend.element import Edge
+from tests.test_backend_core import TestingController, build_halfadder, \
+    build_fulladder
+from tests import helpers
+
+
+class SharedCompoundElementTest(helpers.CriticalTestCase):
+    """
+    Unit tests for compound elements with shared definitions.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.ctrl = TestingController(library=get_library())
+        self.core = self.ctrl.get_core()
+
+    def _instantiate(self, definition, first_id=100):
+        element = SharedCompoundElement.instantiate(
+            first_id, self.ctrl, {'definition': definition})
+
+        outputs = [Interconnect.instantiate(first_id + 1 + i, self.ctrl)
+                   for i in range(definition['#outputs'])]
+        for port, output in enumerate(outputs):
+            self.assertTrue(element.connect(port, output, 0))
+
+        return element, outputs
+
+    def _apply(self, element, states):
+        for port, state in enumerate(states):
+            self.core.schedule(Edge(self.core.clock + 1, element, port, state))
+        self.assertGreater(self.core.clock + 100,
+                           self.core.loop_until_stable_state_or_time(
+                               self.core.clock + 100))
+
+    def test_describe(self):
+        definition = describe_compound(build_halfadder("ha", self.ctrl))
+
+        self.assertEqual(2, definition['#outputs'])
+        self.assertEqual(4, len(definition['cells']))
+        self.assertListEqual([Interconnect.GUID(), Interconnect.GUID(),
+                              Xor.GUID(), And.GUID()],
+                             [cell['GUID'] for cell in definition['cells']])
+        self.assertListEqual([[0, 0], [1, 0]], definition['inputs'])
+
+    def test_half_adder(self):
+        definition = describe_compound(build_halfadder("ha", self.ctrl))
+        ha, (s, carry) = self._instantiate(definition)
+
+        for a, b in product((False, True), repeat=2):
+            self._apply(ha, (a, b))
+            self.assertEqual(a != b, s.state)
+            self.assertEqual(a and b, carry.state)
+
+    def test_matches_compound_element(self):
+        fa = build_fulladder("fa", self.ctrl)
+        definition = describe_compound(fa)
+
+        fa_outputs = [Interconnect.instantiate(10 + i, self.ctrl)
+                      for i in range(2)]
+        for port, output in enumerate(fa_outputs):
+            self.assertTrue(fa.connect(port, output, 0))
+
+        shared, shared_outputs = self._instantiate(definition)
+
+        for states in product((False, True), repeat=3):
+            self._apply(fa, states)
+            self._apply(shared, states)
+
+            self.assertListEqual([o.state for o in fa_outputs],
+                                 [o.state for o in shared_outputs])
+            self.assertEqual(sum(states) % 2, shared_outputs[0].state)
+            self.assertEqual(sum(states) >= 2, shared_outputs[1].state)
+
+    def test_shared_definition(self):
+        definition = describe_compound(build_halfadder("ha", self.ctrl))
+        first, _ = self._instantiate(definition, 100)
+        second, _ = self._instantiate(dict(definition), 200)
+
+        self.assertIs(first.definition, second.definition)
+        self.assertIs(first.get_metadata_field('definition'),
+                      second.get_metadata_field('definition'))
+        self.assertListEqual([], first.get_children())
+
+    def test_definition_per_library(self):
+        definition = describe_compound(build_halfadder("ha", self.ctrl))
+        library = ComponentLibrary()
+        library.component_types = dict(get_library().component_types)
+
+        shared = get_definition(definition, library)
+        self.assertIsNot(get_definition(definition, get_library()), shared)
+        self.assertIs(get_definition(definition, library), shared)
+
+        # Definitions are released together with their library
+        shared = weakref.ref(shared)
+        del library
+        gc.collect()
+        self.assertIsNone(shared())
+
+    def test_expand(self):
+        definition = describe_compound(build_halfadder("ha", self.ctrl))
+        ha, _ = self._instantiate(definition)
+        self._apply(ha, (True, False))
+
+        children = ha.expand()
+        self.assertEqual(4, len(children))
+
+        xor_gate = children[2]
+        self.assertEqual(Xor.GUID(), xor_gate['GUID'])
+        self.assertEqual(ha.id(), xor_gate['parent'])
+        self.assertListEqual([1, 0], xor_gate['input-states'])
+        self.assertListEqual([1], xor_gate['output-states'])
+        self.assertListEqual([(ha.id(), 0, 0)], xor_gate['outputs'])
+        self.assertListEqual([(children[0]['id'], 0),
+                              (children[1]['id'], 0)], xor_gate['inputs'])
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2014-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+'''
+Test the Steiner tree router.
+'''
+
+import random
+
+from tests import helpers
+from tests.test_batch_router import area_to_nets, iter_tree_lines
+from algorithms.hightower import Solid, LineEdge
+from algorithms.steiner_router import steiner_tree_search
+
+
+def tree_length(tree):
+    return sum(abs(start[0] - end[0]) + abs(start[1] - end[1])
+               for start, end in iter_tree_lines(tree))
+
+
+class SteinerRouterSpec(helpers.CriticalTestCase):
+    def check_tree(self, tree, terminals, get_obj_at_point, search_rect):
+        (left, top), (right, bottom) = search_rect
+        self.assertEqual([terminals[0]], list(tree))
+        seen = set()
+        for start, end in iter_tree_lines(tree):
+            self.assertTrue(start[0] == end[0] or start[1] == end[1])
+            dx = (end[0] > start[0]) - (end[0] < start[0])
+            dy = (end[1] > start[1]) - (end[1] < start[1])
+            point = start
+            while point != end:
+                point = (point[0] + dx, point[1] + dy)
+                self.assertNotIn(point, seen)  # no cycles or overlaps
+                seen.add(point)
+                self.assertTrue(left <= point[0] <= right and
+                                top <= point[1] <= bottom)
+                self.assertNotIn(get_obj_at_point(point), (Solid, LineEdge))
+            # bends and branches only on free points
+            self.assertIsNone(get_obj_at_point(end))
+        self.assertTrue(set(terminals[1:]) <= seen)
+
+    def route(self, area, **kargs):
+        nets, obstacles, search_rect = area_to_nets(area)
+        terminals = nets['a']
+        tree = steiner_tree_search(terminals, obstacles.get, search_rect,
+                                   **kargs)
+        if tree:
+            self.check_tree(tree, terminals, obstacles.get, search_rect)
+        return tree
+
+    def test_single_terminal(self):
+        self.assertDictEqual({}, self.route("A"))
+
+    def test_blocked_terminal(self):
+        nets, obstacles, search_rect = area_to_nets("A a")
+        obstacles[nets['a'][1]] = Solid
+        self.assertIsNone(steiner_tree_search(nets['a'], obstacles.get,
+                                              search_rect))
+
+    def test_unreachable(self):
+        self.assertIsNone(self.route("""
+                ###
+        A       #a#     a
+                ###
+        """))
+
+    def test_branches(self):
+        tree = self.route("""
+        A       a
+
+        a       a
+        """)
+        self.assertEqual(12, tree_length(tree))
+        self.assertEqual(3, len(list(iter_tree_lines(tree))))
+
+    def test_steiner_point(self):
+        # the branch is not at a terminal
+        tree = self.route("""
+            a
+
+        A       a
+
+            a
+        """)
+        self.assertEqual(4 + 4 + 4, tree_length(tree))
+
+    def test_crosses_lines(self):
+        tree = self.route("""
+             |
+        A    |    a
+             |    a
+        """)
+        self.assertDictEqual({(8, 2): {(18, 2): {(18, 3): {}}}}, tree)
+
+    def test_improves_greedy_tree(self):
+        rng = random.Random(3)
+        total, total_greedy = 0, 0
+        for _ in range(20):
+            rect = [(0, 0), (30, 20)]
+            points = [(x, y) for x in range(1, 30) for y in range(1, 20)]
+            rng.shuffle(points)
+            terminals = [points.pop() for _ in range(6)]
+            obstacles = {point: Solid for point in points[:60]}
+
+            tree = steiner_tree_search(terminals, obstacles.get, rect)
+            greedy = steiner_tree_search(terminals, obstacles.get, rect,
+                                         max_passes=0)
+            if tree is None:
+                self.assertIsNone(greedy)
+                continue
+            self.check_tree(tree, terminals, obstacles.get, rect)
+            self.check_tree(greedy, terminals, obstacles.get, rect)
+            total += tree_length(tree)
+            total_greedy += tree_length(greedy)
+        self.assertLess(total, total_greedy)
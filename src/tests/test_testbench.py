@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2011-2015 The LogikSim Authors. All rights reserved.
+# Use of this source code is governed by the GNU GPL license that can
+# be found in the LICENSE.txt file.
+#
+import os
+import tempfile
+
+from backend.components import And
+from backend.components.interconnect import Interconnect
+from backend import testbench
+from backend.testbench import TestbenchError, load_testbench
+from tests.helpers import drain_queue
+from tests.test_backend_core import TestingController
+from tests import helpers
+
+
+STIMULUS = """time,in:1:0,in:1:1,out:2:0
+0,0,0,0
+10,1,,0
+20,,1,1
+30,0,,1
+"""
+
+
+class TestbenchTest(helpers.CriticalTestCase):
+    """
+    Unit tests for the stimulus file testbench.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+
+        self.ctrl = TestingController()
+        self.core = self.ctrl.get_core()
+        self.and_gate = And.instantiate(1, self.ctrl)
+        self.out = Interconnect.instantiate(2, self.ctrl)
+        self.assertTrue(self.and_gate.connect(0, self.out, 0))
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def _write(self, content, name='stimulus.csv'):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_vectors(self):
+        bench = load_testbench(self._write(STIMULUS))
+
+        self.assertListEqual([(1, 0), (1, 1)], bench.inputs)
+        self.assertListEqual([(2, 0)], bench.outputs)
+        self.assertListEqual([(10, [True, None], [False]),
+                              (20, [None, True], [True])],
+                             list(bench.vectors())[1:3])
+
+    def test_invalid_files(self):
+        def vectors(content):
+            return list(load_testbench(self._write(content)).vectors())
+
+        self.assertRaises(TestbenchError, vectors, "in:1:0\n0\n")
+        self.assertRaises(TestbenchError, vectors, "time,foo\n0,1\n")
+        self.assertRaises(TestbenchError, vectors, "time,in:1\n0,1\n")
+        self.assertRaises(TestbenchError, vectors, "time,in:1:0\n0,2\n")
+        self.assertRaises(TestbenchError, vectors, "time,in:1:0\n0,X\n")
+        self.assertRaises(TestbenchError, vectors, "time,in:1:0\n0,1,1\n")
+        self.assertRaises(TestbenchError, vectors,
+                          "time,in:1:0\n5,1\n4,0\n")
+
+    def test_run(self):
+        bench = load_testbench(self._write(STIMULUS))
+        done = []
+        result = bench.run(self.core, self.ctrl.elements, strobe=5,
+                           on_done=done.append, start=100)
+
+        self.assertFalse(result.done)
+        self.core.loop_until_stable_state_or_time(200)
+
+        self.assertListEqual([result], done)
+        self.assertTrue(result.done)
+        self.assertEqual(4, result.vectors)
+        self.assertEqual(4, result.strobes)
+        # The last vector expects the output to stay True after input 0 fell
+        self.assertListEqual([(135, 2, 0, True, False)], result.mismatches)
+
+        path = os.path.join(self.directory.name, 'result.csv')
+        result.write(path)
+        with open(path) as f:
+            self.assertListEqual(["# vectors=4 strobes=4 mismatches=1",
+                                  "135,2:0,1,0"], f.read().splitlines())
+
+    def test_strobe_before_edges(self):
+        # Output changes at the strobe time are not visible yet
+        bench = load_testbench(self._write(
+            "time,in:1:0,in:1:1,out:2:0\n0,1,1,0\n"))
+        result = bench.run(self.core, self.ctrl.elements, strobe=1)
+        self.core.loop_until_stable_state_or_time(50)
+
+        self.assertTrue(result.done)
+        self.assertListEqual([], result.mismatches)
+        self.assertTrue(self.out.state)
+
+    def test_controller(self):
+        interface = self.ctrl.get_interface()
+        result_path = os.path.join(self.directory.name, 'result.csv')
+
+        rid = interface.run_testbench(self._write(STIMULUS), result_path, 10)
+        self.ctrl.process(0)
+        self.core.loop_until_stable_state_or_time(100)
+
+        messages = drain_queue(self.ctrl.get_channel_out(),
+                               lambda m: m['type'] == 'testbench-done')
+        self.assertEqual(1, len(messages))
+        self.assertEqual(rid, messages[0]['in-reply-to'])
+        self.assertEqual(4, messages[0]['vectors'])
+        self.assertEqual(1, messages[0]['mismatches'])
+        self.assertTrue(os.path.exists(result_path))
+
+    def test_empty(self):
+        bench = testbench.Testbench(['time'], [])
+        done = []
+        result = bench.run(self.core, self.ctrl.elements, on_done=done.append)
+        self.assertTrue(result.done)
+        self.assertListEqual([result], done)
+        self.assertTrue(self.core.event_queue.empty())
@@ -145,3 +145,16 @@ class ValidateJsonData(helpers.CriticalTestCase):
         self.assertRaises(Exception, validate, [[{'type': 'Test'}, 'b']])
         self.assertRaises(Exception, validate, [[2, {'type': 'Test'}]])
         self.assertRaises(Exception, validate, [{'type': 'Test'}])
+
+    def test_compiled_specs_are_cached(self):
+        spec = {'a': [(float, numbers.Integral)]}
+        validator = JsonMeta.compile_spec(spec)
+
+        self.assertIs(validator,
+                      JsonMeta.compile_spec({'a': [(float,
+                                                    numbers.Integral)]}))
+        self.assertIsNot(validator, JsonMeta.compile_spec({'a': [float]}))
+
+        validator({'a': [[1., 1], [2., 2]]})
+        self.assertRaises(TypeError, validator, {'a': [[1., 1], [2., 's']]})
+        self.assertRaises(KeyError, validator, {})